@@ -0,0 +1,341 @@
+"""Drive the API with a mixed workload and report latency per route.
+
+Run from backend/src, against the app in process or a running server:
+
+    python -m bench.load --profile read-heavy --rate 200 --duration 30
+    python -m bench.load --profile login-storm --concurrency 20 \\
+        --url http://127.0.0.1:8000
+
+With --rate, requests arrive open-loop at that average rate (Poisson), and
+latency counts from each request's scheduled start, so a saturated server
+shows up as growing latency rather than as fewer requests. Without it,
+--concurrency workers each send their next request when the last returns.
+"""
+
+import argparse
+import asyncio
+import json
+import os
+import random
+import secrets
+import sys
+import tempfile
+from bisect import bisect_left
+from collections import Counter, defaultdict
+from collections.abc import Awaitable, Callable
+from itertools import count
+import httpx
+from bench.stats import summarize
+
+PASSWORD = "load-test-password"
+# Upper bounds of the histogram buckets, in ms; the last bucket is open
+BUCKETS_MS = (1, 2, 5, 10, 20, 50, 100, 200, 500, 1000, 2000, 5000)
+
+# Relative weights of each action, per profile
+PROFILES = {
+    "read-heavy": {
+        "get_task": 60,
+        "list_tasks": 10,
+        "suggest": 15,
+        "search": 5,
+        "create_task": 5,
+        "whoami": 5,
+    },
+    "write-heavy": {
+        "create_task": 40,
+        "modify_task": 30,
+        "delete_task": 15,
+        "get_task": 15,
+    },
+    "login-storm": {"login": 90, "whoami": 10},
+    "mixed": {
+        "get_task": 40,
+        "list_tasks": 10,
+        "suggest": 10,
+        "create_task": 15,
+        "modify_task": 10,
+        "delete_task": 5,
+        "login": 5,
+        "whoami": 5,
+    },
+}
+
+
+class Recorder:
+    """Latencies, statuses and errors collected per route"""
+
+    def __init__(self):
+        self.latencies: dict[str, list[float]] = defaultdict(list)
+        self.statuses: dict[str, Counter] = defaultdict(Counter)
+        self.dropped = 0
+
+    def record(self, route: str, seconds: float, outcome: int | str) -> None:
+        """Record a response status, or the name of the exception raised"""
+        self.latencies[route].append(seconds)
+        self.statuses[route][outcome] += 1
+
+    @staticmethod
+    def histogram(seconds: list[float]) -> dict[str, int]:
+        counts = [0] * (len(BUCKETS_MS) + 1)
+        for value in seconds:
+            counts[bisect_left(BUCKETS_MS, value * 1000)] += 1
+        labels = [f"<={ms}ms" for ms in BUCKETS_MS] + [f">{BUCKETS_MS[-1]}ms"]
+        return {label: n for label, n in zip(labels, counts) if n}
+
+    def report(self, elapsed: float) -> dict:
+        routes = {}
+        for route in sorted(self.latencies):
+            statuses = self.statuses[route]
+            routes[route] = {
+                **summarize(self.latencies[route], elapsed),
+                "errors": {
+                    str(outcome): n
+                    for outcome, n in statuses.items()
+                    if not isinstance(outcome, int) or outcome >= 400
+                },
+                "histogram": self.histogram(self.latencies[route]),
+            }
+        everything = [s for latencies in self.latencies.values() for s in latencies]
+        return {
+            "total": {**summarize(everything, elapsed), "dropped": self.dropped},
+            "routes": routes,
+        }
+
+
+class Workload:
+    """The actions a profile mixes, and the tasks and tokens they share"""
+
+    def __init__(self, client: httpx.AsyncClient, rng: random.Random):
+        self.client = client
+        self.rng = rng
+        # Unique per run, so runs against a kept database don't collide
+        self.run_id = secrets.token_hex(3)
+        self.serial = count()
+        self.task_ids: list[int] = []
+        self.users: list[str] = []
+        self.tokens: list[str] = []
+
+    async def setup(self, tasks: int, users: int) -> None:
+        """Create the tasks and users the actions work on, and log users in"""
+        from service.hashing import get_hash
+
+        for _ in range(tasks):
+            await self.create_task()
+        hash = get_hash(PASSWORD)
+        for i in range(users):
+            name = f"load user {self.run_id} {i}"
+            resp = await self.client.post("/user", json={"name": name, "hash": hash})
+            resp.raise_for_status()
+            self.users.append(name)
+        for name in self.users:
+            await self.login(name)
+        if (tasks and not self.task_ids) or (users and not self.tokens):
+            sys.exit("setup failed; is the rate limit too low for it?")
+
+    def action(self, name: str) -> Callable[[], Awaitable[tuple[str, int]]]:
+        return getattr(self, name)
+
+    def _task_id(self) -> int:
+        return self.rng.choice(self.task_ids) if self.task_ids else -1
+
+    def _text(self) -> str:
+        return f"load {self.run_id} task {next(self.serial)}"
+
+    async def get_task(self) -> tuple[str, int]:
+        resp = await self.client.get(f"/task/{self._task_id()}")
+        return "GET /task/{id}", resp.status_code
+
+    async def list_tasks(self) -> tuple[str, int]:
+        resp = await self.client.get("/task", params={"limit": 50})
+        return "GET /task", resp.status_code
+
+    async def suggest(self) -> tuple[str, int]:
+        prefix = f"load {self.run_id} task {self.rng.randint(1, 9)}"
+        resp = await self.client.get("/task/suggest", params={"prefix": prefix})
+        return "GET /task/suggest", resp.status_code
+
+    async def search(self) -> tuple[str, int]:
+        q = f"task {self.rng.randint(1, 99)}"
+        resp = await self.client.get("/task/search", params={"q": q})
+        return "GET /task/search", resp.status_code
+
+    async def create_task(self) -> tuple[str, int]:
+        resp = await self.client.post("/task", json={"task": self._text()})
+        if resp.status_code == 201:
+            self.task_ids.append(resp.json()["task_id"])
+        return "POST /task", resp.status_code
+
+    async def modify_task(self) -> tuple[str, int]:
+        url = f"/task/{self._task_id()}"
+        resp = await self.client.patch(url, json={"task": self._text()})
+        return "PATCH /task/{id}", resp.status_code
+
+    async def delete_task(self) -> tuple[str, int]:
+        if len(self.task_ids) < 10:  # keep something for the reads
+            return await self.create_task()
+        task_id = self.task_ids.pop(self.rng.randrange(len(self.task_ids)))
+        resp = await self.client.delete(f"/task/{task_id}")
+        return "DELETE /task/{id}", resp.status_code
+
+    async def login(self, name: str | None = None) -> tuple[str, int]:
+        form = {"username": name or self.rng.choice(self.users), "password": PASSWORD}
+        resp = await self.client.post("/user/token", data=form)
+        if resp.status_code == 200:
+            self.tokens.append(resp.json()["access_token"])
+            del self.tokens[:-100]  # a login storm would grow it without end
+        return "POST /user/token", resp.status_code
+
+    async def whoami(self) -> tuple[str, int]:
+        token = self.rng.choice(self.tokens) if self.tokens else ""
+        headers = {"Authorization": f"Bearer {token}"}
+        resp = await self.client.get("/user/me", headers=headers)
+        return "GET /user/me", resp.status_code
+
+
+async def fire(
+    workload: Workload, name: str, started: float, recorder: Recorder
+) -> None:
+    """Run action <name> and record its latency since <started>"""
+    loop = asyncio.get_running_loop()
+    try:
+        route, status = await workload.action(name)()
+    except httpx.HTTPError as exc:
+        recorder.record(name, loop.time() - started, type(exc).__name__)
+    else:
+        recorder.record(route, loop.time() - started, status)
+
+
+async def open_loop(
+    workload: Workload,
+    pick: Callable[[], str],
+    rate: float,
+    duration: float,
+    max_in_flight: int,
+    recorder: Recorder,
+) -> None:
+    """Start requests at Poisson arrivals averaging <rate> per second"""
+    loop = asyncio.get_running_loop()
+    in_flight: set[asyncio.Task] = set()
+    due = start = loop.time()
+    while (due := due + workload.rng.expovariate(rate)) < start + duration:
+        await asyncio.sleep(max(0.0, due - loop.time()))
+        if len(in_flight) >= max_in_flight:
+            recorder.dropped += 1  # the generator itself is out of room
+            continue
+        request = asyncio.create_task(fire(workload, pick(), due, recorder))
+        in_flight.add(request)
+        request.add_done_callback(in_flight.discard)
+    await asyncio.gather(*in_flight)
+
+
+async def closed_loop(
+    workload: Workload,
+    pick: Callable[[], str],
+    concurrency: int,
+    duration: float,
+    recorder: Recorder,
+) -> None:
+    """Keep <concurrency> requests outstanding for <duration> seconds"""
+    loop = asyncio.get_running_loop()
+    deadline = loop.time() + duration
+
+    async def worker() -> None:
+        while (now := loop.time()) < deadline:
+            await fire(workload, pick(), now, recorder)
+
+    await asyncio.gather(*(worker() for _ in range(concurrency)))
+
+
+async def run(args: argparse.Namespace) -> dict:
+    rng = random.Random(args.seed)
+    profile = PROFILES[args.profile]
+    names, weights = list(profile), list(profile.values())
+
+    def pick() -> str:
+        return rng.choices(names, weights)[0]
+
+    if args.url:
+        transport, app = None, None
+    else:
+        from main import app
+
+        transport = httpx.ASGITransport(app=app)
+    base_url = args.url or "http://app"
+    async with httpx.AsyncClient(
+        transport=transport, base_url=base_url, timeout=args.timeout
+    ) as client:
+        lifespan = app.router.lifespan_context(app) if app else None
+        if lifespan:
+            await lifespan.__aenter__()
+        try:
+            workload = Workload(client, rng)
+            await workload.setup(args.tasks, args.users)
+            recorder = Recorder()
+            start = asyncio.get_running_loop().time()
+            if args.rate:
+                await open_loop(
+                    workload,
+                    pick,
+                    args.rate,
+                    args.duration,
+                    args.max_in_flight,
+                    recorder,
+                )
+            else:
+                await closed_loop(
+                    workload, pick, args.concurrency, args.duration, recorder
+                )
+            elapsed = asyncio.get_running_loop().time() - start
+        finally:
+            if lifespan:
+                await lifespan.__aexit__(None, None, None)
+    return recorder.report(elapsed)
+
+
+def print_report(report: dict) -> None:
+    print(f"{'route':<22}{'count':>8}{'rps':>10}{'p50 ms':>10}{'p99 ms':>10}  errors")
+    rows = [*report["routes"].items(), ("total", report["total"])]
+    for route, stats in rows:
+        errors = ", ".join(f"{k}: {n}" for k, n in stats.get("errors", {}).items())
+        print(
+            f"{route:<22}{stats['count']:>8}{stats['ops']:>10.1f}"
+            f"{stats['p50_ms']:>10.2f}{stats['p99_ms']:>10.2f}  {errors}"
+        )
+    if report["total"]["dropped"]:
+        print(f"dropped by the generator: {report['total']['dropped']}")
+    for route, stats in report["routes"].items():
+        buckets = "  ".join(f"{b} {n}" for b, n in stats["histogram"].items())
+        print(f"\n{route}\n  {buckets}")
+
+
+def main(argv: list[str] | None = None) -> None:
+    parser = argparse.ArgumentParser(description=__doc__.split("\n")[0])
+    parser.add_argument("--profile", choices=PROFILES, default="mixed")
+    parser.add_argument("--url", help="target a server instead of the app in process")
+    parser.add_argument("--rate", type=float, help="open loop: requests per second")
+    parser.add_argument("--concurrency", type=int, default=10)
+    parser.add_argument("--duration", type=float, default=10.0)
+    parser.add_argument("--max-in-flight", type=int, default=1000)
+    parser.add_argument("--tasks", type=int, default=200, help="tasks created first")
+    parser.add_argument("--users", type=int, default=5, help="users created first")
+    parser.add_argument("--timeout", type=float, default=30.0)
+    parser.add_argument("--seed", type=int, default=1234)
+    parser.add_argument("--json", metavar="PATH", help="also write the report here")
+    args = parser.parse_args(argv)
+
+    if not args.url:
+        # The app in process gets a scratch database and, unless asked
+        # otherwise, no rate limits to hide where it saturates
+        scratch = tempfile.TemporaryDirectory(prefix="todo-load-")
+        os.environ.setdefault("TODO_SQLITE_DB", os.path.join(scratch.name, "load.db"))
+        os.environ.setdefault("TODO_RATE_LIMIT", "0")
+        os.environ.setdefault("TODO_TOKEN_RATE_LIMIT", "0")
+    report = asyncio.run(run(args))
+    print_report(report)
+    if args.json:
+        with open(args.json, "w") as f:
+            json.dump(report, f, indent=2)
+
+
+if __name__ == "__main__":
+    main()
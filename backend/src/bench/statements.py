@@ -0,0 +1,70 @@
+"""Count the SQL statements each data-layer write sends to SQLite.
+
+Run from backend/src:
+
+    python -m bench.statements
+"""
+
+import os
+
+# Must be set before data.init builds its Database
+os.environ.setdefault("TODO_SQLITE_DB", ":memory:")
+
+from collections.abc import Callable  # noqa: E402
+from typing import Any  # noqa: E402
+from data import task, user  # noqa: E402
+from data.init import db, SUPPORTS_RETURNING  # noqa: E402
+from model.task import TaskCreate  # noqa: E402
+from model.user import UserCreate, UserUpdate  # noqa: E402
+
+
+def count_statements(func: Callable, *args) -> tuple[Any, list[str]]:
+    """Call <func> and return its result and the statements it ran"""
+    statements = []
+
+    def trace(sql: str) -> None:
+        # SQLite's own statements come prefixed with "--", and each trigger
+        # run repeats the statement that fired it
+        if not sql.startswith("--") and statements[-1:] != [sql]:
+            statements.append(sql)
+
+    # Data calls on this thread reuse the lease, so the callback sees them all
+    with db.connection() as conn:
+        conn.set_trace_callback(trace)
+        try:
+            result = func(*args)
+        finally:
+            conn.set_trace_callback(None)
+    return result, statements
+
+
+def main() -> None:
+    task.delete_all_tasks()
+    user.delete_all_users()
+    new_task, created = count_statements(
+        task.create_task, TaskCreate(task="bench task")
+    )
+    new_user, user_created = count_statements(
+        user.create_user, UserCreate(name="bench user", hash="bench hash")
+    )
+    _, modified = count_statements(
+        task.modify_task, new_task.task_id, TaskCreate(task="bench task 2")
+    )
+    _, user_modified = count_statements(
+        user.modify_user, new_user.user_id, UserUpdate(hash="bench hash 2")
+    )
+    print(f"RETURNING supported: {SUPPORTS_RETURNING}")
+    print(f"{'operation':<20}{'statements':>10}")
+    for name, statements in (
+        ("task.create_task", created),
+        ("task.modify_task", modified),
+        ("user.create_user", user_created),
+        ("user.modify_user", user_modified),
+    ):
+        print(f"{name:<20}{len(statements):>10}")
+    task.delete_all_tasks()
+    user.delete_all_users()
+
+
+if __name__ == "__main__":
+    main()
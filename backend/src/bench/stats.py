@@ -0,0 +1,41 @@
+"""Latency summaries and baseline comparison for the benchmarks"""
+
+from math import ceil
+
+
+def percentile(ordered: list[float], q: float) -> float:
+    """Return the nearest-rank <q> percentile (0-100) of sorted <ordered>"""
+    if not ordered:
+        return 0.0
+    rank = max(ceil(q / 100 * len(ordered)), 1)
+    return ordered[rank - 1]
+
+
+def summarize(seconds: list[float], elapsed: float | None = None) -> dict:
+    """Return throughput and latency percentiles, in ms, of call durations.
+
+    Throughput is over <elapsed> wall-clock seconds if given, or else over
+    the summed durations, as for calls made one after another."""
+    ordered = sorted(seconds)
+    elapsed = sum(ordered) if elapsed is None else elapsed
+    return {
+        "count": len(ordered),
+        "ops": round(len(ordered) / elapsed, 1) if elapsed else 0.0,
+        "p50_ms": round(percentile(ordered, 50) * 1000, 4),
+        "p99_ms": round(percentile(ordered, 99) * 1000, 4),
+        "max_ms": round(ordered[-1] * 1000, 4) if ordered else 0.0,
+    }
+
+
+def compare(baseline: dict, results: dict, threshold: float) -> list[str]:
+    """Return the keys of <results> slower than <baseline> by over <threshold>"""
+    regressions = []
+    for key, now in results.items():
+        if not (base := baseline.get(key)):
+            continue
+        slower = base["ops"] and now["ops"] < base["ops"] / (1 + threshold)
+        for metric in ("p50_ms", "p99_ms"):
+            slower = slower or now[metric] > base[metric] * (1 + threshold)
+        if slower:
+            regressions.append(key)
+    return regressions
@@ -0,0 +1,235 @@
+"""Benchmark the data, fake, service and HTTP layers at several table sizes.
+
+Run from backend/src:
+
+    python -m bench.suite --sizes 1000 100000 --save baseline.json
+    python -m bench.suite --sizes 1000 100000 --compare baseline.json
+
+Each case runs for --iterations calls or --max-seconds, whichever ends
+first, and reports calls per second with p50/p99 latency. --compare exits
+with status 1 if any case got slower than the baseline by more than
+--threshold.
+"""
+
+import os
+import tempfile
+
+# Must be set before data.init builds its Database and main builds the app
+_tmp = tempfile.TemporaryDirectory(prefix="todo-bench-")
+os.environ.setdefault("TODO_SQLITE_DB", os.path.join(_tmp.name, "bench.db"))
+os.environ.setdefault("TODO_RATE_LIMIT", "0")
+
+import argparse  # noqa: E402
+import json  # noqa: E402
+import platform  # noqa: E402
+import random  # noqa: E402
+import sys  # noqa: E402
+from collections.abc import Callable  # noqa: E402
+from datetime import datetime, timezone  # noqa: E402
+from itertools import count  # noqa: E402
+from sqlite3 import sqlite_version  # noqa: E402
+from time import perf_counter  # noqa: E402
+from bench.stats import compare, summarize  # noqa: E402
+
+LAYERS = ("data", "fake", "service", "http")
+SIZES = (1_000, 100_000, 1_000_000)
+WORDS = ("groceries", "laundry", "invoice", "garden", "dentist", "report", "travel")
+PAGE = 100
+SEED_BATCH = 50_000
+
+Case = Callable[[], object]
+
+
+def task_text(i: int) -> str:
+    return f"bench task {i} {WORDS[i % len(WORDS)]}"
+
+
+def run_case(case: Case, iterations: int, max_seconds: float) -> dict:
+    """Call <case> until <iterations> calls or <max_seconds> have passed"""
+    for _ in range(min(iterations // 10, 100)):  # warm caches and indexes
+        case()
+    durations = []
+    deadline = perf_counter() + max_seconds
+    while len(durations) < iterations and perf_counter() < deadline:
+        start = perf_counter()
+        case()
+        durations.append(perf_counter() - start)
+    return summarize(durations)
+
+
+# SEEDING
+def seed_database(current: int, size: int) -> list[int]:
+    """Grow the SQLite task table from <current> to <size> rows; return the
+    new task_ids"""
+    from data.init import db
+    from service import task
+
+    ids = []
+    for start in range(current, size, SEED_BATCH):
+        stop = min(start + SEED_BATCH, size)
+        with db.transaction():
+            # Write cases advance AUTOINCREMENT; fetch back the ids it gave
+            (last_id,) = db.fetchone("SELECT COALESCE(MAX(task_id), 0) FROM task")
+            rows = [(task_text(i),) for i in range(start, stop)]
+            db.executemany("INSERT INTO task (task) VALUES (?)", rows)
+            qry = "SELECT task_id FROM task WHERE task_id > ? ORDER BY task_id"
+            ids += [task_id for (task_id,) in db.fetchall(qry, (last_id,))]
+    task.changed()
+    return ids
+
+
+def seed_fake(current: int, size: int) -> list[int]:
+    """Grow the fake task store from <current> to <size> tasks; return the
+    new task_ids"""
+    from fake import task
+    from model.task import TaskCreate
+
+    return [
+        task.create_task(TaskCreate(task=task_text(i))).task_id
+        for i in range(current, size)
+    ]
+
+
+# CASES
+def data_cases(ids: list[int], rng: random.Random, module=None) -> dict[str, Case]:
+    from model.task import TaskCreate
+
+    if module is None:
+        from data import task as module
+    serial = count()
+
+    def create_delete() -> None:
+        created = module.create_task(TaskCreate(task=f"bench write {next(serial)}"))
+        module.delete_task(created.task_id)
+
+    return {
+        "get_single_task": lambda: module.get_single_task(rng.choice(ids)),
+        "get_all_tasks": lambda: module.get_all_tasks(PAGE, rng.choice(ids)),
+        "search_tasks": lambda: module.search_tasks(rng.choice(WORDS), PAGE),
+        "create_delete_task": create_delete,
+    }
+
+
+def fake_cases(ids: list[int], rng: random.Random) -> dict[str, Case]:
+    from fake import task
+
+    return data_cases(ids, rng, task)
+
+
+def service_cases(ids: list[int], rng: random.Random) -> dict[str, Case]:
+    from service import task
+
+    # A small hot set, so the single-task cache sees repeat reads
+    hot = rng.sample(ids, min(len(ids), 100))
+    return {
+        "get_single_task_cached": lambda: task.get_single_task(rng.choice(hot)),
+        "get_all_tasks": lambda: task.get_all_tasks(PAGE, rng.choice(ids)),
+        "suggest_tasks": lambda: task.suggest_tasks(f"bench task {rng.randint(1, 99)}"),
+    }
+
+
+def http_cases(ids: list[int], rng: random.Random, client) -> dict[str, Case]:
+    from web.page import encode_cursor
+
+    serial = count()
+
+    def create_delete() -> None:
+        resp = client.post("/task", json={"task": f"bench http {next(serial)}"})
+        client.delete(f"/task/{resp.json()['task_id']}")
+
+    return {
+        "GET /task/{id}": lambda: client.get(f"/task/{rng.choice(ids)}"),
+        "GET /task": lambda: client.get(
+            "/task", params={"limit": PAGE, "after": encode_cursor(rng.choice(ids))}
+        ),
+        "GET /task/suggest": lambda: client.get(
+            "/task/suggest", params={"prefix": f"bench task {rng.randint(1, 99)}"}
+        ),
+        "POST+DELETE /task": create_delete,
+    }
+
+
+def run_suite(
+    layers: list[str], sizes: list[int], iterations: int, max_seconds: float
+) -> dict[str, dict]:
+    """Return a summary per "layer.case[size]" """
+    results = {}
+    rng = random.Random(1234)
+    client = None
+    if "http" in layers:
+        from fastapi.testclient import TestClient
+        from main import app
+
+        client = TestClient(app).__enter__()  # runs the lifespan
+    seeded: dict[str, list[int]] = {"data": [], "fake": []}
+    try:
+        for size in sorted(sizes):
+            for layer in layers:
+                store = "fake" if layer == "fake" else "data"
+                ids = seeded[store]
+                if len(ids) < size:
+                    print(f"seeding {store} to {size:,} rows", file=sys.stderr)
+                    seed = seed_fake if store == "fake" else seed_database
+                    ids += seed(len(ids), size)
+                if layer == "http":
+                    cases = http_cases(ids, rng, client)
+                else:
+                    cases = globals()[f"{layer}_cases"](ids, rng)
+                for name, case in cases.items():
+                    key = f"{layer}.{name}[{size}]"
+                    results[key] = run_case(case, iterations, max_seconds)
+                    print_row(key, results[key])
+    finally:
+        if client:
+            client.__exit__(None, None, None)
+    return results
+
+
+# REPORTING
+def print_row(key: str, summary: dict, note: str = "") -> None:
+    print(
+        f"{key:<48}{summary['ops']:>12,.1f}{summary['p50_ms']:>11.3f}"
+        f"{summary['p99_ms']:>11.3f}  {note}"
+    )
+
+
+def metadata() -> dict:
+    return {
+        "date": datetime.now(timezone.utc).isoformat(timespec="seconds"),
+        "python": platform.python_version(),
+        "sqlite": sqlite_version,
+        "machine": platform.machine(),
+    }
+
+
+def main(argv: list[str] | None = None) -> int:
+    parser = argparse.ArgumentParser(description=__doc__.split("\n")[0])
+    parser.add_argument("--layers", nargs="+", choices=LAYERS, default=list(LAYERS))
+    parser.add_argument("--sizes", nargs="+", type=int, default=list(SIZES))
+    parser.add_argument("--iterations", type=int, default=1000)
+    parser.add_argument("--max-seconds", type=float, default=2.0)
+    parser.add_argument("--save", metavar="PATH", help="write results as JSON")
+    parser.add_argument("--compare", metavar="PATH", help="baseline JSON to check")
+    parser.add_argument("--threshold", type=float, default=0.2)
+    args = parser.parse_args(argv)
+
+    print(f"{'case':<48}{'ops/s':>12}{'p50 ms':>11}{'p99 ms':>11}")
+    results = run_suite(args.layers, args.sizes, args.iterations, args.max_seconds)
+    if args.save:
+        with open(args.save, "w") as f:
+            json.dump({"meta": metadata(), "results": results}, f, indent=2)
+    if not args.compare:
+        return 0
+    with open(args.compare) as f:
+        baseline = json.load(f)["results"]
+    regressions = compare(baseline, results, args.threshold)
+    print(f"\nagainst {args.compare} (threshold {args.threshold:.0%}):")
+    for key in results:
+        if key in baseline:
+            note = "REGRESSION" if key in regressions else "ok"
+            print_row(key, results[key], f"{note} (was {baseline[key]['p50_ms']} ms)")
+    return 1 if regressions else 0
+
+
+if __name__ == "__main__":
+    sys.exit(main())
@@ -0,0 +1,51 @@
+"""Executor-backed async access to the SQLite data layer"""
+
+import asyncio
+import os
+from collections.abc import Callable
+from concurrent.futures import Future, ThreadPoolExecutor
+from contextvars import copy_context
+from functools import partial
+from threading import Lock
+from typing import Any
+
+from .init import db
+
+_executor: ThreadPoolExecutor | None = None
+_lock = Lock()
+
+
+def executor() -> ThreadPoolExecutor:
+    """Return the database executor, starting it on first use"""
+    global _executor
+    with _lock:
+        if not _executor:
+            # Sized to the connection pool: more threads would only queue on
+            # checkout
+            _executor = ThreadPoolExecutor(
+                max_workers=int(os.getenv("TODO_DB_THREADS", db.pool_size)),
+                thread_name_prefix="todo-db",
+            )
+        return _executor
+
+
+def shutdown() -> None:
+    """Stop the executor once its queued calls finish; the next call starts
+    a new one"""
+    global _executor
+    with _lock:
+        stopping, _executor = _executor, None
+    if stopping:
+        stopping.shutdown()
+
+
+def submit(func: Callable, *args, **kwargs) -> Future:
+    """Start blocking <func> on the database executor, in the caller's
+    context"""
+    call = partial(copy_context().run, func, *args, **kwargs)
+    return executor().submit(call)
+
+
+async def run(func: Callable, *args, **kwargs) -> Any:
+    """Await blocking <func> on the database executor"""
+    return await asyncio.wrap_future(submit(func, *args, **kwargs))
@@ -0,0 +1,6 @@
+"""Python equivalents of the SQLite collations the schema uses"""
+
+import string
+
+# NOCASE only folds ASCII: "Straße" and "STRASSE" stay distinct
+NOCASE = str.maketrans(string.ascii_uppercase, string.ascii_lowercase)
@@ -1,15 +1,243 @@
 """Initialize SQLite database"""
 
+from collections.abc import Callable, Iterable, Iterator
+from contextlib import AbstractContextManager, contextmanager, nullcontext
+from functools import partial
 from pathlib import Path
-from sqlite3 import connect, Connection, Cursor, IntegrityError
+from sqlite3 import connect, sqlite_version_info, Connection, Cursor, IntegrityError
+from threading import Condition, RLock, local
+from time import monotonic, perf_counter
 import os
 
+from error import PoolTimeout
+
+WRITE_VERBS = ("INSERT", "UPDATE", "DELETE", "REPLAC")
+# INSERT/UPDATE ... RETURNING arrived in SQLite 3.35
+SUPPORTS_RETURNING = sqlite_version_info >= (3, 35, 0)
+
+
+def open_connection(db_name: str) -> Connection:
+    """Open an autocommit connection: nothing starts a transaction implicitly,
+    so reads never commit and writes need an explicit BEGIN to be grouped"""
+    conn = connect(db_name, check_same_thread=False, isolation_level=None)
+    if db_name != ":memory:":
+        # WAL lets readers on other connections run alongside a writer
+        conn.execute("PRAGMA journal_mode=WAL")
+    return conn
+
+
+def is_write(query: str) -> bool:
+    return query.lstrip()[:6].upper() in WRITE_VERBS
+
+
+class Result:
+    """Rows and counters of a statement, read before its group commit"""
+
+    def __init__(self, curs: Cursor):
+        self._rows = iter(curs.fetchall())
+        self.rowcount = curs.rowcount
+        self.lastrowid = curs.lastrowid
+
+    def fetchone(self):
+        return next(self._rows, None)
+
+    def fetchall(self) -> list:
+        return list(self._rows)
+
+    def close(self) -> None:
+        pass
+
+
+class _Batch:
+    def __init__(self):
+        self.done = False
+        self.error: Exception | None = None
+
+
+class GroupCommit:
+    """Share one COMMIT among writes that arrive within <window> seconds.
+
+    The first writer opens a transaction on a dedicated connection, runs its
+    statement and waits out the window while later writers run theirs in the
+    same transaction. It then commits for everyone. A write returns only
+    after the commit that covers it."""
+
+    def __init__(self, db_name: str, window: float):
+        self.db_name = db_name
+        self.window = window
+        self._conn: Connection | None = None
+        self._cond = Condition()
+        self._batch: _Batch | None = None
+        self._commits = 0
+        self._writes = 0
+
+    def execute(self, query: str, params, many: bool = False) -> Result:
+        with self._cond:
+            if not self._conn:
+                self._conn = open_connection(self.db_name)
+            batch = self._batch
+            leader = batch is None
+            if leader:
+                self._conn.execute("BEGIN IMMEDIATE")
+                batch = self._batch = _Batch()
+            self._writes += 1
+            result, error = None, None
+            try:
+                run = self._conn.executemany if many else self._conn.execute
+                result = Result(run(query, params))
+            except Exception as exc:  # only this statement is undone
+                error = exc
+            if leader:
+                deadline = monotonic() + self.window
+                while (remaining := deadline - monotonic()) > 0:
+                    self._cond.wait(remaining)
+                self._batch = None
+                try:
+                    if self._conn.in_transaction:
+                        self._conn.execute("COMMIT")
+                except Exception as exc:
+                    if self._conn.in_transaction:
+                        self._conn.execute("ROLLBACK")
+                    batch.error = exc
+                batch.done = True
+                self._commits += 1
+                self._cond.notify_all()
+            else:
+                while not batch.done:
+                    self._cond.wait()
+        if batch.error:
+            raise batch.error
+        if error:
+            raise error
+        return result
+
+    def close(self) -> None:
+        with self._cond:
+            if self._conn:
+                self._conn.close()
+            self._conn = None
+
+    def stats(self) -> dict:
+        with self._cond:
+            return {
+                "window_ms": self.window * 1000,
+                "commits": self._commits,
+                "writes": self._writes,
+            }
+
+
+class ConnectionPool:
+    """Bounded set of SQLite connections, each leased to one thread at a time"""
+
+    def __init__(self, db_name: str, size: int = 5, timeout: float = 5.0):
+        self.db_name = db_name
+        # Every connection to ":memory:" is a separate database
+        self.size = 1 if db_name == ":memory:" else max(size, 1)
+        self.timeout = timeout
+        self._all: list[Connection] = []
+        self._idle: list[Connection] = []
+        self._leased: dict[int, float] = {}
+        self._cond = Condition()
+        self._checkouts = 0
+        self._waits = 0
+        self._timeouts = 0
+        self._max_wait = 0.0
+        self._max_lease = 0.0
+
+    def _open(self) -> Connection:
+        return open_connection(self.db_name)
+
+    def checkout(self, timeout: float | None = None) -> Connection:
+        """Lease an idle connection, opening one if the pool is not full"""
+        timeout = self.timeout if timeout is None else timeout
+        start = monotonic()
+        with self._cond:
+            waited = False
+            while not self._idle and len(self._all) >= self.size:
+                remaining = start + timeout - monotonic()
+                if remaining <= 0:
+                    self._timeouts += 1
+                    raise PoolTimeout(timeout)
+                waited = True
+                self._cond.wait(remaining)
+            if self._idle:
+                conn = self._idle.pop()
+            else:
+                conn = self._open()
+                self._all.append(conn)
+            now = monotonic()
+            self._checkouts += 1
+            if waited:
+                self._waits += 1
+                self._max_wait = max(self._max_wait, now - start)
+            self._leased[id(conn)] = now
+            return conn
+
+    def checkin(self, conn: Connection) -> None:
+        """Return a leased connection to the pool"""
+        with self._cond:
+            leased_at = self._leased.pop(id(conn), None)
+            if leased_at is not None:
+                self._max_lease = max(self._max_lease, monotonic() - leased_at)
+            if conn not in self._all:  # pool was closed during the lease
+                conn.close()
+                return
+            if conn.in_transaction:
+                conn.rollback()
+            self._idle.append(conn)
+            self._cond.notify()
+
+    def fill(self) -> None:
+        """Open connections until the pool is full"""
+        with self._cond:
+            while len(self._all) < self.size:
+                conn = self._open()
+                self._all.append(conn)
+                self._idle.append(conn)
+            self._cond.notify_all()
+
+    def close(self) -> None:
+        with self._cond:
+            for conn in self._idle:
+                conn.close()
+            self._all.clear()
+            self._idle.clear()
+            self._cond.notify_all()
+
+    def stats(self) -> dict:
+        with self._cond:
+            return {
+                "size": self.size,
+                "open": len(self._all),
+                "idle": len(self._idle),
+                "in_use": len(self._leased),
+                "checkouts": self._checkouts,
+                "waits": self._waits,
+                "timeouts": self._timeouts,
+                "max_wait_ms": round(self._max_wait * 1000, 3),
+                "max_lease_ms": round(self._max_lease * 1000, 3),
+            }
+
 
 class Database:
+    """SQLite access through a connection pool, opened on first use.
+
+    Constructing one touches nothing: the file name is resolved, the pool
+    opened and the registered schema created when it is first connected."""
+
     def __init__(self, db_name: str | None = None):
-        self.conn: Connection | None = None
-        self.curs: Cursor | None = None
-        self.db_name = db_name or self._get_default_db_name()
+        self.pool: ConnectionPool | None = None
+        self.db_name = db_name
+        self.pool_size = int(os.getenv("TODO_SQLITE_POOL_SIZE", 5))
+        self.pool_timeout = float(os.getenv("TODO_SQLITE_POOL_TIMEOUT", 5))
+        self.group_commit_ms = float(os.getenv("TODO_SQLITE_GROUP_COMMIT_MS", 0))
+        self.group: GroupCommit | None = None
+        # Called with (query, params, seconds) after each statement, if any
+        self.observers: list[Callable[[str, tuple | dict, float], None]] = []
+        self._schemas: list[Callable[[], None]] = []
+        self._connecting = RLock()
+        self.ready = False
+        self._local = local()
 
     def _get_default_db_name(self) -> str:
         top_dir = Path(__file__).resolve().parents[1]  # repo top
@@ -18,38 +246,187 @@ class Database:
         db_path = str(db_dir / db_name)
         return os.getenv("TODO_SQLITE_DB", db_path)
 
+    def schema(self, create: Callable[[], None]) -> Callable[[], None]:
+        """Register <create> to set up tables whenever the database is
+        connected; run it now if it already is"""
+        with self._connecting:
+            self._schemas.append(create)
+            if self.pool:
+                create()
+        return create
+
     def connect(self, reset: bool = False):
-        if self.conn and not reset:
-            return
-        if self.conn:
-            self.close()
-        self.conn = connect(self.db_name, check_same_thread=False)
-        self.curs = self.conn.cursor()
+        # Other threads wait here until the schema exists; the schema
+        # statements themselves re-enter on this thread and see the pool
+        with self._connecting:
+            if self.pool and not reset:
+                return
+            if self.pool:
+                self.close()
+            self.db_name = self.db_name or self._get_default_db_name()
+            self.pool = ConnectionPool(self.db_name, self.pool_size, self.pool_timeout)
+            if self.group_commit_ms > 0 and self.db_name != ":memory:":
+                self.group = GroupCommit(self.db_name, self.group_commit_ms / 1000)
+            for create in self._schemas:
+                create()
+            self.ready = True
+
+    def warm(self) -> None:
+        """Open every pooled connection now rather than on first use"""
+        self.connect()
+        self.pool.fill()
 
     def close(self):
-        if self.curs:
-            self.curs.close()
-        if self.conn:
-            self.conn.close()
-        self.conn = None
-        self.curs = None
-
-    def execute(self, query: str, params: tuple = ()):
-        if not self.conn:
+        with self._connecting:
+            self.ready = False
+            if self.pool:
+                self.pool.close()
+            if self.group:
+                self.group.close()
+            self.pool = None
+            self.group = None
+
+    @contextmanager
+    def connection(self) -> Iterator[Connection]:
+        """Lease a pooled connection to the calling thread.
+
+        Nested calls on the same thread reuse the outer lease."""
+        if conn := getattr(self._local, "conn", None):
+            yield conn
+            return
+        if not self.ready:
             self.connect()
-        self.curs.execute(query, params)
-        self.conn.commit()
-        return self.curs
+        pool = self.pool
+        conn = pool.checkout()
+        self._local.conn = conn
+        try:
+            yield conn
+        finally:
+            self._local.conn = None
+            pool.checkin(conn)
 
-    def fetchall(self) -> list:
-        return self.curs.fetchall()
+    @contextmanager
+    def transaction(self) -> Iterator[Connection]:
+        """Run the enclosed statements as one write transaction.
 
-    def fetchone(self):
-        return self.curs.fetchone()
+        Nested calls join the outer transaction."""
+        with self.connection() as conn:
+            if getattr(self._local, "txn", False):
+                yield conn
+                return
+            conn.execute("BEGIN IMMEDIATE")
+            self._local.txn = True
+            try:
+                yield conn
+            except BaseException:
+                conn.rollback()
+                raise
+            else:
+                conn.commit()
+            finally:
+                self._local.txn = False
+
+    def _grouped(self, query: str) -> bool:
+        """Whether <query> should join a group commit"""
+        if not self.ready:
+            self.connect()
+        in_txn = getattr(self._local, "txn", False)
+        return bool(self.group) and not in_txn and is_write(query)
+
+    @contextmanager
+    def _timing(self, query: str, params) -> Iterator[None]:
+        start = perf_counter()
+        try:
+            yield
+        finally:
+            elapsed = perf_counter() - start
+            for observer in self.observers:
+                observer(query, params, elapsed)
+
+    def _execute(self, query: str, params: tuple | dict) -> Cursor | Result:
+        if self._grouped(query):
+            return self.group.execute(query, params)
+        with self.connection() as conn:
+            return conn.execute(query, params)
+
+    def execute(self, query: str, params: tuple | dict = ()) -> Cursor | Result:
+        """Run <query>; outside a transaction a write commits on its own"""
+        if not self.observers:
+            return self._execute(query, params)
+        with self._timing(query, params):
+            return self._execute(query, params)
+
+    def executemany(self, query: str, seq_of_params: Iterable) -> Cursor | Result:
+        if self._grouped(query):
+            run = partial(self.group.execute, many=True)
+        else:
+            run = self._executemany
+        if not self.observers:
+            return run(query, seq_of_params)
+        with self._timing(query, ()):
+            return run(query, seq_of_params)
+
+    def _executemany(self, query: str, seq_of_params: Iterable) -> Cursor:
+        with self.connection() as conn:
+            return conn.executemany(query, seq_of_params)
+
+    def _reading(self, query: str) -> AbstractContextManager:
+        """Hold a lease while <query>'s rows are read, unless it is a write
+        that the group commit runs on its own connection"""
+        return nullcontext() if self._grouped(query) else self.connection()
+
+    def fetchall(self, query: str, params: tuple | dict = ()) -> list:
+        # Timed here rather than in execute, to include reading the rows
+        with self._reading(query):
+            if not self.observers:
+                return self._execute(query, params).fetchall()
+            with self._timing(query, params):
+                return self._execute(query, params).fetchall()
+
+    def fetchone(self, query: str, params: tuple | dict = ()):
+        with self._reading(query):
+            if not self.observers:
+                return self._fetchone(query, params)
+            with self._timing(query, params):
+                return self._fetchone(query, params)
+
+    def _fetchone(self, query: str, params: tuple | dict):
+        curs = self._execute(query, params)
+        row = curs.fetchone()
+        # Reset the statement so a write ... RETURNING completes now
+        curs.close()
+        return row
+
+    def explain(self, query: str, params: tuple | dict = ()) -> list[str]:
+        """Return the EXPLAIN QUERY PLAN lines of <query>, unobserved"""
+        with self.connection() as conn:
+            rows = conn.execute(f"EXPLAIN QUERY PLAN {query}", params).fetchall()
+        return [detail for (_, _, _, detail) in rows]
+
+    def stream(
+        self, query: str, params: tuple | dict = (), size: int = 1000
+    ) -> Iterator[list]:
+        """Yield the rows of <query> in fetchmany chunks of <size>.
+
+        The generator holds its own lease rather than the thread's, since a
+        streaming response may resume it on a different thread each time."""
+        if not self.ready:
+            self.connect()
+        pool = self.pool
+        conn = pool.checkout()
+        try:
+            curs = conn.execute(query, params)
+            while rows := curs.fetchmany(size):
+                yield rows
+            curs.close()
+        finally:
+            pool.checkin(conn)
 
-    def lastrowid(self):
-        return self.curs.lastrowid
+    def stats(self) -> dict:
+        stats = self.pool.stats() if self.pool else {}
+        if self.group:
+            stats["group_commit"] = self.group.stats()
+        return stats
 
 
 db = Database()
-db.connect()
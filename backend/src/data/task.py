@@ -1,12 +1,70 @@
-from .init import db, IntegrityError
+import re
+from collections.abc import Iterator
+from .collation import NOCASE
+from .init import db, IntegrityError, SUPPORTS_RETURNING
+from .version import Version
 from model.task import Task, TaskCreate
 from error import MissingTask, DuplicateTask
 
-db.execute(
-    """CREATE TABLE IF NOT EXISTS task (
-    task_id INTEGER PRIMARY KEY AUTOINCREMENT,
-    task TEXT NOT NULL UNIQUE COLLATE NOCASE)"""
-)
+
+def rebuild_search_index() -> None:
+    """Reindex every task, e.g. for a database written before the index"""
+    db.execute("INSERT INTO task_fts (task_fts) VALUES ('rebuild')")
+
+
+@db.schema
+def create_tables() -> None:
+    db.execute(
+        """CREATE TABLE IF NOT EXISTS task (
+        task_id INTEGER PRIMARY KEY AUTOINCREMENT,
+        task TEXT NOT NULL UNIQUE COLLATE NOCASE)"""
+    )
+    # Full-text index over the task text. It stores no copy of the text
+    # (content='task'); the triggers keep it in step with every write.
+    fts_exists = db.fetchone(
+        "SELECT 1 FROM sqlite_master WHERE type = 'table' AND name = 'task_fts'"
+    )
+    db.execute(
+        """CREATE VIRTUAL TABLE IF NOT EXISTS task_fts USING fts5(
+        task,
+        content='task',
+        content_rowid='task_id',
+        tokenize='unicode61 remove_diacritics 2',
+        prefix='2 3')"""
+    )
+    db.execute(
+        """CREATE TRIGGER IF NOT EXISTS task_fts_insert AFTER INSERT ON task BEGIN
+        INSERT INTO task_fts (rowid, task) VALUES (new.task_id, new.task);
+        END"""
+    )
+    db.execute(
+        """CREATE TRIGGER IF NOT EXISTS task_fts_delete AFTER DELETE ON task BEGIN
+        INSERT INTO task_fts (task_fts, rowid, task)
+        VALUES ('delete', old.task_id, old.task);
+        END"""
+    )
+    db.execute(
+        """CREATE TRIGGER IF NOT EXISTS task_fts_update AFTER UPDATE OF task ON task
+        BEGIN
+        INSERT INTO task_fts (task_fts, rowid, task)
+        VALUES ('delete', old.task_id, old.task);
+        INSERT INTO task_fts (rowid, task) VALUES (new.task_id, new.task);
+        END"""
+    )
+    if not fts_exists:
+        rebuild_search_index()
+
+
+# Bumped by every write; the web layer derives ETags from it
+version = Version()
+
+
+def match_expression(q: str) -> str | None:
+    """Return an FTS5 query matching tasks with words starting with each
+    word of <q>, or None if <q> has no words"""
+    # Quoted, so user input can never be read as FTS5 query syntax
+    terms = re.findall(r"\w+", q)
+    return " ".join(f'"{term}"*' for term in terms) or None
 
 
 def row_to_model(row: tuple) -> Task:
@@ -21,31 +79,84 @@ def model_to_dict(task: Task | TaskCreate) -> dict:
 def get_single_task(task_id: int) -> Task:
     qry = "SELECT * FROM task WHERE task_id = :task_id"
     params = {"task_id": task_id}
-    db.execute(qry, params)
-    row = db.fetchone()
+    row = db.fetchone(qry, params)
     if not row:
         raise MissingTask(task_id)
     return row_to_model(row)
 
 
-def get_all_tasks() -> list[Task]:
-    qry = "SELECT * FROM task"
-    db.execute(qry)
-    rows = db.fetchall()
+def get_all_tasks(limit: int | None = None, after: int | None = None) -> list[Task]:
+    """Return up to <limit> tasks with task_id greater than <after>"""
+    qry = """SELECT * FROM task
+             WHERE task_id > :after
+             ORDER BY task_id
+             LIMIT :limit"""
+    params = {"after": after or 0, "limit": -1 if limit is None else limit}
+    rows = db.fetchall(qry, params)
     return [row_to_model(row) for row in rows]
 
 
+def search_tasks(
+    q: str, limit: int | None = None, after: tuple[float, int] | None = None
+) -> list[tuple[float, Task]]:
+    """Return up to <limit> (rank, task) pairs matching <q>, best first,
+    ordered after the (rank, task_id) key <after>"""
+    if not (match := match_expression(q)):
+        return []
+    qry = """SELECT f.rank, t.task_id, t.task
+             FROM task_fts AS f JOIN task AS t ON t.task_id = f.rowid
+             WHERE task_fts MATCH :match
+               AND (f.rank > :rank OR (f.rank = :rank AND t.task_id > :after))
+             ORDER BY f.rank, t.task_id
+             LIMIT :limit"""
+    rank, task_id = after or (float("-inf"), 0)
+    params = {
+        "match": match,
+        "rank": rank,
+        "after": task_id,
+        "limit": -1 if limit is None else limit,
+    }
+    return [(row[0], row_to_model(row[1:])) for row in db.fetchall(qry, params)]
+
+
+def iter_task_chunks(size: int = 1000) -> Iterator[list[tuple]]:
+    """Yield raw (task_id, task) rows in chunks without loading the table"""
+    qry = "SELECT task_id, task FROM task ORDER BY task_id"
+    return db.stream(qry, size=size)
+
+
+@version.writes
 def create_task(task: TaskCreate) -> Task:
     qry = "INSERT INTO task (task) VALUES (:task)"
     params = model_to_dict(task)
     try:
-        db.execute(qry, params)
-        task_id = db.lastrowid()
-        return get_single_task(task_id)
+        if SUPPORTS_RETURNING:
+            return row_to_model(db.fetchone(qry + " RETURNING *", params))
+        task_id = db.execute(qry, params).lastrowid
     except IntegrityError:
         raise DuplicateTask(task)
-
-
+    return get_single_task(task_id)
+
+
+@version.writes
+def create_tasks(tasks: list[TaskCreate]) -> list[Task | DuplicateTask]:
+    """Insert <tasks> in one transaction; duplicates come back as DuplicateTask"""
+    qry = "INSERT OR IGNORE INTO task (task) VALUES (:task)"
+    with db.transaction():
+        # AUTOINCREMENT ids only grow, so new rows are exactly those above this
+        (last_id,) = db.fetchone("SELECT COALESCE(MAX(task_id), 0) FROM task")
+        db.executemany(qry, [model_to_dict(task) for task in tasks])
+        rows = db.fetchall(
+            "SELECT * FROM task WHERE task_id > :last_id", {"last_id": last_id}
+        )
+    created = {row[1].translate(NOCASE): row_to_model(row) for row in rows}
+    return [
+        created.pop(task.task.translate(NOCASE), None) or DuplicateTask(task)
+        for task in tasks
+    ]
+
+
+@version.writes
 def modify_task(task_id: int, modified_task: TaskCreate) -> Task:
     qry = """UPDATE task
              SET task = :task
@@ -53,14 +164,19 @@ def modify_task(task_id: int, modified_task: TaskCreate) -> Task:
     params = model_to_dict(modified_task)
     params["task_id"] = task_id
     try:
+        if SUPPORTS_RETURNING:
+            if not (row := db.fetchone(qry + " RETURNING *", params)):
+                raise MissingTask(task_id)
+            return row_to_model(row)
         res = db.execute(qry, params)
-        if res.rowcount == 0:
-            raise MissingTask(task_id)
-        return get_single_task(task_id)
     except IntegrityError:
         raise DuplicateTask(modified_task)
+    if res.rowcount == 0:
+        raise MissingTask(task_id)
+    return get_single_task(task_id)
 
 
+@version.writes
 def delete_task(task_id: int) -> None:
     qry = "DELETE FROM task WHERE task_id = :task_id"
     params = {"task_id": task_id}
@@ -69,6 +185,7 @@ def delete_task(task_id: int) -> None:
         raise MissingTask(task_id)
 
 
+@version.writes
 def delete_all_tasks() -> None:
     qry = "DELETE FROM task"
     db.execute(qry)
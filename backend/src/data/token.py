@@ -0,0 +1,37 @@
+from .init import db
+
+
+@db.schema
+def create_tables() -> None:
+    db.execute(
+        """CREATE TABLE IF NOT EXISTS revoked_token (
+                jti TEXT PRIMARY KEY,
+                expires REAL NOT NULL)"""
+    )
+
+
+def revoke_token(jti: str, expires: float) -> None:
+    """Record that the token <jti> is revoked until <expires>"""
+    qry = "INSERT OR IGNORE INTO revoked_token (jti, expires) VALUES (:jti, :expires)"
+    db.execute(qry, {"jti": jti, "expires": expires})
+
+
+def is_revoked(jti: str) -> bool:
+    qry = "SELECT 1 FROM revoked_token WHERE jti = :jti"
+    return db.fetchone(qry, {"jti": jti}) is not None
+
+
+def get_revoked(now: float) -> list[str]:
+    """Return the jti of every revoked token that has not expired by <now>"""
+    qry = "SELECT jti FROM revoked_token WHERE expires > :now"
+    return [jti for (jti,) in db.fetchall(qry, {"now": now})]
+
+
+def purge_expired(now: float) -> int:
+    """Drop revocations of tokens that expired by <now>"""
+    qry = "DELETE FROM revoked_token WHERE expires <= :now"
+    return db.execute(qry, {"now": now}).rowcount
+
+
+def delete_all_revoked() -> None:
+    db.execute("DELETE FROM revoked_token")
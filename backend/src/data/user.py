@@ -1,18 +1,33 @@
-from model.user import User, UserCreate
-from .init import db, IntegrityError
+from model.user import User, UserCreate, UserUpdate
+from .init import db, IntegrityError, SUPPORTS_RETURNING
+from .version import Version
 from error import MissingUser, DuplicateUser
 
-db.execute(
-    """CREATE TABLE IF NOT EXISTS user (
-            user_id INTEGER PRIMARY KEY AUTOINCREMENT,
-            name TEXT NOT NULL UNIQUE COLLATE NOCASE,
-            hash TEXT NOT NULL)"""
-)
+
+@db.schema
+def create_tables() -> None:
+    db.execute(
+        """CREATE TABLE IF NOT EXISTS user (
+                user_id INTEGER PRIMARY KEY AUTOINCREMENT,
+                name TEXT NOT NULL UNIQUE COLLATE NOCASE,
+                hash TEXT NOT NULL,
+                token_version INTEGER NOT NULL DEFAULT 0)"""
+    )
+    # Databases created before tokens were versioned lack the column
+    columns = {row[1] for row in db.fetchall("PRAGMA table_info(user)")}
+    if "token_version" not in columns:
+        db.execute(
+            "ALTER TABLE user ADD COLUMN token_version INTEGER NOT NULL DEFAULT 0"
+        )
+
+
+# Bumped by every write; the web layer derives ETags from it
+version = Version()
 
 
 def row_to_model(row: tuple) -> User:
-    (user_id, name, hash) = row
-    return User(user_id=user_id, name=name, hash=hash)
+    (user_id, name, hash, token_version) = row
+    return User(user_id=user_id, name=name, hash=hash, token_version=token_version)
 
 
 def model_to_dict(user: User | UserCreate) -> dict:
@@ -22,8 +37,7 @@ def model_to_dict(user: User | UserCreate) -> dict:
 def get_single_user(user_id: int) -> User:
     qry = "SELECT * FROM user WHERE user_id = :user_id"
     params = {"user_id": user_id}
-    db.execute(qry, params)
-    row = db.fetchone()
+    row = db.fetchone(qry, params)
     if not row:
         raise MissingUser(user_id)
     return row_to_model(row)
@@ -32,42 +46,61 @@ def get_single_user(user_id: int) -> User:
 def get_user_by_name(name: str) -> User:
     qry = "SELECT * FROM user WHERE name = :name"
     params = {"name": name}
-    db.execute(qry, params)
-    row = db.fetchone()
+    row = db.fetchone(qry, params)
     if not row:
         raise MissingUser(name)
     return row_to_model(row)
 
 
-def get_all_users() -> list[User]:
-    qry = "SELECT * FROM user"
-    db.execute(qry)
-    return [row_to_model(row) for row in db.fetchall()]
+def get_all_users(limit: int | None = None, after: int | None = None) -> list[User]:
+    """Return up to <limit> users with user_id greater than <after>"""
+    qry = """SELECT * FROM user
+             WHERE user_id > :after
+             ORDER BY user_id
+             LIMIT :limit"""
+    params = {"after": after or 0, "limit": -1 if limit is None else limit}
+    return [row_to_model(row) for row in db.fetchall(qry, params)]
 
 
+@version.writes
 def create_user(user: UserCreate) -> User:
     """Add <user> to user table"""
     qry = "INSERT INTO user (name, hash) VALUES (:name, :hash)"
     params = model_to_dict(user)
     try:
-        db.execute(qry, params)
-        user_id = db.lastrowid()
-        return get_single_user(user_id)
+        if SUPPORTS_RETURNING:
+            return row_to_model(db.fetchone(qry + " RETURNING *", params))
+        user_id = db.execute(qry, params).lastrowid
     except IntegrityError:
         raise DuplicateUser(user)
+    return get_single_user(user_id)
 
 
-def modify_user(user_id: int, user: User) -> User:
+@version.writes
+def modify_user(user_id: int, user: UserUpdate) -> User:
+    """Update the fields of <user> that are set.
+
+    Any change bumps token_version, invalidating tokens issued before it."""
     qry = """UPDATE user
-             SET name = :name, hash = :hash
+             SET name = COALESCE(:name, name),
+                 hash = COALESCE(:hash, hash),
+                 token_version = token_version + 1
              WHERE user_id = :user_id"""
     params = {"user_id": user_id, "name": user.name, "hash": user.hash}
-    res = db.execute(qry, params)
+    try:
+        if SUPPORTS_RETURNING:
+            if not (row := db.fetchone(qry + " RETURNING *", params)):
+                raise MissingUser(user_id)
+            return row_to_model(row)
+        res = db.execute(qry, params)
+    except IntegrityError:
+        raise DuplicateUser(user)
     if res.rowcount == 0:
         raise MissingUser(user_id)
     return get_single_user(user_id)
 
 
+@version.writes
 def delete_user(user_id: int) -> None:
     """Drop user with <user_id> from user table"""
     qry = "DELETE FROM user WHERE user_id = :user_id"
@@ -77,6 +110,7 @@ def delete_user(user_id: int) -> None:
         raise MissingUser(user_id)
 
 
+@version.writes
 def delete_all_users() -> None:
     """Drop all users from user table"""
     qry = "DELETE FROM user"
@@ -0,0 +1,32 @@
+"""Write versions for the task and user collections"""
+
+from collections.abc import Callable
+from functools import wraps
+from threading import Lock
+
+
+class Version:
+    """Counter bumped after every write to a collection"""
+
+    def __init__(self):
+        self.value = 0
+        self._lock = Lock()
+
+    def bump(self) -> None:
+        with self._lock:
+            self.value += 1
+
+    def writes(self, func: Callable) -> Callable:
+        """Bump the version once <func> has run, even if it raised.
+
+        A spurious bump only costs a client one refetch; a missed one
+        would let it keep stale data."""
+
+        @wraps(func)
+        def wrapper(*args, **kwargs):
+            try:
+                return func(*args, **kwargs)
+            finally:
+                self.bump()
+
+        return wrapper
@@ -28,3 +28,34 @@ class MissingUser(Exception):
             self.msg = f'User with name "{name}" not found'
         else:
             self.msg = "User not found"
+
+
+# Database exceptions
+class PoolTimeout(Exception):
+    def __init__(self, timeout: float):
+        self.msg = f"No database connection available after {timeout}s"
+
+
+# Batch exceptions
+class InvalidOperation(Exception):
+    def __init__(self, detail: str):
+        self.msg = f"Invalid operation: {detail}"
+
+
+# Capacity exceptions
+class Overloaded(Exception):
+    def __init__(self, retry_after: int):
+        self.msg = "Server is busy, try again later"
+        self.retry_after = retry_after
+
+
+class HashUnavailable(Overloaded):
+    def __init__(self, retry_after: int):
+        super().__init__(retry_after)
+        self.msg = "Password hashing is unavailable, try again later"
+
+
+# Diagnostics exceptions
+class ProfilerBusy(Exception):
+    def __init__(self):
+        self.msg = "A profile is already running"
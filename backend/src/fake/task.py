@@ -1,29 +1,46 @@
+import re
+from bisect import bisect_left, bisect_right
+from collections.abc import Iterator
 from model.task import Task, TaskCreate
+from data.collation import NOCASE
+from data.version import Version
 from error import MissingTask, DuplicateTask
 
-_tasks: list[Task] = []
+# Tasks by id, their ids in order for paging, and a unique index on the
+# text folded as NOCASE folds it
+_tasks: dict[int, Task] = {}
+_ids: list[int] = []
+_ids_by_text: dict[str, int] = {}
+# Like AUTOINCREMENT, ids are never reused, even after a delete
+_last_id = 0
+# Bumped by every write; the web layer derives ETags from it
+version = Version()
+
+
+def fold(text: str) -> str:
+    return text.translate(NOCASE)
 
 
 def find(task_id: int) -> Task | None:
-    for t in _tasks:
-        if t.task_id == task_id:
-            return t
-    return None
+    return _tasks.get(task_id)
 
 
-def check_duplicate(current_task: Task, modified_task: TaskCreate) -> None:
-    if current_task.task == modified_task.task:
-        raise DuplicateTask(modified_task)
+def check_duplicate(task: TaskCreate, task_id: int | None = None) -> None:
+    """Raise DuplicateTask if another task than <task_id> has <task>'s text"""
+    if _ids_by_text.get(fold(task.task), task_id) != task_id:
+        raise DuplicateTask(task)
 
 
 def check_missing(task_id: int) -> None:
-    if not find(task_id):
+    if task_id not in _tasks:
         raise MissingTask(task_id)
 
 
-def get_all_tasks() -> list[Task]:
-    """Return all tasks in database"""
-    return _tasks
+def get_all_tasks(limit: int | None = None, after: int | None = None) -> list[Task]:
+    """Return up to <limit> tasks with task_id greater than <after>"""
+    start = bisect_right(_ids, after or 0)
+    end = None if limit is None else start + limit
+    return [_tasks[task_id] for task_id in _ids[start:end]]
 
 
 def get_single_task(task_id: int) -> Task:
@@ -32,36 +49,84 @@ def get_single_task(task_id: int) -> Task:
     return find(task_id)
 
 
+def search_tasks(
+    q: str, limit: int | None = None, after: tuple[float, int] | None = None
+) -> list[tuple[float, Task]]:
+    """Return up to <limit> (rank, task) pairs whose words start with every
+    word of <q>, ordered after the (rank, task_id) key <after>"""
+    if not (terms := re.findall(r"\w+", q.lower())):
+        return []
+    hits = []
+    for t in _tasks.values():
+        words = re.findall(r"\w+", t.task.lower())
+        if all(any(word.startswith(term) for word in words) for term in terms):
+            hits.append((0.0, t))  # the fake doesn't score relevance
+    hits = [hit for hit in hits if (hit[0], hit[1].task_id) > (after or (0.0, 0))]
+    hits.sort(key=lambda hit: (hit[0], hit[1].task_id))
+    return hits if limit is None else hits[:limit]
+
+
+def iter_task_chunks(size: int = 1000) -> Iterator[list[tuple]]:
+    """Yield (task_id, task) rows in chunks of <size>"""
+    rows = [(t.task_id, t.task) for t in _tasks.values()]
+    for i in range(0, len(rows), size):
+        yield rows[i : i + size]
+
+
+@version.writes
 def create_task(task: TaskCreate) -> Task:
     """Add a new task to the database"""
-    # Determine the next available task_id
-    next_task_id = max(t.task_id for t in _tasks) + 1 if _tasks else 1
-    new_task = Task(task_id=next_task_id, task=task.task)
+    global _last_id
+    check_duplicate(task)
+    _last_id += 1
+    new_task = Task(task_id=_last_id, task=task.task)
+    _tasks[new_task.task_id] = new_task
+    _ids.append(new_task.task_id)  # ids only grow, so this stays sorted
+    _ids_by_text[fold(new_task.task)] = new_task.task_id
+    return new_task
 
-    # Check for duplicates
-    for t in _tasks:
-        check_duplicate(t, new_task)
 
-    _tasks.append(new_task)
-    return new_task
+@version.writes
+def create_tasks(tasks: list[TaskCreate]) -> list[Task | DuplicateTask]:
+    """Add several tasks; duplicates come back as DuplicateTask"""
+    results = []
+    for task in tasks:
+        try:
+            results.append(create_task(task))
+        except DuplicateTask as exc:
+            results.append(exc)
+    return results
 
 
+@version.writes
 def modify_task(task_id: int, modified_task: TaskCreate) -> Task:
     """Modify a task in the database"""
     check_missing(task_id)
-    task = find(task_id)
-    check_duplicate(task, modified_task)
+    check_duplicate(modified_task, task_id)
+    task = _tasks[task_id]
+    del _ids_by_text[fold(task.task)]
     task.task = modified_task.task
+    _ids_by_text[fold(task.task)] = task_id
     return task
 
 
+@version.writes
 def delete_task(task_id: int) -> None:
     """Delete a task from the database"""
     check_missing(task_id)
-    task = find(task_id)
-    _tasks.remove(task)
+    task = _tasks.pop(task_id)
+    del _ids[bisect_left(_ids, task_id)]
+    del _ids_by_text[fold(task.task)]
 
 
+@version.writes
 def delete_all_tasks() -> None:
     """Delete all tasks from the database"""
     _tasks.clear()
+    _ids.clear()
+    _ids_by_text.clear()
+
+
+def collection_version() -> int:
+    """Return the task collection's write version"""
+    return version.value
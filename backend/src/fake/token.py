@@ -0,0 +1,27 @@
+_revoked: dict[str, float] = {}
+
+
+def revoke_token(jti: str, expires: float) -> None:
+    """Record that the token <jti> is revoked until <expires>"""
+    _revoked.setdefault(jti, expires)
+
+
+def is_revoked(jti: str) -> bool:
+    return jti in _revoked
+
+
+def get_revoked(now: float) -> list[str]:
+    """Return the jti of every revoked token that has not expired by <now>"""
+    return [jti for jti, expires in _revoked.items() if expires > now]
+
+
+def purge_expired(now: float) -> int:
+    """Drop revocations of tokens that expired by <now>"""
+    expired = [jti for jti, expires in _revoked.items() if expires <= now]
+    for jti in expired:
+        del _revoked[jti]
+    return len(expired)
+
+
+def delete_all_revoked() -> None:
+    _revoked.clear()
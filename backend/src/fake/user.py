@@ -1,34 +1,48 @@
+from bisect import bisect_left, bisect_right
 from model.user import User, UserCreate, UserUpdate
+from data.collation import NOCASE
+from data.version import Version
 from error import MissingUser, DuplicateUser
 
 
-_users = [
-    User(user_id=1, name="kakra", hash="abc"),
-    User(user_id=2, name="twyla ", hash="xyz"),
-]
+def fold(name: str) -> str:
+    return name.translate(NOCASE)
+
+
+# Users by id, their ids in order for paging, and a unique index on the
+# name folded as NOCASE folds it
+_users: dict[int, User] = {
+    1: User(user_id=1, name="kakra", hash="abc"),
+    2: User(user_id=2, name="twyla ", hash="xyz"),
+}
+_ids: list[int] = sorted(_users)
+_ids_by_name: dict[str, int] = {fold(u.name): u.user_id for u in _users.values()}
+# Like AUTOINCREMENT, ids are never reused, even after a delete
+_last_id = max(_users)
+# Bumped by every write; the web layer derives ETags from it
+version = Version()
 
 
 def find(user_id: int) -> User | None:
-    for user in _users:
-        if user.user_id == user_id:
-            return user
-    return None
+    return _users.get(user_id)
 
 
 def check_missing(user_id: int):
-    if not find(user_id):
+    if user_id not in _users:
         raise MissingUser(user_id)
 
 
-def check_duplicate(user: UserCreate | UserUpdate):
-    for u in _users:
-        if u.name == user.name:
-            raise DuplicateUser(user)
+def check_duplicate(user: UserCreate | UserUpdate, user_id: int | None = None):
+    """Raise DuplicateUser if another user than <user_id> has <user>'s name"""
+    if _ids_by_name.get(fold(user.name), user_id) != user_id:
+        raise DuplicateUser(user)
 
 
-def get_all_users() -> list[User]:
-    """Return all users"""
-    return _users
+def get_all_users(limit: int | None = None, after: int | None = None) -> list[User]:
+    """Return up to <limit> users with user_id greater than <after>"""
+    start = bisect_right(_ids, after or 0)
+    end = None if limit is None else start + limit
+    return [_users[user_id] for user_id in _ids[start:end]]
 
 
 def get_single_user(user_id: int) -> User:
@@ -37,35 +51,63 @@ def get_single_user(user_id: int) -> User:
     return find(user_id)
 
 
+def get_user_by_name(name: str) -> User:
+    """Return the user called <name>"""
+    if (user_id := _ids_by_name.get(fold(name))) is None:
+        raise MissingUser(name=name)
+    return _users[user_id]
+
+
+@version.writes
 def create_user(user: UserCreate) -> User:
     """Add a user"""
+    global _last_id
     check_duplicate(user)
-    new_user = User(user_id=len(_users) + 1, name=user.name, hash=user.hash)
-    _users.append(new_user)
+    _last_id += 1
+    new_user = User(user_id=_last_id, name=user.name, hash=user.hash)
+    _users[new_user.user_id] = new_user
+    _ids.append(new_user.user_id)  # ids only grow, so this stays sorted
+    _ids_by_name[fold(new_user.name)] = new_user.user_id
     return new_user
 
 
+@version.writes
 def modify_user(user_id: int, user: UserUpdate) -> User:
     """Partially modify a user"""
     check_missing(user_id)
-    user_to_modify = find(user_id)
+    user_to_modify = _users[user_id]
 
     if user.name and user.name != user_to_modify.name:
-        check_duplicate(user)
+        check_duplicate(user, user_id)
+        del _ids_by_name[fold(user_to_modify.name)]
         user_to_modify.name = user.name
+        _ids_by_name[fold(user.name)] = user_id
 
     if user.hash:
         user_to_modify.hash = user.hash
 
+    user_to_modify.token_version += 1
+
     return user_to_modify
 
 
+@version.writes
 def delete_user(user_id: int) -> None:
     """Delete a user"""
     check_missing(user_id)
-    _users.remove(find(user_id))
+    user = _users.pop(user_id)
+    del _ids[bisect_left(_ids, user_id)]
+    del _ids_by_name[fold(user.name)]
 
 
+@version.writes
 def delete_all_users() -> None:
     """Delete all users"""
     _users.clear()
+    _ids.clear()
+    _ids_by_name.clear()
+
+
+def collection_version() -> int:
+    """Return the user collection's write version"""
+    return version.value
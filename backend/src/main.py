@@ -1,11 +1,92 @@
-from fastapi import FastAPI
-from web.task import router as task_router
-from web.user import router as user_router
+import os
+from dotenv import load_dotenv
 
-app = FastAPI()
+# Before the imports below, which read their settings from the environment
+load_dotenv()
+
+import asyncio  # noqa: E402
+from contextlib import asynccontextmanager  # noqa: E402
+from fastapi import FastAPI, Request  # noqa: E402
+from fastapi.responses import JSONResponse  # noqa: E402
+from data import aio  # noqa: E402
+from data.init import db  # noqa: E402
+from error import Overloaded, PoolTimeout  # noqa: E402
+from monitor import queries, tracing  # noqa: E402
+from monitor.metrics import instrument  # noqa: E402
+from service import hashing  # noqa: E402
+from service import task as task_service  # noqa: E402
+from service.revocation import revocations  # noqa: E402
+from web.monitor import MetricsMiddleware, TracingMiddleware  # noqa: E402
+from web.monitor import router as monitor_router  # noqa: E402
+from web.ratelimit import RateLimitMiddleware  # noqa: E402
+
+if os.getenv("TODO_ASYNC"):
+    from web.batch_async import router as batch_router
+    from web.task_async import router as task_router
+    from web.user_async import router as user_router
+else:
+    from web.batch import router as batch_router
+    from web.task import router as task_router
+    from web.user import router as user_router
+
+
+def startup() -> None:
+    """Open the database and warm what the first requests would otherwise
+    pay for"""
+    if not os.getenv("TODO_UNIT_TEST"):
+        db.warm()  # connects and creates the schema
+    # Have the autocomplete index ready before the first keystroke
+    task_service.load_suggestions()
+    revocations.rebuild()
+
+
+def shutdown() -> None:
+    hashing.pool.shutdown()
+    db.close()
+
+
+@asynccontextmanager
+async def lifespan(app: FastAPI):
+    await aio.run(startup)
+    try:
+        yield
+    finally:
+        await aio.run(shutdown)
+        # Not from one of its own threads, which it would wait on
+        await asyncio.to_thread(aio.shutdown)
+
+
+instrument()
+queries.install()
+tracing.install()
+
+app = FastAPI(lifespan=lifespan)
+app.add_middleware(RateLimitMiddleware)
+app.add_middleware(TracingMiddleware)
+# Added last so it is outermost, and also times rate-limited requests
+app.add_middleware(MetricsMiddleware)
 
 app.include_router(task_router)
 app.include_router(user_router)
+app.include_router(batch_router)
+app.include_router(monitor_router)
+
+
+@app.exception_handler(PoolTimeout)
+def pool_timeout(request: Request, exc: PoolTimeout) -> JSONResponse:
+    return JSONResponse(
+        status_code=503, content={"detail": exc.msg}, headers={"Retry-After": "1"}
+    )
+
+
+@app.exception_handler(Overloaded)
+def overloaded(request: Request, exc: Overloaded) -> JSONResponse:
+    """Turn a full or broken hash pool into a 503 on any route that hashes"""
+    return JSONResponse(
+        status_code=503,
+        content={"detail": exc.msg},
+        headers={"Retry-After": str(exc.retry_after)},
+    )
 
 
 @app.get("/")
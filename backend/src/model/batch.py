@@ -0,0 +1,35 @@
+from typing import Literal
+from pydantic import BaseModel, Field
+from model.task import Task
+from model.user import User
+
+MAX_OPERATIONS = 1000
+
+
+class BatchResult(BaseModel):
+    status: int
+    result: Task | User | None = None
+    detail: str | None = None
+
+
+class Operation(BaseModel):
+    op: Literal[
+        "create_task",
+        "modify_task",
+        "delete_task",
+        "create_user",
+        "modify_user",
+        "delete_user",
+    ]
+    id: int | None = Field(None, description="task_id or user_id to act on")
+    body: dict | None = Field(None, description="TaskCreate, UserCreate or UserUpdate")
+
+
+class BatchRequest(BaseModel):
+    operations: list[Operation] = Field(..., max_length=MAX_OPERATIONS)
+    atomic: bool = Field(True, description="Roll everything back on the first error")
+
+
+class BatchResponse(BaseModel):
+    committed: bool
+    results: list[BatchResult]
@@ -5,6 +5,7 @@ class User(BaseModel):
     user_id: int
     name: str
     hash: str
+    token_version: int = 0
 
 
 class UserCreate(BaseModel):
@@ -0,0 +1,308 @@
+"""Counters, gauges and histograms rendered in the Prometheus text format.
+
+Each thread updates its own shard of a metric, so the hot path takes no
+lock and loses no updates; shards are only summed when /metrics is read."""
+
+from bisect import bisect_left
+from collections.abc import Callable, Iterable
+from math import inf
+from threading import Lock, local
+
+Labels = tuple[str, ...]
+
+# Seconds; Prometheus' default buckets, extended down for SQLite reads
+LATENCY_BUCKETS = (
+    0.0001, 0.00025, 0.0005, 0.001, 0.0025, 0.005, 0.01, 0.025, 0.05,
+    0.1, 0.25, 0.5, 1.0, 2.5, 5.0, 10.0,
+)  # fmt: skip
+
+
+def escape(value: str) -> str:
+    return value.replace("\\", r"\\").replace("\n", r"\n").replace('"', r"\"")
+
+
+def format_labels(names: Labels, values: Labels) -> str:
+    if not names:
+        return ""
+    pairs = ",".join(f'{n}="{escape(v)}"' for n, v in zip(names, values))
+    return "{" + pairs + "}"
+
+
+class Metric:
+    kind = "untyped"
+
+    def __init__(self, name: str, help: str, labelnames: Labels = ()):
+        self.name = name
+        self.help = help
+        self.labelnames = labelnames
+        self._shards: list[dict] = []
+        self._local = local()
+        self._lock = Lock()  # only taken when a thread first writes
+
+    def _shard(self) -> dict:
+        try:
+            return self._local.shard
+        except AttributeError:
+            shard = self._local.shard = {}
+            with self._lock:
+                self._shards.append(shard)
+            return shard
+
+    def _merged(self) -> dict:
+        """Return the per-label totals over every thread's shard"""
+        with self._lock:
+            shards = list(self._shards)
+        merged = {}
+        for shard in shards:
+            for labels, value in list(shard.items()):
+                merged[labels] = self._add(merged.get(labels), value)
+        return merged
+
+    def _add(self, total, value):
+        return value if total is None else total + value
+
+    def samples(self) -> Iterable[str]:
+        for labels, value in sorted(self._merged().items()):
+            yield f"{self.name}{format_labels(self.labelnames, labels)} {value}"
+
+    def render(self) -> str:
+        head = [f"# HELP {self.name} {self.help}", f"# TYPE {self.name} {self.kind}"]
+        return "\n".join([*head, *self.samples()])
+
+
+class Counter(Metric):
+    kind = "counter"
+
+    def inc(self, labels: Labels = (), amount: float = 1) -> None:
+        shard = self._shard()
+        shard[labels] = shard.get(labels, 0) + amount
+
+
+class Gauge(Counter):
+    """A counter that may go down; the shards sum to the current value"""
+
+    kind = "gauge"
+
+    def dec(self, labels: Labels = (), amount: float = 1) -> None:
+        self.inc(labels, -amount)
+
+
+class Collected(Metric):
+    """Values read from <collect> when the metrics are rendered"""
+
+    def __init__(
+        self,
+        name: str,
+        help: str,
+        collect: Callable[[], dict[Labels, float]],
+        labelnames: Labels = (),
+        kind: str = "gauge",
+    ):
+        super().__init__(name, help, labelnames)
+        self.collect = collect
+        self.kind = kind
+
+    def _merged(self) -> dict:
+        return self.collect()
+
+
+class Histogram(Metric):
+    kind = "histogram"
+
+    def __init__(
+        self,
+        name: str,
+        help: str,
+        labelnames: Labels = (),
+        buckets: tuple[float, ...] = LATENCY_BUCKETS,
+    ):
+        super().__init__(name, help, labelnames)
+        self.buckets = buckets
+
+    def observe(self, value: float, labels: Labels = ()) -> None:
+        shard = self._shard()
+        if (counts := shard.get(labels)) is None:
+            # One slot per bucket plus +Inf, then the running sum
+            counts = shard[labels] = [0] * (len(self.buckets) + 1) + [0.0]
+        counts[bisect_left(self.buckets, value)] += 1
+        counts[-1] += value
+
+    def _add(self, total, value):
+        if total is None:
+            return list(value)
+        return [a + b for a, b in zip(total, value)]
+
+    def samples(self) -> Iterable[str]:
+        for labels, counts in sorted(self._merged().items()):
+            cumulative = 0
+            for bound, n in zip([*self.buckets, inf], counts):
+                cumulative += n
+                le = "+Inf" if bound == inf else repr(bound)
+                names = (*self.labelnames, "le")
+                label_text = format_labels(names, (*labels, le))
+                yield f"{self.name}_bucket{label_text} {cumulative}"
+            label_text = format_labels(self.labelnames, labels)
+            yield f"{self.name}_sum{label_text} {counts[-1]}"
+            yield f"{self.name}_count{label_text} {cumulative}"
+
+
+class Registry:
+    def __init__(self):
+        self.metrics: list[Metric] = []
+
+    def register(self, metric: Metric) -> Metric:
+        self.metrics.append(metric)
+        return metric
+
+    def render(self) -> str:
+        return "\n".join(metric.render() for metric in self.metrics) + "\n"
+
+
+registry = Registry()
+
+http_requests = registry.register(
+    Counter(
+        "todo_http_requests_total",
+        "HTTP requests by method, route and status code",
+        ("method", "route", "status"),
+    )
+)
+http_latency = registry.register(
+    Histogram(
+        "todo_http_request_duration_seconds",
+        "HTTP request latency by method and route",
+        ("method", "route"),
+    )
+)
+http_in_flight = registry.register(
+    Gauge("todo_http_requests_in_flight", "HTTP requests being served")
+)
+db_queries = registry.register(
+    Histogram(
+        "todo_db_query_duration_seconds",
+        "SQLite statement latency by statement verb",
+        ("verb",),
+    )
+)
+hash_latency = registry.register(
+    Histogram(
+        "todo_bcrypt_duration_seconds",
+        "bcrypt hash and verify latency, including time queued",
+    )
+)
+
+
+def pool_connections() -> dict[Labels, float]:
+    from data.init import db
+
+    stats = db.stats()
+    return {("idle",): stats.get("idle", 0), ("in_use",): stats.get("in_use", 0)}
+
+
+def suggest_entries() -> dict[Labels, float]:
+    from service.task import suggestions
+
+    return {(): len(suggestions)}
+
+
+def suggest_bytes() -> dict[Labels, float]:
+    from service.task import suggestions
+
+    return {(): suggestions.stats()["bytes"]}
+
+
+def caches() -> dict:
+    """Return the service caches by the name they are labelled with"""
+    from service import task, user
+
+    return {"task": task.cache, "user": user.cache, "principal": user.principals}
+
+
+def cache_stat(stat: str) -> Callable[[], dict[Labels, float]]:
+    def collect() -> dict[Labels, float]:
+        return {(name,): cache.stats()[stat] for name, cache in caches().items()}
+
+    return collect
+
+
+def bcrypt_jobs() -> dict[Labels, float]:
+    from service.hashing import pool
+
+    stats = pool.stats()
+    running = stats["in_flight"] - stats["queued"]
+    return {("queued",): stats["queued"], ("running",): running}
+
+
+def bcrypt_rejected() -> dict[Labels, float]:
+    from service.hashing import pool
+
+    return {(): pool.stats()["rejected"]}
+
+
+registry.register(
+    Collected(
+        "todo_db_pool_connections",
+        "SQLite pool connections by state",
+        pool_connections,
+        ("state",),
+    )
+)
+registry.register(
+    Collected(
+        "todo_suggest_index_entries",
+        "Tasks in the autocomplete prefix index",
+        suggest_entries,
+    )
+)
+registry.register(
+    Collected(
+        "todo_suggest_index_bytes",
+        "Estimated memory held by the autocomplete prefix index",
+        suggest_bytes,
+    )
+)
+for stat, help in (
+    ("hits", "Service cache lookups answered from the cache"),
+    ("misses", "Service cache lookups that went to the store"),
+    ("evictions", "Service cache entries dropped to stay within the size"),
+):
+    registry.register(
+        Collected(
+            f"todo_cache_{stat}_total",
+            help,
+            cache_stat(stat),
+            ("cache",),
+            kind="counter",
+        )
+    )
+registry.register(
+    Collected(
+        "todo_cache_entries", "Service cache entries", cache_stat("size"), ("cache",)
+    )
+)
+registry.register(
+    Collected("todo_bcrypt_jobs", "bcrypt jobs by state", bcrypt_jobs, ("state",))
+)
+registry.register(
+    Collected(
+        "todo_bcrypt_rejected_total",
+        "bcrypt jobs refused because the queue was full",
+        bcrypt_rejected,
+        kind="counter",
+    )
+)
+
+
+def observe_query(query: str, params, seconds: float) -> None:
+    db_queries.observe(seconds, (query.split(None, 1)[0].upper(),))
+
+
+def instrument() -> None:
+    """Report database statements and bcrypt jobs to the metrics"""
+    from data.init import db
+    from service.hashing import pool
+
+    if observe_query not in db.observers:
+        db.observers.append(observe_query)
+    if hash_latency.observe not in pool.observers:
+        pool.observers.append(hash_latency.observe)
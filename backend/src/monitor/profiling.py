@@ -0,0 +1,173 @@
+"""On-demand CPU and memory profiles of the live process.
+
+Nothing is hooked in while idle: the CPU profiler samples every thread's
+stack from a thread of its own for the length of a request, and tracemalloc
+only traces between the two snapshots it diffs. One profile runs at a time."""
+
+import io
+import marshal
+import os
+import pstats
+import sys
+import threading
+import time
+import tracemalloc
+from collections import Counter
+from collections.abc import Iterator
+from contextlib import contextmanager
+from error import ProfilerBusy
+
+PROFILING = bool(os.getenv("TODO_PROFILING"))  # the endpoints 404 without it
+MAX_SECONDS = float(os.getenv("TODO_PROFILE_MAX_SECONDS", 60))
+
+# (filename, first line, function name), as cProfile keys functions
+Func = tuple[str, int, str]
+
+_busy = threading.Lock()
+
+
+@contextmanager
+def exclusive() -> Iterator[None]:
+    if not _busy.acquire(blocking=False):
+        raise ProfilerBusy()
+    try:
+        yield
+    finally:
+        _busy.release()
+
+
+class CpuProfile:
+    """Stack samples of every thread but the sampler's, taken every
+    <interval> seconds"""
+
+    def __init__(self, interval: float):
+        self.interval = interval
+        self.samples: Counter[tuple[str, tuple[Func, ...]]] = Counter()
+        self.elapsed = 0.0
+
+    def sample(self, skip: int) -> None:
+        names = {thread.ident: thread.name for thread in threading.enumerate()}
+        for ident, frame in sys._current_frames().items():
+            if ident == skip:
+                continue
+            stack = []
+            while frame is not None:
+                code = frame.f_code
+                stack.append((code.co_filename, code.co_firstlineno, code.co_name))
+                frame = frame.f_back
+            stack.reverse()
+            self.samples[names.get(ident, str(ident)), tuple(stack)] += 1
+
+    def collapsed(self) -> str:
+        """Return the samples as collapsed stacks, the input of flamegraph.pl
+        and speedscope"""
+        lines = []
+        for (thread, stack), n in self.samples.most_common():
+            frames = [
+                f"{func} ({os.path.basename(file)}:{line})"
+                for file, line, func in stack
+            ]
+            lines.append(f"{';'.join([thread, *frames])} {n}")
+        return "\n".join(lines) + "\n"
+
+    def stats(self) -> dict:
+        """Return the samples in the dict form pstats loads, with a sample
+        standing in for a call and <interval> seconds for its time"""
+        self_samples: Counter[Func] = Counter()
+        total_samples: Counter[Func] = Counter()
+        callers: dict[Func, Counter[Func]] = {}
+        for (_, stack), n in self.samples.items():
+            if not stack:
+                continue
+            self_samples[stack[-1]] += n
+            for func in set(stack):  # once per sample, however recursive
+                total_samples[func] += n
+            for caller, callee in zip(stack, stack[1:]):
+                callers.setdefault(callee, Counter())[caller] += n
+        return {
+            func: (
+                n,
+                n,
+                self_samples[func] * self.interval,
+                n * self.interval,
+                dict(callers.get(func, {})),
+            )
+            for func, n in total_samples.items()
+        }
+
+    def pstats_dump(self) -> bytes:
+        """Return the stats as a file for pstats.Stats or snakeviz"""
+        return marshal.dumps(self.stats())
+
+    def text(self, limit: int = 40) -> str:
+        """Return the pstats report, sorted by cumulative time"""
+        out = io.StringIO()
+        report = pstats.Stats(_Loaded(self.stats()), stream=out)
+        report.sort_stats(pstats.SortKey.CUMULATIVE).print_stats(limit)
+        return out.getvalue()
+
+
+class _Loaded:
+    """What pstats.Stats takes in place of a finished cProfile.Profile"""
+
+    def __init__(self, stats: dict):
+        self.stats = stats
+
+    def create_stats(self) -> None:
+        pass
+
+
+def profile_cpu(seconds: float, interval: float = 0.005) -> CpuProfile:
+    """Sample every thread's stack for <seconds>; call from a thread that
+    isn't serving requests"""
+    profile = CpuProfile(interval)
+    me = threading.get_ident()
+    with exclusive():
+        start = time.perf_counter()
+        deadline = start + seconds
+        while (now := time.perf_counter()) < deadline:
+            profile.sample(me)
+            time.sleep(max(0.0, interval - (time.perf_counter() - now)))
+        profile.elapsed = time.perf_counter() - start
+    return profile
+
+
+def profile_memory(
+    seconds: float, top: int = 20, frames: int = 1, group_by: str = "lineno"
+) -> dict:
+    """Return the allocations that grew most over <seconds>.
+
+    Traces only for the window, unless tracemalloc was already running."""
+    with exclusive():
+        started = not tracemalloc.is_tracing()
+        if started:
+            tracemalloc.start(frames)
+        try:
+            before = tracemalloc.take_snapshot()
+            time.sleep(seconds)
+            after = tracemalloc.take_snapshot()
+            current, peak = tracemalloc.get_traced_memory()
+        finally:
+            if started:
+                tracemalloc.stop()
+    ignore = [
+        tracemalloc.Filter(False, tracemalloc.__file__),
+        tracemalloc.Filter(False, "<frozen importlib._bootstrap*>"),
+    ]
+    before, after = before.filter_traces(ignore), after.filter_traces(ignore)
+    diff = after.compare_to(before, group_by)
+    return {
+        "seconds": seconds,
+        "traced_bytes": current,
+        "peak_bytes": peak,
+        "top": [
+            {
+                "where": [str(frame) for frame in stat.traceback],
+                "size_diff": stat.size_diff,
+                "size": stat.size,
+                "count_diff": stat.count_diff,
+                "count": stat.count,
+            }
+            for stat in diff[:top]
+        ],
+    }
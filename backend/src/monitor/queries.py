@@ -0,0 +1,119 @@
+"""Per-statement SQL timings and the slow-query log"""
+
+import logging
+import os
+import re
+from collections import deque
+from math import ceil
+from sqlite3 import Error
+from threading import Lock
+
+QUERY_PROFILE = bool(os.getenv("TODO_QUERY_PROFILE"))
+SLOW_QUERY_MS = float(os.getenv("TODO_SLOW_QUERY_MS", 0))  # 0 logs nothing
+SAMPLES = 1000  # recent durations kept per statement for the p99
+
+log = logging.getLogger(__name__)
+
+_LITERAL = re.compile(r"'(?:[^']|'')*'|\b\d+(?:\.\d+)?\b")
+_PLACEHOLDERS = re.compile(r"\?(?:\s*,\s*\?)+")
+
+
+def normalize(query: str) -> str:
+    """Return <query> on one line, with literals and runs of placeholders
+    folded so that statements differing only in values group together"""
+    query = _LITERAL.sub("?", " ".join(query.split()))
+    return _PLACEHOLDERS.sub("?, ...", query)
+
+
+class QueryStats:
+    __slots__ = ("count", "total", "max", "recent", "slow")
+
+    def __init__(self):
+        self.count = 0
+        self.total = 0.0
+        self.max = 0.0
+        self.recent: deque[float] = deque(maxlen=SAMPLES)
+        self.slow = 0
+
+    def p99(self) -> float:
+        ordered = sorted(self.recent)
+        return ordered[ceil(len(ordered) * 0.99) - 1]
+
+    def summary(self) -> dict:
+        return {
+            "count": self.count,
+            "total_ms": round(self.total * 1000, 3),
+            "mean_ms": round(self.total / self.count * 1000, 3),
+            "max_ms": round(self.max * 1000, 3),
+            "p99_ms": round(self.p99() * 1000, 3),
+            "slow": self.slow,
+        }
+
+
+class QueryProfiler:
+    """Database observer aggregating timings by normalized statement.
+
+    Statements slower than <slow_ms> are logged with their query plan."""
+
+    ORDERS = ("total_ms", "count", "mean_ms", "max_ms", "p99_ms")
+
+    def __init__(self, db, slow_ms: float = SLOW_QUERY_MS, aggregate: bool = True):
+        self.db = db
+        self.slow_ms = slow_ms
+        self.aggregate = aggregate
+        self._stats: dict[str, QueryStats] = {}
+        self._lock = Lock()
+
+    def __call__(self, query: str, params, seconds: float) -> None:
+        slow = bool(self.slow_ms) and seconds * 1000 >= self.slow_ms
+        if self.aggregate:
+            key = normalize(query)
+            with self._lock:
+                if (stats := self._stats.get(key)) is None:
+                    stats = self._stats[key] = QueryStats()
+                stats.count += 1
+                stats.total += seconds
+                stats.max = max(stats.max, seconds)
+                stats.recent.append(seconds)
+                stats.slow += slow
+        if slow:
+            self.log_slow(query, params, seconds)
+
+    def log_slow(self, query: str, params, seconds: float) -> None:
+        try:
+            plan = "\n  ".join(self.db.explain(query, params)) or "(no plan)"
+        except Error as exc:  # e.g. executemany, whose params aren't kept
+            plan = f"(no plan: {exc})"
+        log.warning(
+            "slow query %.1f ms: %s\n  %s", seconds * 1000, normalize(query), plan
+        )
+
+    def top(self, n: int = 20, order: str = "total_ms") -> list[dict]:
+        """Return the <n> statements highest by <order>"""
+        with self._lock:
+            rows = [
+                {"query": query, **stats.summary()}
+                for query, stats in self._stats.items()
+            ]
+        rows.sort(key=lambda row: row[order], reverse=True)
+        return rows[:n]
+
+    def reset(self) -> None:
+        with self._lock:
+            self._stats.clear()
+
+
+profiler: QueryProfiler | None = None
+
+
+def install() -> QueryProfiler | None:
+    """Attach the profiler to the database if TODO_QUERY_PROFILE or
+    TODO_SLOW_QUERY_MS ask for one"""
+    global profiler
+    if profiler or not (QUERY_PROFILE or SLOW_QUERY_MS):
+        return profiler
+    from data.init import db
+
+    profiler = QueryProfiler(db, SLOW_QUERY_MS, aggregate=QUERY_PROFILE)
+    db.observers.append(profiler)
+    return profiler
@@ -0,0 +1,286 @@
+"""In-process request tracing across the web, service and data layers.
+
+The web middleware opens a root span for a sampled request; service
+functions marked @traced and each SQL statement add child spans. The
+current span travels in a contextvar, which the threadpool serving sync
+routes and data.aio.run both copy. Unsampled requests cost one contextvar
+read per boundary."""
+
+import inspect
+import json
+import os
+from collections import deque
+from collections.abc import Callable, Iterator
+from contextlib import contextmanager
+from contextvars import ContextVar
+from functools import wraps
+from random import random
+from secrets import token_hex
+from threading import Lock
+from time import perf_counter_ns, time_ns
+
+TRACE_SAMPLE = float(os.getenv("TODO_TRACE_SAMPLE", 0))  # 0 to 1; 0 is off
+TRACE_BUFFER = int(os.getenv("TODO_TRACE_BUFFER", 200))  # recent traces kept
+TRACE_FILE = os.getenv("TODO_TRACE_FILE", "")  # also append OTLP JSON lines
+MAX_SPANS = 500  # per trace; later child spans are dropped
+
+# OTLP span kinds
+INTERNAL, SERVER, CLIENT = 1, 2, 3
+
+
+class Span:
+    __slots__ = (
+        "name",
+        "kind",
+        "trace_id",
+        "span_id",
+        "parent_id",
+        "start",
+        "end",
+        "attributes",
+        "error",
+        "trace",
+        "_t0",
+    )
+
+    def __init__(
+        self,
+        name: str,
+        kind: int = INTERNAL,
+        parent: "Span | None" = None,
+        start: int | None = None,
+    ):
+        self.name = name
+        self.kind = kind
+        self.trace_id = parent.trace_id if parent else token_hex(16)
+        self.span_id = token_hex(8)
+        self.parent_id = parent.span_id if parent else ""
+        self.start = time_ns() if start is None else start
+        self.end = 0
+        self.attributes: dict[str, str | int | float] = {}
+        self.error = ""
+        # Finished spans of the whole trace, shared by every span in it
+        self.trace: list[Span] = parent.trace if parent else []
+        self._t0 = perf_counter_ns()
+
+    def finish(self, end: int | None = None) -> None:
+        self.end = self.start + perf_counter_ns() - self._t0 if end is None else end
+        if not self.parent_id or len(self.trace) < MAX_SPANS:
+            self.trace.append(self)
+
+    @property
+    def duration_ms(self) -> float:
+        return (self.end - self.start) / 1e6
+
+    def to_otlp(self) -> dict:
+        span = {
+            "traceId": self.trace_id,
+            "spanId": self.span_id,
+            "name": self.name,
+            "kind": self.kind,
+            "startTimeUnixNano": str(self.start),
+            "endTimeUnixNano": str(self.end),
+            "attributes": [
+                {"key": key, "value": otlp_value(value)}
+                for key, value in self.attributes.items()
+            ],
+            "status": {"code": 2, "message": self.error} if self.error else {},
+        }
+        if self.parent_id:
+            span["parentSpanId"] = self.parent_id
+        return span
+
+
+def otlp_value(value: str | int | float) -> dict:
+    if isinstance(value, bool) or not isinstance(value, (int, float)):
+        return {"stringValue": str(value)}
+    if isinstance(value, int):
+        return {"intValue": str(value)}  # int64 is a string in OTLP/JSON
+    return {"doubleValue": value}
+
+
+_current: ContextVar[Span | None] = ContextVar("todo_span", default=None)
+
+
+class Tracer:
+    """Samples requests, and keeps the last <buffer> finished traces"""
+
+    def __init__(
+        self, sample: float = TRACE_SAMPLE, buffer: int = TRACE_BUFFER, path: str = ""
+    ):
+        self.sample = sample
+        self.path = path
+        self.traces: deque[list[Span]] = deque(maxlen=buffer)
+        self._lock = Lock()
+
+    @contextmanager
+    def trace(self, name: str, **attributes) -> Iterator[Span | None]:
+        """Open a root span for a sampled fraction of calls"""
+        if not self.sample or random() >= self.sample:
+            yield None
+            return
+        root = Span(name, SERVER)
+        try:
+            with self._span(root, attributes):
+                yield root
+        finally:
+            self.store(root.trace)
+
+    @contextmanager
+    def span(
+        self, name: str, kind: int = INTERNAL, **attributes
+    ) -> Iterator[Span | None]:
+        """Open a child of the current span, if a trace is being recorded"""
+        if (parent := _current.get()) is None:
+            yield None
+            return
+        with self._span(Span(name, kind, parent), attributes) as span:
+            yield span
+
+    @contextmanager
+    def _span(self, span: Span, attributes: dict) -> Iterator[Span]:
+        span.attributes.update(attributes)
+        token = _current.set(span)
+        try:
+            yield span
+        except BaseException as exc:
+            span.error = f"{type(exc).__name__}: {getattr(exc, 'msg', exc)}"
+            raise
+        finally:
+            _current.reset(token)
+            span.finish()
+
+    def record(self, name: str, seconds: float, kind: int = INTERNAL, **attributes):
+        """Add a child of the current span that took <seconds> until now"""
+        if (parent := _current.get()) is None:
+            return
+        end = time_ns()
+        span = Span(name, kind, parent, start=end - int(seconds * 1e9))
+        span.attributes.update(attributes)
+        span.finish(end)
+
+    def store(self, spans: list[Span]) -> None:
+        with self._lock:
+            self.traces.append(spans)
+            if self.path:
+                with open(self.path, "a") as f:
+                    f.write(json.dumps(to_otlp(spans)) + "\n")
+
+    def recent(
+        self, limit: int = 20, min_ms: float = 0, trace_id: str | None = None
+    ) -> list[dict]:
+        """Return up to <limit> traces, newest first"""
+        with self._lock:
+            traces = list(self.traces)
+        found = []
+        for spans in reversed(traces):
+            root = spans[-1]  # the root finishes last
+            if trace_id and root.trace_id != trace_id:
+                continue
+            if root.duration_ms >= min_ms:
+                found.append(summarize(spans))
+            if len(found) >= limit:
+                break
+        return found
+
+    def clear(self) -> None:
+        with self._lock:
+            self.traces.clear()
+
+
+def summarize(spans: list[Span]) -> dict:
+    """Return a trace's spans in start order, each with its own time apart
+    from that of its children"""
+    root = spans[-1]
+    children_ms: dict[str, float] = {}
+    for span in spans:
+        parent_ms = children_ms.get(span.parent_id, 0)
+        children_ms[span.parent_id] = parent_ms + span.duration_ms
+    return {
+        "trace_id": root.trace_id,
+        "name": root.name,
+        "duration_ms": round(root.duration_ms, 3),
+        "spans": [
+            {
+                "name": span.name,
+                "span_id": span.span_id,
+                "parent_id": span.parent_id,
+                "offset_ms": round((span.start - root.start) / 1e6, 3),
+                "duration_ms": round(span.duration_ms, 3),
+                "self_ms": round(
+                    span.duration_ms - children_ms.get(span.span_id, 0), 3
+                ),
+                "attributes": span.attributes,
+                "error": span.error,
+            }
+            for span in sorted(spans, key=lambda span: span.start)
+        ],
+    }
+
+
+def to_otlp(spans: list[Span]) -> dict:
+    """Return a trace in the OTLP/JSON ExportTraceServiceRequest shape"""
+    return {
+        "resourceSpans": [
+            {
+                "resource": {
+                    "attributes": [
+                        {"key": "service.name", "value": {"stringValue": "todo"}}
+                    ]
+                },
+                "scopeSpans": [
+                    {
+                        "scope": {"name": __name__},
+                        "spans": [span.to_otlp() for span in spans],
+                    }
+                ],
+            }
+        ]
+    }
+
+
+tracer = Tracer(path=TRACE_FILE)
+
+
+def traced(func: Callable) -> Callable:
+    """Run <func> in a span named after it when a trace is being recorded"""
+    name = f"{func.__module__}.{func.__name__}"
+
+    if inspect.iscoroutinefunction(func):
+
+        @wraps(func)
+        async def async_wrapper(*args, **kwargs):
+            if _current.get() is None:
+                return await func(*args, **kwargs)
+            with tracer.span(name):
+                return await func(*args, **kwargs)
+
+        return async_wrapper
+
+    @wraps(func)
+    def wrapper(*args, **kwargs):
+        if _current.get() is None:
+            return func(*args, **kwargs)
+        with tracer.span(name):
+            return func(*args, **kwargs)
+
+    return wrapper
+
+
+def trace_query(query: str, params, seconds: float) -> None:
+    """Database observer adding a span per statement to the current trace"""
+    if _current.get() is None:
+        return
+    from monitor.queries import normalize
+
+    attributes = {"db.system": "sqlite", "db.statement": normalize(query)}
+    verb = query.split(None, 1)[0].upper()
+    tracer.record(f"db {verb}", seconds, CLIENT, **attributes)
+
+
+def install() -> None:
+    """Trace SQL statements, if any requests are sampled"""
+    from data.init import db
+
+    if tracer.sample and trace_query not in db.observers:
+        db.observers.append(trace_query)
@@ -0,0 +1,84 @@
+from collections.abc import Callable
+from functools import partial
+from typing import Any
+from pydantic import BaseModel, ValidationError
+from data.init import db
+from error import (
+    DuplicateTask,
+    DuplicateUser,
+    InvalidOperation,
+    MissingTask,
+    MissingUser,
+)
+from model.batch import Operation
+from model.task import Task, TaskCreate
+from model.user import UserCreate, UserUpdate
+from monitor.tracing import traced
+from service import task, user
+
+# op name -> (service function, takes an id, body model)
+OPERATIONS: dict[str, tuple[Callable, bool, type[BaseModel] | None]] = {
+    "create_task": (task.create_task, False, TaskCreate),
+    "modify_task": (task.modify_task, True, TaskCreate),
+    "delete_task": (task.delete_task, True, None),
+    "create_user": (user.create_user, False, UserCreate),
+    "modify_user": (user.modify_user, True, UserUpdate),
+    "delete_user": (user.delete_user, True, None),
+}
+ERRORS = (DuplicateTask, DuplicateUser, InvalidOperation, MissingTask, MissingUser)
+
+
+class _Abort(Exception):
+    """Raised inside the transaction to roll an atomic batch back"""
+
+
+def prepare(operation: Operation) -> Callable[[], Any]:
+    """Validate <operation> and bind it to its service function"""
+    func, takes_id, model = OPERATIONS[operation.op]
+    args = []
+    if takes_id:
+        if operation.id is None:
+            raise InvalidOperation(f"{operation.op} needs an id")
+        args.append(operation.id)
+    if model:
+        try:
+            args.append(model.model_validate(operation.body or {}))
+        except ValidationError as exc:
+            raise InvalidOperation(f"{operation.op} body: {exc.errors()[0]['msg']}")
+    return partial(func, *args)
+
+
+@traced
+def run_batch(operations: list[Operation], atomic: bool = True) -> tuple[bool, list]:
+    """Run <operations> in order in one transaction.
+
+    Returns whether the transaction committed and one result per operation
+    that ran: the service return value, or the exception it raised. An
+    atomic batch stops and rolls back at the first exception; otherwise
+    failed operations are skipped and the rest commit."""
+    results = []
+    task_ids = []
+    try:
+        with db.transaction():
+            for operation in operations:
+                try:
+                    results.append(res := prepare(operation)())
+                except ERRORS as exc:
+                    results.append(exc)
+                    if atomic:
+                        raise _Abort
+                else:
+                    if isinstance(res, Task):
+                        task_ids.append(res.task_id)
+                    elif operation.op == "delete_task":
+                        task_ids.append(operation.id)
+    except _Abort:
+        return False, results
+    finally:
+        # Other threads may have read rows this transaction changed before
+        # it committed, or rows it then rolled back
+        if task_ids:
+            task.refresh(task_ids)
+        if any(operation.op.endswith("_user") for operation in operations):
+            user.changed()
+    return True, results
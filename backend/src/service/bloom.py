@@ -0,0 +1,37 @@
+"""Bloom filter for cheap membership tests that may err only towards yes"""
+
+import hashlib
+from collections.abc import Iterator
+from math import ceil, log
+
+
+class BloomFilter:
+    """Set of strings that can report false positives but never false negatives.
+
+    Sized so that holding <capacity> items gives about <error_rate> false
+    positives."""
+
+    def __init__(self, capacity: int, error_rate: float = 0.01):
+        self.capacity = max(capacity, 1)
+        self.error_rate = error_rate
+        self.size = max(64, ceil(-self.capacity * log(error_rate) / log(2) ** 2))
+        self.hashes = max(1, round(self.size / self.capacity * log(2)))
+        self.count = 0
+        self._bits = bytearray(ceil(self.size / 8))
+
+    def _positions(self, item: str) -> Iterator[int]:
+        # Double hashing: k positions from the two halves of one digest
+        digest = hashlib.blake2b(item.encode(), digest_size=16).digest()
+        h1 = int.from_bytes(digest[:8], "little")
+        h2 = int.from_bytes(digest[8:], "little") | 1
+        return ((h1 + i * h2) % self.size for i in range(self.hashes))
+
+    def add(self, item: str) -> None:
+        for pos in self._positions(item):
+            self._bits[pos >> 3] |= 1 << (pos & 7)
+        self.count += 1
+
+    def __contains__(self, item: str) -> bool:
+        return all(
+            self._bits[pos >> 3] & (1 << (pos & 7)) for pos in self._positions(item)
+        )
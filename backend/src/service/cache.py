@@ -0,0 +1,117 @@
+"""Bounded in-process caches for the service layer"""
+
+import os
+from collections import OrderedDict
+from collections.abc import Callable, Hashable
+from math import inf
+from threading import Lock
+from time import monotonic
+from typing import Any
+
+CACHE_SIZE = int(os.getenv("TODO_CACHE_SIZE", 4096))  # 0 turns caching off
+CACHE_TTL = float(os.getenv("TODO_CACHE_TTL", 60))
+
+_MISSING = object()
+
+
+class LRUCache:
+    """Thread-safe LRU cache whose entries also expire after <ttl> seconds"""
+
+    def __init__(self, maxsize: int = CACHE_SIZE, ttl: float | None = CACHE_TTL):
+        self.maxsize = maxsize
+        self.ttl = ttl
+        self.enabled = maxsize > 0
+        self.hits = 0
+        self.misses = 0
+        self.evictions = 0
+        self._data: OrderedDict[Hashable, tuple[float, Any]] = OrderedDict()
+        self._lock = Lock()
+        # Bumped on every invalidation so an in-flight load can't re-cache
+        # a value read before the write that invalidated it
+        self._generation = 0
+
+    def get(self, key: Hashable, default: Any = None) -> Any:
+        if not self.enabled:
+            return default
+        with self._lock:
+            entry = self._data.get(key)
+            if entry is None or entry[0] < monotonic():
+                if entry is not None:
+                    del self._data[key]
+                self.misses += 1
+                return default
+            self._data.move_to_end(key)
+            self.hits += 1
+            return entry[1]
+
+    def peek(self, key: Hashable, default: Any = None) -> Any:
+        """Return the live value for <key>, without counting a hit or miss
+        or marking it recently used"""
+        with self._lock:
+            entry = self._data.get(key)
+        if entry is None or entry[0] < monotonic():
+            return default
+        return entry[1]
+
+    @property
+    def generation(self) -> int:
+        """Token to pass to put() so it is skipped if anything was invalidated"""
+        return self._generation
+
+    def put(
+        self,
+        key: Hashable,
+        value: Any,
+        ttl: float | None = None,
+        generation: int | None = None,
+    ) -> None:
+        if not self.enabled:
+            return
+        with self._lock:
+            if generation is None or generation == self._generation:
+                self._put(key, value, ttl)
+
+    def _put(self, key: Hashable, value: Any, ttl: float | None) -> None:
+        ttl = self.ttl if ttl is None else ttl
+        self._data[key] = (monotonic() + ttl if ttl else inf, value)
+        self._data.move_to_end(key)
+        while len(self._data) > self.maxsize:
+            self._data.popitem(last=False)
+            self.evictions += 1
+
+    def get_or_load(self, key: Hashable, loader: Callable[[], Any]) -> Any:
+        """Return the cached value for <key>, calling <loader> on a miss"""
+        if (value := self.get(key, _MISSING)) is not _MISSING:
+            return value
+        generation = self._generation
+        value = loader()
+        self.put(key, value, generation=generation)
+        return value
+
+    def invalidate(self, key: Hashable) -> None:
+        with self._lock:
+            self._generation += 1
+            self._data.pop(key, None)
+
+    def discard_if(self, predicate: Callable[[Any], bool]) -> None:
+        """Drop every entry whose value matches <predicate>"""
+        with self._lock:
+            self._generation += 1
+            for key in [k for k, (_, v) in self._data.items() if predicate(v)]:
+                del self._data[key]
+
+    def clear(self) -> None:
+        with self._lock:
+            self._generation += 1
+            self._data.clear()
+
+    def stats(self) -> dict:
+        with self._lock:
+            return {
+                "enabled": self.enabled,
+                "size": len(self._data),
+                "maxsize": self.maxsize,
+                "hits": self.hits,
+                "misses": self.misses,
+                "evictions": self.evictions,
+            }
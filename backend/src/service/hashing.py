@@ -0,0 +1,159 @@
+"""Run bcrypt in worker processes so it never holds the API's GIL"""
+
+import asyncio
+import multiprocessing
+import os
+from collections.abc import Callable, Iterator
+from concurrent.futures import ProcessPoolExecutor
+from concurrent.futures.process import BrokenProcessPool
+from math import ceil
+from threading import BoundedSemaphore, Lock
+from time import perf_counter
+from typing import Any
+from passlib.context import CryptContext
+from error import HashUnavailable, Overloaded
+
+HASH_WORKERS = int(os.getenv("TODO_HASH_WORKERS", 2))  # 0 hashes inline
+HASH_QUEUE = int(os.getenv("TODO_HASH_QUEUE", 32))  # jobs allowed to wait
+
+pwd_context = CryptContext(schemes=["bcrypt"], deprecated="auto")
+
+
+def verify(plain: str, hash: str) -> bool:
+    return pwd_context.verify(plain, hash)
+
+
+def get_hash(plain: str) -> str:
+    return pwd_context.hash(plain)
+
+
+class HashPool:
+    """Process pool for bcrypt with a bounded number of queued jobs.
+
+    A job that would exceed <workers> + <queue_size> outstanding jobs is
+    refused at once with Overloaded rather than left to wait. If a worker
+    dies, the broken executor is replaced and the job tried once more."""
+
+    def __init__(self, workers: int = HASH_WORKERS, queue_size: int = HASH_QUEUE):
+        self.workers = workers
+        self.queue_size = queue_size
+        self._executor: ProcessPoolExecutor | None = None
+        self._slots = BoundedSemaphore(workers + queue_size) if workers else None
+        self._lock = Lock()
+        self._in_flight = 0
+        self._completed = 0
+        self._rejected = 0
+        self._total_time = 0.0
+        self._max_time = 0.0
+        # Called with the seconds each job took, queueing included
+        self.observers: list[Callable[[float], None]] = []
+
+    def _acquire(self) -> None:
+        if not self._slots.acquire(blocking=False):
+            with self._lock:
+                self._rejected += 1
+            raise Overloaded(self._retry_after())
+        with self._lock:
+            self._in_flight += 1
+
+    def _attempts(self) -> Iterator[ProcessPoolExecutor]:
+        """Yield the executor to submit to, and a second time in case the
+        first broke"""
+        for _ in range(2):
+            with self._lock:
+                if not self._executor:
+                    # spawn: forking a process that runs threads can deadlock
+                    context = multiprocessing.get_context("spawn")
+                    self._executor = ProcessPoolExecutor(
+                        self.workers, mp_context=context
+                    )
+                executor = self._executor
+            yield executor
+
+    def _replace(self, broken: ProcessPoolExecutor) -> None:
+        """Drop <broken>, unless another job already has, so that the next
+        attempt starts a fresh executor"""
+        with self._lock:
+            if self._executor is broken:
+                self._executor = None
+        broken.shutdown(wait=False)
+
+    def _done(self, elapsed: float) -> None:
+        self._slots.release()
+        with self._lock:
+            self._in_flight -= 1
+        self._record(elapsed)
+
+    def _record(self, elapsed: float) -> None:
+        with self._lock:
+            self._completed += 1
+            self._total_time += elapsed
+            self._max_time = max(self._max_time, elapsed)
+        for observer in self.observers:
+            observer(elapsed)
+
+    def _retry_after(self) -> int:
+        """Seconds until the current backlog should have drained"""
+        with self._lock:
+            mean = self._total_time / self._completed if self._completed else 0.25
+            return max(1, ceil(mean * self._in_flight / max(self.workers, 1)))
+
+    def run(self, func: Callable, *args) -> Any:
+        """Run <func>(*args) in a worker and wait for the result"""
+        start = perf_counter()
+        if not self.workers:
+            try:
+                return func(*args)
+            finally:
+                self._record(perf_counter() - start)
+        self._acquire()
+        try:
+            for executor in self._attempts():
+                try:
+                    return executor.submit(func, *args).result()
+                except BrokenProcessPool:
+                    self._replace(executor)
+            raise HashUnavailable(self._retry_after())
+        finally:
+            self._done(perf_counter() - start)
+
+    async def run_async(self, func: Callable, *args) -> Any:
+        """Await <func>(*args) in a worker without blocking a thread"""
+        if not self.workers:
+            return self.run(func, *args)
+        start = perf_counter()
+        self._acquire()
+        try:
+            for executor in self._attempts():
+                try:
+                    return await asyncio.wrap_future(executor.submit(func, *args))
+                except BrokenProcessPool:
+                    self._replace(executor)
+            raise HashUnavailable(self._retry_after())
+        finally:
+            self._done(perf_counter() - start)
+
+    def shutdown(self) -> None:
+        with self._lock:
+            executor, self._executor = self._executor, None
+        if executor:
+            executor.shutdown(cancel_futures=True)
+
+    def stats(self) -> dict:
+        with self._lock:
+            return {
+                "workers": self.workers,
+                "queue_size": self.queue_size,
+                "in_flight": self._in_flight,
+                "queued": max(0, self._in_flight - self.workers),
+                "completed": self._completed,
+                "rejected": self._rejected,
+                "mean_ms": round(
+                    self._total_time / self._completed * 1000 if self._completed else 0,
+                    3,
+                ),
+                "max_ms": round(self._max_time * 1000, 3),
+            }
+
+
+pool = HashPool()
@@ -0,0 +1,105 @@
+"""Revoked access tokens, screened by an in-memory Bloom filter"""
+
+import os
+from threading import Lock
+from time import monotonic, time
+from types import ModuleType
+from service.bloom import BloomFilter
+
+if os.getenv("TODO_UNIT_TEST"):
+    from fake import token as data
+else:
+    from data import token as data
+
+REVOCATION_CAPACITY = int(os.getenv("TODO_REVOCATION_CAPACITY", 10_000))
+REBUILD_INTERVAL = float(os.getenv("TODO_REVOCATION_REBUILD", 300))
+
+
+class RevocationList:
+    """Revoked token ids kept in <store>, with a Bloom filter in front.
+
+    A token that is not revoked, the common case, is cleared by the filter
+    without touching the store; only filter hits are confirmed there. The
+    filter is rebuilt from the store every <interval> seconds, which also
+    purges revocations whose tokens have expired."""
+
+    def __init__(
+        self,
+        store: ModuleType = data,
+        capacity: int = REVOCATION_CAPACITY,
+        interval: float = REBUILD_INTERVAL,
+    ):
+        self.store = store
+        self.capacity = capacity
+        self.interval = interval
+        self.checks = 0
+        self.lookups = 0
+        self.rebuilds = 0
+        self._filter: BloomFilter | None = None
+        self._built_at = 0.0
+        self._lock = Lock()
+
+    def _stale(self) -> bool:
+        return self._filter is None or monotonic() - self._built_at > self.interval
+
+    def _rebuild(self) -> None:
+        now = time()
+        self.store.purge_expired(now)
+        revoked = self.store.get_revoked(now)
+        bloom = BloomFilter(max(self.capacity, 2 * len(revoked)))
+        for jti in revoked:
+            bloom.add(jti)
+        self._filter, self._built_at = bloom, monotonic()
+        self.rebuilds += 1
+
+    def rebuild(self) -> None:
+        """Purge expired revocations and reload the filter from the store"""
+        with self._lock:
+            self._rebuild()
+
+    def _current(self) -> BloomFilter:
+        # Only the first build makes callers wait; a stale filter keeps
+        # serving while one thread replaces it
+        if self._stale() and self._lock.acquire(blocking=self._filter is None):
+            try:
+                if self._stale():
+                    self._rebuild()
+            finally:
+                self._lock.release()
+        return self._filter
+
+    def revoke(self, jti: str, expires: float) -> None:
+        """Revoke token <jti> until it <expires> (a UNIX timestamp)"""
+        self.store.revoke_token(jti, expires)
+        self._current()
+        # Under the lock, so a concurrent rebuild can't swap in a filter
+        # that was loaded before this revocation was stored
+        with self._lock:
+            self._filter.add(jti)
+
+    def is_revoked(self, jti: str) -> bool:
+        self.checks += 1
+        if jti not in self._current():
+            return False
+        self.lookups += 1
+        return self.store.is_revoked(jti)
+
+    def clear(self) -> None:
+        """Forget every revocation"""
+        with self._lock:
+            self.store.delete_all_revoked()
+            self._rebuild()
+
+    def stats(self) -> dict:
+        bloom = self._filter
+        return {
+            "entries": bloom.count if bloom else 0,
+            "bits": bloom.size if bloom else 0,
+            "hashes": bloom.hashes if bloom else 0,
+            "checks": self.checks,
+            "lookups": self.lookups,
+            "rebuilds": self.rebuilds,
+        }
+
+
+revocations = RevocationList()
@@ -0,0 +1,159 @@
+"""In-memory prefix index for autocompleting task text"""
+
+import sys
+from bisect import bisect_left, insort
+from collections.abc import Iterable
+from threading import Lock
+
+
+def normalize(text: str) -> str:
+    """Return <text> case-folded with runs of whitespace collapsed"""
+    return " ".join(text.casefold().split())
+
+
+class PrefixIndex:
+    """Sorted array of (normalized text, id) searched by bisection.
+
+    A lookup is O(log n + limit); a single update is one O(log n) search
+    plus a memmove of the array tail. Loads and batch updates build a new
+    array aside and swap it in, so lookups never wait on them. Writes made
+    while a load reads the table are replayed onto what it read."""
+
+    def __init__(self):
+        self.loaded = False
+        self._keys: list[tuple[str, int]] = []
+        self._texts: dict[int, str] = {}
+        # Held by lookups and for swaps; never while building a new array
+        self._lock = Lock()
+        # Serializes writers, so a batch is built from a stable array
+        self._writing = Lock()
+        self._loading = Lock()
+        # Updates made during a load, as (added, removed) pairs; None
+        # removes everything
+        self._pending: list[tuple[list[tuple[int, str]], list[int] | None]] | None
+        self._pending = None
+
+    def load(self, chunks: Iterable[list[tuple[int, str]]]) -> None:
+        """Replace the contents with (id, text) rows"""
+        with self._loading:
+            with self._writing:
+                self._pending = []
+            texts = {row_id: text for rows in chunks for row_id, text in rows}
+            with self._writing:
+                for added, removed in self._pending:
+                    if removed is None:
+                        texts.clear()
+                    for row_id in removed or ():
+                        texts.pop(row_id, None)
+                    texts.update(added)
+                self._pending = None
+                keys = [(normalize(text), row_id) for row_id, text in texts.items()]
+                keys.sort()
+                with self._lock:
+                    self._keys, self._texts = keys, texts
+                    self.loaded = True
+
+    def _remove(self, row_id: int) -> None:
+        if (text := self._texts.pop(row_id, None)) is None:
+            return
+        key = (normalize(text), row_id)
+        i = bisect_left(self._keys, key)
+        if i < len(self._keys) and self._keys[i] == key:
+            del self._keys[i]
+
+    def add(self, row_id: int, text: str) -> None:
+        """Index <text> under <row_id>, replacing what it held before"""
+        with self._writing:
+            if self._pending is not None:
+                self._pending.append(([(row_id, text)], []))
+            if not self.loaded:
+                return
+            with self._lock:
+                self._remove(row_id)
+                self._texts[row_id] = text
+                insort(self._keys, (normalize(text), row_id))
+
+    def remove(self, row_id: int) -> None:
+        with self._writing:
+            if self._pending is not None:
+                self._pending.append(([], [row_id]))
+            with self._lock:
+                self._remove(row_id)
+
+    def update(
+        self, added: Iterable[tuple[int, str]] = (), removed: Iterable[int] = ()
+    ) -> None:
+        """Index many (id, text) rows and drop the ids <removed> at once.
+
+        Costs one O(n) pass and a sort that merges the batch in as a run,
+        rather than a memmove per row."""
+        added, removed = dict(added), list(removed)
+        if not added and not removed:
+            return
+        with self._writing:
+            if self._pending is not None:
+                self._pending.append((list(added.items()), removed))
+            if not self.loaded:
+                return
+            # Writers are excluded, so nothing changes these while we copy
+            old_texts = self._texts
+            dropped = {
+                (normalize(old_texts[row_id]), row_id)
+                for row_id in (*removed, *added)
+                if row_id in old_texts
+            }
+            keys = [key for key in self._keys if key not in dropped]
+            keys += sorted((normalize(text), row_id) for row_id, text in added.items())
+            keys.sort()  # two sorted runs: a linear merge
+            texts = dict(old_texts)
+            for row_id in removed:
+                texts.pop(row_id, None)
+            texts.update(added)
+            with self._lock:
+                self._keys, self._texts = keys, texts
+
+    def clear(self) -> None:
+        """Empty the index, which then matches an empty table"""
+        with self._writing:
+            if self._pending is not None:
+                self._pending.append(([], None))
+            with self._lock:
+                self._keys, self._texts = [], {}
+                self.loaded = True
+
+    def reset(self) -> None:
+        """Drop the contents so the next use reloads them"""
+        with self._writing, self._lock:
+            self._keys, self._texts = [], {}
+            self.loaded = False
+
+    def search(self, prefix: str, limit: int = 10) -> list[tuple[int, str]]:
+        """Return up to <limit> (id, text) pairs starting with <prefix>"""
+        prefix = normalize(prefix)
+        results = []
+        with self._lock:
+            keys = self._keys
+            i = bisect_left(keys, (prefix,))
+            while i < len(keys) and len(results) < limit:
+                key, row_id = keys[i]
+                if not key.startswith(prefix):
+                    break
+                results.append((row_id, self._texts[row_id]))
+                i += 1
+        return results
+
+    def __len__(self) -> int:
+        return len(self._keys)
+
+    def stats(self) -> dict:
+        """Return the entry count and an estimate of the bytes held"""
+        # Sized from copies, so lookups don't wait on a walk of every entry
+        with self._lock:
+            keys, texts, loaded = list(self._keys), dict(self._texts), self.loaded
+        size = sys.getsizeof(self._keys) + sys.getsizeof(self._texts)
+        for key in keys:
+            size += sys.getsizeof(key) + sys.getsizeof(key[0])
+        # Ids are shared by the key tuples and the dict; count them once
+        for row_id, text in texts.items():
+            size += sys.getsizeof(row_id) + sys.getsizeof(text)
+        return {"loaded": loaded, "entries": len(keys), "bytes": size}
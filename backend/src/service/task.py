@@ -1,39 +1,155 @@
+import csv
+import io
+import json
 import os
-from dotenv import load_dotenv
+from collections.abc import Iterable, Iterator
+from error import DuplicateTask, MissingTask
 from model.task import Task, TaskCreate
+from monitor.tracing import traced
+from service.cache import LRUCache
+from service.suggest import PrefixIndex
 
-load_dotenv()
 if os.getenv("TODO_UNIT_TEST"):
     from fake import task as data
 else:
     from data import task as data
 
+# Read-through cache of single-task lookups, keyed by task_id
+cache = LRUCache()
+# Task text for autocomplete, kept in step with every write below
+suggestions = PrefixIndex()
 
-def get_all_tasks() -> list[Task]:
-    """Return list of all tasks"""
-    return data.get_all_tasks()
 
+@traced
+def get_all_tasks(limit: int | None = None, after: int | None = None) -> list[Task]:
+    """Return a page of tasks ordered by task_id"""
+    return data.get_all_tasks(limit, after)
 
+
+@traced
 def get_single_task(task_id: int) -> Task:
     """Return a single task if it exists"""
-    return data.get_single_task(task_id)
+    return cache.get_or_load(task_id, lambda: data.get_single_task(task_id))
+
+
+@traced
+def search_tasks(
+    q: str, limit: int | None = None, after: tuple[float, int] | None = None
+) -> list[tuple[float, Task]]:
+    """Return (rank, task) pairs matching <q>, best match first"""
+    return data.search_tasks(q, limit, after)
+
+
+@traced
+def load_suggestions() -> None:
+    """Load every task into the autocomplete index"""
+    suggestions.load(data.iter_task_chunks())
+
+
+@traced
+def suggest_tasks(prefix: str, limit: int = 10) -> list[Task]:
+    """Return up to <limit> tasks whose text starts with <prefix>"""
+    if not suggestions.loaded:
+        load_suggestions()
+    return lookup_suggestions(prefix, limit)
+
+
+def lookup_suggestions(prefix: str, limit: int = 10) -> list[Task]:
+    """Return matches from the index as it stands, never loading it"""
+    return [
+        Task(task_id=task_id, task=task)
+        for task_id, task in suggestions.search(prefix, limit)
+    ]
+
 
+def export_tasks(fmt: str = "ndjson") -> Iterator[str]:
+    """Yield every task serialized as <fmt>, one database chunk at a time"""
+    chunks = data.iter_task_chunks()
+    if fmt == "csv":
+        buf = io.StringIO()
+        writer = csv.writer(buf)
+        writer.writerow(("task_id", "task"))
+        for rows in chunks:
+            writer.writerows(rows)
+            yield buf.getvalue()
+            buf.seek(0)
+            buf.truncate()
+        if buf.tell():
+            yield buf.getvalue()
+        return
+    dumps = json.dumps
+    for rows in chunks:
+        yield "".join(
+            f'{{"task_id":{task_id},"task":{dumps(task)}}}\n' for task_id, task in rows
+        )
 
+
+@traced
 def create_task(task: TaskCreate) -> Task:
     """Add a new task to the database"""
-    return data.create_task(task)
+    created = data.create_task(task)
+    suggestions.add(created.task_id, created.task)
+    return created
+
+
+@traced
+def create_tasks(tasks: list[TaskCreate]) -> list[Task | DuplicateTask]:
+    """Add many tasks in one transaction, reporting duplicates per item"""
+    results = data.create_tasks(tasks)
+    suggestions.update(
+        (res.task_id, res.task) for res in results if isinstance(res, Task)
+    )
+    return results
 
 
+@traced
 def modify_task(task_id: int, modified_task: TaskCreate) -> Task:
     """Modify a task if it exists"""
-    return data.modify_task(task_id, modified_task)
+    task = data.modify_task(task_id, modified_task)
+    cache.invalidate(task_id)
+    suggestions.add(task.task_id, task.task)
+    return task
 
 
+@traced
 def delete_task(task_id: int) -> None:
     """Delete a task if it exists"""
-    return data.delete_task(task_id)
+    data.delete_task(task_id)
+    cache.invalidate(task_id)
+    suggestions.remove(task_id)
 
 
+@traced
 def delete_all_tasks() -> None:
     """Delete all tasks"""
-    return data.delete_all_tasks()
+    data.delete_all_tasks()
+    cache.clear()
+    suggestions.clear()
+
+
+def collection_version() -> int:
+    """Return the task collection's write version"""
+    return data.version.value
+
+
+def changed() -> None:
+    """Drop derived state after tasks were written outside this module"""
+    data.version.bump()
+    cache.clear()
+    suggestions.reset()
+
+
+def refresh(task_ids: Iterable[int]) -> None:
+    """Bring derived state for <task_ids> back in step with the table, e.g.
+    after a transaction that wrote them committed or rolled back"""
+    data.version.bump()
+    found, missing = [], []
+    for task_id in set(task_ids):
+        cache.invalidate(task_id)
+        try:
+            task = data.get_single_task(task_id)
+        except MissingTask:
+            missing.append(task_id)
+        else:
+            found.append((task.task_id, task.task))
+    suggestions.update(found, missing)
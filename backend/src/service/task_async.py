@@ -0,0 +1,36 @@
+import asyncio
+from collections.abc import AsyncIterator
+from concurrent.futures import Future
+from data.aio import run, submit
+from model.task import Task
+from service import task as service
+
+
+async def suggest_tasks(prefix: str, limit: int = 10) -> list[Task]:
+    """Return up to <limit> tasks whose text starts with <prefix>"""
+    if not service.suggestions.loaded:
+        await run(service.load_suggestions)
+    # An in-memory lookup: cheaper inline than queueing on the executor
+    # behind SQLite work. It never loads, so a table scan can't land on
+    # the loop
+    return service.lookup_suggestions(prefix, limit)
+
+
+async def export_tasks(fmt: str = "ndjson") -> AsyncIterator[str]:
+    """Yield every task serialized as <fmt>, reading on the database executor"""
+    chunks = service.export_tasks(fmt)
+    reading: Future | None = None
+    try:
+        while True:
+            reading = submit(next, chunks, None)
+            if (chunk := await asyncio.wrap_future(reading)) is None:
+                break
+            yield chunk
+    finally:
+        # A disconnect cancels the await, not the read already running on
+        # the executor, and a running generator can't be closed. Close it
+        # once that read returns; at once if none is running
+        if reading is not None:
+            reading.add_done_callback(lambda _: chunks.close())
+        else:
+            chunks.close()
@@ -1,60 +1,129 @@
+import hashlib
 import os
-from dotenv import load_dotenv
+import time
+import uuid
+from typing import NamedTuple
 from datetime import datetime, timedelta, timezone
-from passlib.context import CryptContext
 from jose import jwt
+from error import MissingUser
 from model.user import User, UserCreate, UserUpdate
+from monitor.tracing import traced
+from service import hashing
+from service.cache import LRUCache
+from service.revocation import revocations
 
-load_dotenv()
 if os.getenv("TODO_UNIT_TEST"):
     from fake import user as data
 else:
     from data import user as data
 
 
+# Read-through cache of single-user lookups, keyed by user_id
+cache = LRUCache()
+# Users resolved from bearer tokens, keyed by token hash; each entry
+# expires with its token, or when the revocation filter is next rebuilt
+principals = LRUCache(int(os.getenv("TODO_PRINCIPAL_CACHE_SIZE", 10_000)), ttl=None)
+
+
+class Principal(NamedTuple):
+    user: User
+    jti: str | None
+
+
 # AUTH
 SECRET_KEY = os.getenv("SECRET_KEY")
 ALGORITHM = "HS256"
-pwd_context = CryptContext(schemes=["bcrypt"], deprecated="auto")
+# Build principals from token claims alone, without reading the user table.
+# Saves a lookup per request, but a token then stays valid until it expires
+# even if its user is modified or deleted.
+TRUST_CLAIMS = bool(os.getenv("TODO_TRUST_TOKEN_CLAIMS"))
 
 
 def verify_password(plain: str, hash: str) -> bool:
     """Hash <plain> and compare with <hash> from the database"""
-    return pwd_context.verify(plain, hash)
+    return hashing.pool.run(hashing.verify, plain, hash)
 
 
 def get_hash(plain: str) -> str:
     """Return the hash of a <plain> string"""
-    return pwd_context.hash(plain)
+    return hashing.pool.run(hashing.get_hash, plain)
 
 
-def get_jwt_username(token: str) -> str | None:
-    """Return username from JWT access <token>"""
+def decode_token(token: str) -> dict | None:
+    """Return the claims of a valid, unexpired JWT access <token>"""
     try:
-        payload = jwt.decode(token, SECRET_KEY, algorithms=[ALGORITHM])
-        if not (username := payload.get("sub")):
-            return None
+        return jwt.decode(token, SECRET_KEY, algorithms=[ALGORITHM])
     except jwt.JWTError:
         return None
-    return username
 
 
+def get_jwt_username(token: str) -> str | None:
+    """Return username from JWT access <token>"""
+    if not (payload := decode_token(token)):
+        return None
+    return payload.get("sub") or None
+
+
+def token_key(token: str) -> str:
+    # Hashed so the cache never holds usable bearer tokens
+    return hashlib.sha256(token.encode()).hexdigest()
+
+
+@traced
 def get_current_user(token: str) -> User | None:
     """Decode an OAuth access <token> and return the User"""
-    if not (username := get_jwt_username(token)):
+    key = token_key(token)
+    if principal := principals.get(key):
+        # Another worker may have revoked it since; the Bloom filter clears
+        # the common, unrevoked case without touching the store
+        if principal.jti and revocations.is_revoked(principal.jti):
+            return None
+        return principal.user
+    generation = principals.generation
+    if not (payload := decode_token(token)):
         return None
-    if user := lookup_user(username):
-        return user
-    return None
+    if (jti := payload.get("jti")) and revocations.is_revoked(jti):
+        return None
+    if not (user := resolve_claims(payload)):
+        return None
+    # Kept no longer than the filter's rebuild interval, so that another
+    # worker's token_version bump is seen within it
+    ttl = min(payload.get("exp", 0) - time.time(), revocations.interval)
+    if ttl > 0:
+        principals.put(key, Principal(user, jti), ttl=ttl, generation=generation)
+    return user
+
+
+def resolve_claims(payload: dict) -> User | None:
+    """Return the User that the claims in <payload> identify"""
+    if not (username := payload.get("sub")):
+        return None
+    user_id, token_version = payload.get("uid"), payload.get("ver")
+    if type(user_id) is not int or type(token_version) is not int:
+        # Issued before tokens carried ids: fall back to the name lookup
+        return lookup_user(username)
+    if TRUST_CLAIMS:
+        return User(
+            user_id=user_id, name=username, hash="", token_version=token_version
+        )
+    try:
+        user = get_single_user(user_id)
+    except MissingUser:
+        return None
+    if user.token_version != token_version:
+        return None
+    return user
 
 
 def lookup_user(name: str) -> User | None:
     """Return a matching User from the database for <name>"""
-    if user := data.get_user_by_name(name):
-        return user
-    return None
+    try:
+        return data.get_user_by_name(name)
+    except MissingUser:
+        return None
 
 
+@traced
 def auth_user(name: int, plain: str) -> User | None:
     """Authenticate user <name> and <plain> password"""
     if not (user := lookup_user(name)):
@@ -64,6 +133,11 @@ def auth_user(name: int, plain: str) -> User | None:
     return user
 
 
+def token_claims(user: User) -> dict:
+    """Return the claims an access token for <user> carries"""
+    return {"sub": user.name, "uid": user.user_id, "ver": user.token_version}
+
+
 def create_access_token(data: dict, expires: timedelta | None = None):
     """Return a JWT access token"""
     src = data.copy()
@@ -71,30 +145,75 @@ def create_access_token(data: dict, expires: timedelta | None = None):
     if not expires:
         expires = timedelta(minutes=15)
     src.update({"exp": now + expires})
+    src.setdefault("jti", uuid.uuid4().hex)
     encoded_jwt = jwt.encode(src, SECRET_KEY, algorithm=ALGORITHM)
     return encoded_jwt
 
 
+def revoke(jti: str, expires: float, token: str | None = None) -> None:
+    """Revoke the token <jti> until it <expires>; pass the <token> itself,
+    if known, to drop only its cached principal"""
+    revocations.revoke(jti, expires)
+    # Cached principals are keyed by token, not jti
+    if token:
+        principals.invalidate(token_key(token))
+    else:
+        principals.clear()
+
+
+@traced
+def logout(token: str) -> None:
+    """Revoke the access <token> so it no longer authenticates"""
+    if not (payload := decode_token(token)) or not payload.get("jti"):
+        return
+    revoke(payload["jti"], payload["exp"], token)
+
+
 # CRUD
-def get_all_users() -> list[User]:
-    return data.get_all_users()
+@traced
+def get_all_users(limit: int | None = None, after: int | None = None) -> list[User]:
+    return data.get_all_users(limit, after)
 
 
+@traced
 def get_single_user(user_id: int) -> User:
-    return data.get_single_user(user_id)
+    return cache.get_or_load(user_id, lambda: data.get_single_user(user_id))
 
 
+@traced
 def create_user(user: UserCreate) -> User:
     return data.create_user(user)
 
 
+@traced
 def modify_user(user_id: int, user: UserUpdate) -> User:
-    return data.modify_user(user_id, user)
+    modified = data.modify_user(user_id, user)
+    cache.invalidate(user_id)
+    principals.discard_if(lambda principal: principal.user.user_id == user_id)
+    return modified
 
 
+@traced
 def delete_user(user_id: int) -> None:
     data.delete_user(user_id)
+    cache.invalidate(user_id)
+    principals.discard_if(lambda principal: principal.user.user_id == user_id)
 
 
+@traced
 def delete_all_users() -> None:
     data.delete_all_users()
+    cache.clear()
+    principals.clear()
+
+
+def collection_version() -> int:
+    """Return the user collection's write version"""
+    return data.version.value
+
+
+def changed() -> None:
+    """Drop derived state after users were written outside this module"""
+    data.version.bump()
+    cache.clear()
+    principals.clear()
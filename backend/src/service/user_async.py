@@ -0,0 +1,14 @@
+from data.aio import run
+from model.user import User
+from service import hashing
+from service import user as service
+
+
+async def auth_user(name: str, plain: str) -> User | None:
+    """Authenticate user <name> and <plain> password"""
+    if not (user := await run(service.lookup_user, name)):
+        return None
+    # Await the hashing worker directly rather than parking a DB thread on it
+    if not await hashing.pool.run_async(hashing.verify, plain, user.hash):
+        return None
+    return user
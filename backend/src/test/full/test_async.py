@@ -0,0 +1,148 @@
+import asyncio
+import os
+import threading
+import time
+import pytest
+from dotenv import load_dotenv
+from fastapi import FastAPI
+from fastapi.testclient import TestClient
+from model.task import Task, TaskCreate
+from model.user import UserCreate
+from service import task as task_service
+from service import task_async
+from web import batch, task, user
+from web.batch_async import router as batch_router
+from web.task_async import router as task_router
+from web.user_async import router as user_router
+
+# Load environment variables from .env file
+load_dotenv()
+
+# Use an in-memory SQLite database for testing
+os.environ["TODO_SQLITE_DB"] = ":memory:"
+
+# Mount only the async routers, as main does when TODO_ASYNC is set
+app = FastAPI()
+app.include_router(task_router)
+app.include_router(user_router)
+client = TestClient(app)
+
+
+# FIXTURES
+@pytest.fixture(autouse=True)
+def clear_database() -> None:
+    """Fixture to clear the database before each test function."""
+    client.delete("/task")
+    client.delete("/user")
+
+
+@pytest.fixture(scope="function")
+def created_task() -> Task:
+    """Fixture to create a task in the database for testing."""
+    resp = client.post("/task", json=TaskCreate(task="async task").model_dump())
+    assert resp.status_code == 201
+    return Task(**resp.json())
+
+
+# TESTS
+def test_task_routes_are_coroutines() -> None:
+    """Test the async routers don't fall back to the threadpool."""
+    for route in task_router.routes + user_router.routes:
+        assert asyncio.iscoroutinefunction(route.endpoint)
+
+
+def test_async_routes_mirror_sync_routes() -> None:
+    """Test the async routers expose exactly the sync routers' API."""
+    sync_app, async_app = FastAPI(), FastAPI()
+    for router in (task.router, user.router, batch.router):
+        sync_app.include_router(router)
+    for router in (task_router, user_router, batch_router):
+        async_app.include_router(router)
+    assert async_app.openapi() == sync_app.openapi()
+
+
+def test_get_single_task(created_task: Task) -> None:
+    """Test retrieving a single task through the async path."""
+    resp = client.get(f"/task/{created_task.task_id}")
+    assert resp.status_code == 200
+    assert resp.json() == created_task.model_dump()
+
+
+def test_get_single_task_missing() -> None:
+    """Test a missing task still maps to 404."""
+    resp = client.get("/task/-1")
+    assert resp.status_code == 404
+
+
+def test_create_task_duplicate(created_task: Task) -> None:
+    """Test a duplicate task still maps to 409."""
+    resp = client.post("/task", json={"task": created_task.task})
+    assert resp.status_code == 409
+
+
+def test_modify_and_delete_task(created_task: Task) -> None:
+    """Test modifying then deleting a task through the async path."""
+    url = f"/task/{created_task.task_id}"
+    resp = client.patch(url, json={"task": "async modified"})
+    assert resp.json().get("task") == "async modified"
+    assert client.delete(url).status_code == 204
+    assert client.get(url).status_code == 404
+
+
+def test_user_crud() -> None:
+    """Test creating, listing and deleting a user through the async path."""
+    new_user = UserCreate(name="async user", hash="async hash")
+    resp = client.post("/user", json=new_user.model_dump())
+    assert resp.status_code == 201
+    user_id = resp.json()["user_id"]
+    assert client.get("/user").json() == [resp.json()]
+    assert client.post("/user", json=new_user.model_dump()).status_code == 409
+    assert client.delete(f"/user/{user_id}").status_code == 204
+    assert client.get(f"/user/{user_id}").status_code == 404
+
+
+def test_export_tasks(created_task: Task) -> None:
+    """Test the export streams from the database executor."""
+    resp = client.get("/task/export")
+    assert resp.status_code == 200
+    assert resp.text == (
+        f'{{"task_id":{created_task.task_id},"task":"{created_task.task}"}}\n'
+    )
+
+
+def test_export_closes_after_pending_read(monkeypatch) -> None:
+    """Test a cancelled export closes its reader once the read in flight
+    returns, instead of failing on a generator that is still running."""
+    reading, closed = threading.Event(), threading.Event()
+
+    def slow_export(fmt: str):
+        try:
+            yield "first\n"
+            reading.set()
+            time.sleep(0.2)
+            yield "second\n"
+        finally:
+            closed.set()
+
+    monkeypatch.setattr(task_service, "export_tasks", slow_export)
+
+    async def cancel_mid_read() -> None:
+        chunks = task_async.export_tasks()
+        assert await anext(chunks) == "first\n"
+        pending = asyncio.ensure_future(anext(chunks))
+        await asyncio.to_thread(reading.wait)
+        pending.cancel()
+        with pytest.raises(asyncio.CancelledError):
+            await pending
+
+    asyncio.run(cancel_mid_read())
+    assert closed.wait(1)
+
+
+def test_suggest_runs_on_the_loop(monkeypatch, created_task: Task) -> None:
+    """Test a suggestion from a loaded index doesn't queue on the database
+    executor."""
+    task_service.load_suggestions()
+    monkeypatch.setattr("data.aio.submit", lambda *args: pytest.fail())
+    resp = client.get("/task/suggest", params={"prefix": "async"})
+    assert resp.json() == [created_task.model_dump()]
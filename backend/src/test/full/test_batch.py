@@ -0,0 +1,103 @@
+import os
+import pytest
+from dotenv import load_dotenv
+from fastapi.testclient import TestClient
+from main import app
+from service import task as task_service
+
+# Load environment variables from .env file
+load_dotenv()
+
+# Use an in-memory SQLite database for testing
+os.environ["TODO_SQLITE_DB"] = ":memory:"
+
+# Create a test client for the FastAPI app
+client = TestClient(app)
+
+
+# FIXTURES
+@pytest.fixture(autouse=True)
+def clear_database() -> None:
+    """Fixture to clear the database before each test function."""
+    client.delete("/task")
+    client.delete("/user")
+
+
+@pytest.fixture(scope="function")
+def created_task() -> dict:
+    """Fixture to create a task in the database for testing."""
+    resp = client.post("/task", json={"task": "batched task"})
+    assert resp.status_code == 201
+    return resp.json()
+
+
+# TESTS
+def test_batch_commits(created_task: dict) -> None:
+    """Test a mixed batch runs in order and commits."""
+    ops = [
+        {"op": "create_task", "body": {"task": "new batched task"}},
+        {
+            "op": "modify_task",
+            "id": created_task["task_id"],
+            "body": {"task": "renamed"},
+        },
+        {"op": "create_user", "body": {"name": "batch user", "hash": "h"}},
+    ]
+    resp = client.post("/batch", json={"operations": ops})
+    assert resp.status_code == 200
+    body = resp.json()
+    assert body["committed"] is True
+    assert [r["status"] for r in body["results"]] == [201, 200, 201]
+    assert body["results"][1]["result"]["task"] == "renamed"
+    assert body["results"][2]["result"]["name"] == "batch user"
+
+
+def test_batch_atomic_rolls_back(created_task: dict) -> None:
+    """Test the first error undoes the whole atomic batch."""
+    ops = [
+        {"op": "create_task", "body": {"task": "rolled back task"}},
+        {"op": "create_task", "body": {"task": created_task["task"]}},
+        {"op": "delete_task", "id": created_task["task_id"]},
+    ]
+    resp = client.post("/batch", json={"operations": ops})
+    assert resp.status_code == 409
+    body = resp.json()
+    assert body["committed"] is False
+    assert [r["status"] for r in body["results"]] == [424, 409, 424]
+    assert client.get("/task").json() == [created_task]
+    # The index took the created task back out instead of being reset
+    assert task_service.suggestions.loaded
+    resp = client.get("/task/suggest", params={"prefix": "rolled"})
+    assert resp.json() == []
+
+
+def test_batch_without_tasks_keeps_suggestions(created_task: dict) -> None:
+    """Test a batch of user writes leaves the task index as it was."""
+    task_service.load_suggestions()
+    ops = [{"op": "create_user", "body": {"name": "batch user", "hash": "h"}}]
+    client.post("/batch", json={"operations": ops})
+    assert task_service.suggestions.loaded
+    resp = client.get("/task/suggest", params={"prefix": "batched"})
+    assert resp.json() == [created_task]
+
+
+def test_batch_best_effort(created_task: dict) -> None:
+    """Test failed operations are reported without stopping the rest."""
+    ops = [
+        {"op": "delete_task", "id": -1},
+        {"op": "modify_user", "body": {"name": "no id"}},
+        {"op": "delete_task", "id": created_task["task_id"]},
+    ]
+    resp = client.post("/batch", json={"operations": ops, "atomic": False})
+    assert resp.status_code == 200
+    body = resp.json()
+    assert body["committed"] is True
+    assert [r["status"] for r in body["results"]] == [404, 422, 204]
+    assert body["results"][0]["detail"] == 'Task with id "-1" not found'
+    assert client.get("/task").json() == []
+
+
+def test_batch_unknown_operation() -> None:
+    """Test an unknown op name is rejected up front."""
+    resp = client.post("/batch", json={"operations": [{"op": "drop_table"}]})
+    assert resp.status_code == 422
@@ -0,0 +1,71 @@
+import json
+import os
+import subprocess
+import sys
+from pathlib import Path
+
+SRC = Path(__file__).resolve().parents[2]
+# Seconds to import the app in a fresh interpreter, most of it FastAPI's
+IMPORT_BUDGET = 3.0
+
+
+def run_python(code: str, db_path: Path) -> dict:
+    """Return the JSON that <code> prints, run in a fresh interpreter."""
+    env = {
+        key: value
+        for key, value in os.environ.items()
+        if not key.startswith("TODO_")
+    }
+    env.update(TODO_SQLITE_DB=str(db_path), SECRET_KEY="startup test")
+    proc = subprocess.run(
+        [sys.executable, "-c", code],
+        cwd=SRC,
+        env=env,
+        capture_output=True,
+        text=True,
+        check=True,
+    )
+    return json.loads(proc.stdout.splitlines()[-1])
+
+
+# TESTS
+def test_import_is_fast_and_opens_nothing(tmp_path) -> None:
+    """Test importing the app stays in budget and leaves the database be."""
+    db_path = tmp_path / "todo.db"
+    code = """if True:
+        import json, time
+        start = time.perf_counter()
+        import main
+        print(json.dumps({"seconds": time.perf_counter() - start}))
+    """
+    result = run_python(code, db_path)
+    assert result["seconds"] < IMPORT_BUDGET
+    assert not db_path.exists()
+
+
+def test_lifespan_opens_and_closes_database(tmp_path) -> None:
+    """Test the lifespan connects with the schema, then closes on shutdown."""
+    db_path = tmp_path / "todo.db"
+    code = """if True:
+        import json
+        from fastapi.testclient import TestClient
+        import threading
+        from data.init import db
+        from main import app
+        with TestClient(app) as client:
+            during = db.stats()
+            status = client.get("/task").status_code
+        threads = [thread.name for thread in threading.enumerate()]
+        # A second lifespan starts a fresh executor
+        with TestClient(app) as client:
+            again = client.get("/task").status_code
+        print(json.dumps({"during": during, "status": status, "after": db.ready,
+                          "threads": threads, "again": again}))
+    """
+    result = run_python(code, db_path)
+    assert result["during"]["open"] == result["during"]["size"]
+    assert result["status"] == 200
+    assert result["after"] is False
+    assert not [name for name in result["threads"] if name.startswith("todo-db")]
+    assert result["again"] == 200
+    assert db_path.exists()
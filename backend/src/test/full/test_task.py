@@ -1,3 +1,6 @@
+import csv
+import io
+import json
 import os
 import pytest
 from dotenv import load_dotenv
@@ -86,6 +89,59 @@ def test_get_all_tasks_empty(clear_database) -> None:
     assert resp.json() == []
 
 
+def test_get_all_tasks_paginated(clear_database) -> None:
+    """Test following X-Next-Cursor until the last page."""
+    for i in range(5):
+        client.post("/task", json={"task": f"paged task {i}"})
+    seen, params = [], {"limit": 2}
+    while True:
+        resp = client.get("/task", params=params)
+        assert resp.status_code == 200
+        assert len(resp.json()) <= 2
+        seen += [t["task"] for t in resp.json()]
+        if not (cursor := resp.headers.get("X-Next-Cursor")):
+            break
+        params["after"] = cursor
+    assert seen == [f"paged task {i}" for i in range(5)]
+
+
+def test_search_tasks_paginated(clear_database) -> None:
+    """Test search pages through every match and nothing else."""
+    for i in range(5):
+        client.post("/task", json={"task": f"searchable task {i}"})
+    client.post("/task", json={"task": "something else"})
+    seen, params = [], {"q": "search", "limit": 2}
+    while True:
+        resp = client.get("/task/search", params=params)
+        assert resp.status_code == 200
+        seen += [t["task"] for t in resp.json()]
+        if not (cursor := resp.headers.get("X-Next-Cursor")):
+            break
+        params["after"] = cursor
+    assert sorted(seen) == [f"searchable task {i}" for i in range(5)]
+
+
+def test_suggest_tasks(clear_database) -> None:
+    """Test suggestions match the start of task text."""
+    for name in ("Plan trip", "plant seeds", "call plumber"):
+        client.post("/task", json={"task": name})
+    resp = client.get("/task/suggest", params={"prefix": "pla", "limit": 5})
+    assert resp.status_code == 200
+    assert [t["task"] for t in resp.json()] == ["Plan trip", "plant seeds"]
+
+
+def test_search_tasks_bad_cursor() -> None:
+    """Test a list cursor is not accepted by search."""
+    resp = client.get("/task/search", params={"q": "x", "after": "MQ"})
+    assert resp.status_code == 400
+
+
+def test_get_all_tasks_bad_cursor() -> None:
+    """Test an unreadable cursor is rejected."""
+    resp = client.get("/task", params={"after": "not-a-cursor"})
+    assert resp.status_code == 400
+
+
 def test_modify_task(created_task: Task, modified_task: TaskCreate) -> None:
     """Test modifying an existing task."""
     resp = client.patch(
@@ -125,3 +181,75 @@ def test_delete_all_tasks_empty(clear_database) -> None:
     """Test deleting all tasks when there are no tasks."""
     resp = client.delete("/task")
     assert resp.status_code == 204
+
+
+def test_export_tasks_ndjson(clear_database) -> None:
+    """Test exporting tasks as newline-delimited JSON."""
+    tasks = [
+        client.post("/task", json={"task": f'export "{i}"'}).json() for i in range(3)
+    ]
+    resp = client.get("/task/export")
+    assert resp.status_code == 200
+    assert resp.headers["content-type"].startswith("application/x-ndjson")
+    assert [json.loads(line) for line in resp.text.splitlines()] == tasks
+
+
+def test_export_tasks_csv(clear_database, created_task: Task) -> None:
+    """Test exporting tasks as CSV with a header row."""
+    resp = client.get("/task/export", params={"format": "csv"})
+    assert resp.status_code == 200
+    rows = list(csv.reader(io.StringIO(resp.text)))
+    assert rows == [["task_id", "task"], [str(created_task.task_id), created_task.task]]
+
+
+def test_export_tasks_bad_format() -> None:
+    """Test an unknown export format is rejected."""
+    resp = client.get("/task/export", params={"format": "xml"})
+    assert resp.status_code == 422
+
+
+def test_create_tasks_batch(clear_database, created_task: Task) -> None:
+    """Test a batch reports conflicts per item without aborting."""
+    batch = [
+        {"task": "batch one"},
+        {"task": created_task.task.upper()},
+        {"task": "batch two"},
+        {"task": "Batch One"},
+    ]
+    resp = client.post("/task/batch", json=batch)
+    assert resp.status_code == 200
+    results = resp.json()
+    assert [r["status"] for r in results] == [201, 409, 201, 409]
+    assert results[0]["result"]["task"] == "batch one"
+    assert results[1]["detail"] == f'Task "{created_task.task.upper()}" already exists'
+    assert len(client.get("/task").json()) == 3
+
+
+def test_create_tasks_batch_invalid_item() -> None:
+    """Test one invalid item rejects the whole request before any insert."""
+    resp = client.post("/task/batch", json=[{"task": "valid"}, {"task": "no"}])
+    assert resp.status_code == 422
+
+
+def test_get_all_tasks_not_modified(clear_database, created_task: Task) -> None:
+    """Test a conditional list request gets 304 until the next write."""
+    resp = client.get("/task")
+    etag = resp.headers["ETag"]
+    resp = client.get("/task", headers={"If-None-Match": etag})
+    assert resp.status_code == 304
+    assert resp.content == b""
+    client.post("/task", json={"task": "etag task"})
+    resp = client.get("/task", headers={"If-None-Match": etag})
+    assert resp.status_code == 200
+    assert resp.headers["ETag"] != etag
+
+
+def test_get_single_task_not_modified(clear_database, created_task: Task) -> None:
+    """Test a conditional item request gets 304 until the task changes."""
+    url = f"/task/{created_task.task_id}"
+    etag = client.get(url).headers["ETag"]
+    assert client.get(url, headers={"If-None-Match": etag}).status_code == 304
+    client.patch(url, json={"task": "etag modified"})
+    resp = client.get(url, headers={"If-None-Match": etag})
+    assert resp.status_code == 200
+    assert resp.json()["task"] == "etag modified"
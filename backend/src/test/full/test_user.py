@@ -4,6 +4,7 @@ from dotenv import load_dotenv
 from fastapi.testclient import TestClient
 from model.user import User, UserCreate
 from main import app
+from service.user import decode_token
 from passlib.context import CryptContext
 import uuid
 
@@ -63,6 +64,30 @@ def test_create_access_token(created_user: dict) -> None:
     assert response.status_code == 200
     assert "access_token" in response.json()
 
+    # The token identifies the user by id and token version
+    claims = decode_token(response.json()["access_token"])
+    assert claims["uid"] == created_user["user_id"]
+    assert claims["ver"] == 0
+
+
+def test_logout(created_user: dict) -> None:
+    """Test a logged out token is refused."""
+    test_user = {"username": created_user["name"], "password": "testpassword"}
+    token = client.post("/user/token", data=test_user).json()["access_token"]
+    headers = {"Authorization": f"Bearer {token}"}
+    assert client.post("/user/logout", headers=headers).status_code == 204
+    assert client.post("/user/logout", headers=headers).status_code == 401
+
+
+def test_get_me(created_user: dict) -> None:
+    """Test the current user is resolved from the token."""
+    test_user = {"username": created_user["name"], "password": "testpassword"}
+    token = client.post("/user/token", data=test_user).json()["access_token"]
+    headers = {"Authorization": f"Bearer {token}"}
+    assert client.get("/user/me", headers=headers).json() == created_user
+    headers = {"Authorization": "Bearer not-a-token"}
+    assert client.get("/user/me", headers=headers).status_code == 401
+
 
 def test_create_user(new_user: UserCreate) -> None:
     """Test creating a new user."""
@@ -104,6 +129,17 @@ def test_get_all_users_empty(clear_database) -> None:
     assert resp.json() == []
 
 
+def test_get_all_users_page_size(clear_database) -> None:
+    """Test the page size is honoured and a next cursor is returned."""
+    for i in range(3):
+        client.post("/user", json={"name": f"paged user {i}", "hash": "h"})
+    resp = client.get("/user", params={"limit": 2})
+    assert len(resp.json()) == 2
+    resp = client.get("/user", params={"after": resp.headers["X-Next-Cursor"]})
+    assert [u["name"] for u in resp.json()] == ["paged user 2"]
+    assert "X-Next-Cursor" not in resp.headers
+
+
 def test_modify_user(created_user: dict, modified_user: UserCreate) -> None:
     """Test modifying an existing user."""
     resp = client.patch(
@@ -143,3 +179,12 @@ def test_delete_all_users_empty(clear_database) -> None:
     """Test deleting all users when there are no users."""
     resp = client.delete("/user")
     assert resp.status_code == 204
+
+
+def test_get_single_user_not_modified(created_user: dict) -> None:
+    """Test a conditional user request gets 304 until the user changes."""
+    url = f"/user/{created_user['user_id']}"
+    etag = client.get(url).headers["ETag"]
+    assert client.get(url, headers={"If-None-Match": etag}).status_code == 304
+    client.delete(url)
+    assert client.get(url, headers={"If-None-Match": etag}).status_code == 404
@@ -0,0 +1,28 @@
+from bench.load import PROFILES, Recorder, Workload
+
+
+# TESTS
+def test_profiles_name_actions() -> None:
+    """Test every profile weight names a Workload action."""
+    for weights in PROFILES.values():
+        for name in weights:
+            assert callable(getattr(Workload, name))
+
+
+def test_histogram_buckets() -> None:
+    """Test latencies land in the bucket bounding them from above."""
+    histogram = Recorder.histogram([0.0005, 0.001, 0.0015, 0.3, 9.0])
+    assert histogram == {"<=1ms": 2, "<=2ms": 1, "<=500ms": 1, ">5000ms": 1}
+
+
+def test_report_breaks_down_errors() -> None:
+    """Test failures are counted per route by status or exception."""
+    recorder = Recorder()
+    recorder.record("GET /task", 0.01, 200)
+    recorder.record("GET /task", 0.02, 503)
+    recorder.record("POST /task", 0.03, "ReadTimeout")
+    report = recorder.report(elapsed=1.0)
+    assert report["routes"]["GET /task"]["errors"] == {"503": 1}
+    assert report["routes"]["POST /task"]["errors"] == {"ReadTimeout": 1}
+    assert report["total"]["count"] == 3
+    assert report["total"]["ops"] == 3
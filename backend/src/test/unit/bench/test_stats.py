@@ -0,0 +1,32 @@
+from bench.stats import compare, percentile, summarize
+
+
+# TESTS
+def test_percentile() -> None:
+    """Test nearest-rank percentiles of a sorted sample."""
+    ordered = [float(i) for i in range(1, 101)]
+    assert percentile(ordered, 50) == 50
+    assert percentile(ordered, 99) == 99
+    assert percentile(ordered, 0) == 1
+    assert percentile([], 50) == 0
+
+
+def test_summarize() -> None:
+    """Test throughput comes from the summed durations by default."""
+    summary = summarize([0.001] * 10)
+    assert summary["count"] == 10
+    assert summary["ops"] == 1000
+    assert summary["p50_ms"] == 1
+    assert summarize([0.001] * 10, elapsed=0.005)["ops"] == 2000
+
+
+def test_compare_flags_regressions() -> None:
+    """Test only cases slower than the threshold are flagged."""
+    base = {"ops": 1000.0, "p50_ms": 1.0, "p99_ms": 2.0}
+    baseline = {"same": base, "slower": base, "new": None}
+    results = {
+        "same": {"ops": 950.0, "p50_ms": 1.05, "p99_ms": 2.1},
+        "slower": {"ops": 700.0, "p50_ms": 1.4, "p99_ms": 3.0},
+        "unknown": base,
+    }
+    assert compare(baseline, results, threshold=0.2) == ["slower"]
@@ -0,0 +1,172 @@
+import threading
+from sqlite3 import IntegrityError
+import pytest
+from error import PoolTimeout
+from data.init import ConnectionPool, Database
+
+
+# FIXTURES
+@pytest.fixture
+def pool(tmp_path) -> ConnectionPool:
+    """Provide a file-backed pool with room for two connections."""
+    pool = ConnectionPool(str(tmp_path / "pool.db"), size=2, timeout=0.05)
+    yield pool
+    pool.close()
+
+
+@pytest.fixture
+def database(tmp_path) -> Database:
+    """Provide a file-backed Database with a small table."""
+    database = Database(str(tmp_path / "todo.db"))
+    database.execute("CREATE TABLE item (item_id INTEGER PRIMARY KEY, name TEXT)")
+    for i in range(1, 51):
+        database.execute("INSERT INTO item (name) VALUES (?)", (f"item {i}",))
+    yield database
+    database.close()
+
+
+# TESTS
+def test_checkout_is_bounded(pool: ConnectionPool) -> None:
+    """Test the pool never hands out more than <size> connections."""
+    first = pool.checkout()
+    second = pool.checkout()
+    assert first is not second
+    with pytest.raises(PoolTimeout):
+        pool.checkout()
+    assert pool.stats()["timeouts"] == 1
+
+
+def test_checkin_reuses_connection(pool: ConnectionPool) -> None:
+    """Test a returned connection is handed out again."""
+    conn = pool.checkout()
+    pool.checkin(conn)
+    assert pool.checkout() is conn
+    assert pool.stats()["open"] == 1
+
+
+def test_checkout_waits_for_checkin(pool: ConnectionPool) -> None:
+    """Test a waiting thread gets the connection released by another."""
+    held = [pool.checkout(), pool.checkout()]
+    timer = threading.Timer(0.01, pool.checkin, args=(held[0],))
+    timer.start()
+    assert pool.checkout(timeout=1) is held[0]
+    assert pool.stats()["waits"] == 1
+
+
+def test_memory_pool_has_one_connection() -> None:
+    """Test an in-memory pool is capped at one shared connection."""
+    assert ConnectionPool(":memory:", size=8).size == 1
+
+
+def test_connection_is_reentrant(database: Database) -> None:
+    """Test nested leases on one thread share a connection."""
+    with database.connection() as outer:
+        with database.connection() as inner:
+            assert inner is outer
+        assert database.stats()["in_use"] == 1
+    assert database.stats()["in_use"] == 0
+
+
+def test_concurrent_reads(database: Database) -> None:
+    """Test threads reading at once each get their own rows back."""
+    errors = []
+
+    def read(item_id: int) -> None:
+        for _ in range(20):
+            row = database.fetchone(
+                "SELECT * FROM item WHERE item_id = ?", (item_id,)
+            )
+            if row != (item_id, f"item {item_id}"):
+                errors.append(row)
+
+    threads = [threading.Thread(target=read, args=(i,)) for i in range(1, 51)]
+    for thread in threads:
+        thread.start()
+    for thread in threads:
+        thread.join()
+    assert errors == []
+    assert database.stats()["open"] <= database.pool_size
+
+
+def test_reads_do_not_open_transactions(database: Database) -> None:
+    """Test a read leaves the connection in autocommit mode."""
+    with database.connection() as conn:
+        database.fetchall("SELECT * FROM item")
+        assert not conn.in_transaction
+
+
+def test_transaction_rolls_back(database: Database) -> None:
+    """Test an exception inside transaction() undoes its writes."""
+    with pytest.raises(RuntimeError):
+        with database.transaction():
+            database.execute("DELETE FROM item")
+            raise RuntimeError
+    assert len(database.fetchall("SELECT * FROM item")) == 50
+
+
+def test_group_commit(tmp_path, monkeypatch) -> None:
+    """Test concurrent writes share commits and still fail individually."""
+    monkeypatch.setenv("TODO_SQLITE_GROUP_COMMIT_MS", "20")
+    database = Database(str(tmp_path / "group.db"))
+    database.execute("CREATE TABLE item (name TEXT UNIQUE)")
+    errors = []
+
+    def write(name: str) -> None:
+        try:
+            database.execute("INSERT INTO item (name) VALUES (?)", (name,))
+        except IntegrityError as exc:
+            errors.append(exc)
+
+    names = [f"item {i}" for i in range(20)] + ["item 0"]
+    threads = [threading.Thread(target=write, args=(name,)) for name in names]
+    for thread in threads:
+        thread.start()
+    for thread in threads:
+        thread.join()
+    stats = database.stats()["group_commit"]
+    assert len(errors) == 1
+    assert stats["writes"] == 21
+    assert stats["commits"] < stats["writes"]
+    assert len(database.fetchall("SELECT * FROM item")) == 20
+    database.close()
+
+
+def test_group_commit_fetch_takes_no_lease(tmp_path, monkeypatch) -> None:
+    """Test a write read back through fetchone waits out the group commit
+    window without holding a pooled connection."""
+    monkeypatch.setenv("TODO_SQLITE_GROUP_COMMIT_MS", "20")
+    database = Database(str(tmp_path / "group.db"))
+    database.execute("CREATE TABLE item (name TEXT)")
+    in_use = []
+    database.pool.checkout = lambda *args: in_use.append(args)  # must not run
+    query = "INSERT INTO item (name) VALUES (?) RETURNING rowid"
+    assert database.fetchone(query, ("one",)) == (1,)
+    assert database.fetchall(query, ("two",)) == [(2,)]
+    assert in_use == []
+    database.close()
+
+
+def test_schema_is_created_on_connect(tmp_path, monkeypatch) -> None:
+    """Test nothing opens before first use, which creates the schema."""
+    path = tmp_path / "lazy.db"
+    monkeypatch.setenv("TODO_SQLITE_DB", str(path))
+    database = Database()
+    created = []
+
+    @database.schema
+    def create_item() -> None:
+        created.append("item")
+        database.execute("CREATE TABLE IF NOT EXISTS item (name TEXT)")
+
+    assert not path.exists() and not created
+    database.execute("INSERT INTO item VALUES ('first')")
+    assert database.db_name == str(path)
+
+    # Registered late, so it runs at once; and every schema runs again on
+    # reconnect
+    database.schema(lambda: created.append("late"))
+    database.close()
+    database.warm()
+    assert database.stats()["open"] == database.pool_size
+    assert created == ["item", "late", "item", "late"]
+    database.close()
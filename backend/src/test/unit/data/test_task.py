@@ -8,6 +8,7 @@ from error import MissingTask, DuplicateTask
 load_dotenv()
 os.environ["TODO_SQLITE_DB"] = ":memory:"
 from data import task
+from bench.statements import count_statements
 
 
 # FIXTURES
@@ -43,6 +44,24 @@ def test_create_task(new_task: TaskCreate) -> None:
     assert resp.task == new_task.task
 
 
+def test_create_task_single_statement(new_task: TaskCreate) -> None:
+    """Test a create reads the new row back in the INSERT itself."""
+    resp, statements = count_statements(task.create_task, new_task)
+    assert resp.task == new_task.task
+    if task.SUPPORTS_RETURNING:
+        assert len(statements) == 1
+
+
+def test_create_task_without_returning(monkeypatch, new_task: TaskCreate) -> None:
+    """Test the INSERT then SELECT fallback for SQLite before 3.35."""
+    monkeypatch.setattr(task, "SUPPORTS_RETURNING", False)
+    resp, statements = count_statements(task.create_task, new_task)
+    assert resp == task.get_single_task(resp.task_id)
+    assert len(statements) == 2
+    with pytest.raises(DuplicateTask):
+        task.create_task(new_task)
+
+
 def test_create_task_duplicate(new_task: TaskCreate) -> None:
     """Test creating a duplicate task raises a Duplicate exception."""
     task.create_task(new_task)
@@ -50,6 +69,17 @@ def test_create_task_duplicate(new_task: TaskCreate) -> None:
         task.create_task(new_task)
 
 
+def test_create_tasks(created_task: Task) -> None:
+    """Test bulk insert returns rows in order and duplicates as exceptions."""
+    batch = [TaskCreate(task="bulk 1"), TaskCreate(task="TEST TASK")]
+    batch += [TaskCreate(task="bulk 2"), TaskCreate(task="bulk 1")]
+    first, dup, second, in_batch_dup = task.create_tasks(batch)
+    assert first == task.get_single_task(first.task_id)
+    assert second.task_id > first.task_id
+    assert isinstance(dup, DuplicateTask)
+    assert isinstance(in_batch_dup, DuplicateTask)
+
+
 def test_get_single_task(created_task: Task) -> None:
     """Test retrieving a single task by ID."""
     resp = task.get_single_task(created_task.task_id)
@@ -74,12 +104,48 @@ def test_get_all_tasks_empty() -> None:
     assert resp == []
 
 
+def test_get_all_tasks_page() -> None:
+    """Test paging through tasks with limit and after."""
+    created = [task.create_task(TaskCreate(task=f"task {i}")) for i in range(5)]
+    first = task.get_all_tasks(limit=2)
+    assert first == created[:2]
+    rest = task.get_all_tasks(limit=10, after=first[-1].task_id)
+    assert rest == created[2:]
+
+
+def test_iter_task_chunks() -> None:
+    """Test raw rows are streamed in chunks of the requested size."""
+    created = [task.create_task(TaskCreate(task=f"task {i}")) for i in range(5)]
+    chunks = list(task.iter_task_chunks(size=2))
+    assert [len(chunk) for chunk in chunks] == [2, 2, 1]
+    assert [row for chunk in chunks for row in chunk] == [
+        (t.task_id, t.task) for t in created
+    ]
+
+
 def test_modify(created_task: Task, modified_task: TaskCreate) -> None:
     """Test modifying an existing task."""
     resp = task.modify_task(created_task.task_id, modified_task)
     assert resp.task == modified_task.task
 
 
+def test_modify_single_statement(created_task: Task, modified_task: TaskCreate) -> None:
+    """Test a modify returns the updated row from the UPDATE itself."""
+    resp, statements = count_statements(
+        task.modify_task, created_task.task_id, modified_task
+    )
+    assert resp.task == modified_task.task
+    if task.SUPPORTS_RETURNING:
+        assert len(statements) == 1
+
+
+def test_modify_without_returning(monkeypatch, modified_task: TaskCreate) -> None:
+    """Test the UPDATE then SELECT fallback still reports a missing task."""
+    monkeypatch.setattr(task, "SUPPORTS_RETURNING", False)
+    with pytest.raises(MissingTask):
+        task.modify_task(-1, modified_task)
+
+
 def test_modify_missing(modified_task: TaskCreate) -> None:
     """Test modifying a non-existent task raises a Missing exception."""
     with pytest.raises(MissingTask):
@@ -112,3 +178,48 @@ def test_delete_all_tasks_empty() -> None:
     resp = task.delete_all_tasks()
     assert resp is None
     assert task.get_all_tasks() == []
+
+
+def test_search_tasks_by_prefix() -> None:
+    """Test search matches word prefixes and ranks the closer match first."""
+    walk = task.create_task(TaskCreate(task="walk the dog"))
+    dogs = task.create_task(TaskCreate(task="dog food for dogs"))
+    task.create_task(TaskCreate(task="buy groceries"))
+    hits = [t for _, t in task.search_tasks("do")]
+    assert sorted(t.task_id for t in hits) == [walk.task_id, dogs.task_id]
+    assert [t for _, t in task.search_tasks("gro BUY")][0].task == "buy groceries"
+
+
+def test_search_tasks_follows_writes(created_task: Task) -> None:
+    """Test the index tracks modified and deleted tasks."""
+    task.modify_task(created_task.task_id, TaskCreate(task="renamed chore"))
+    assert task.search_tasks("test") == []
+    assert [t for _, t in task.search_tasks("chore")] == [
+        Task(task_id=created_task.task_id, task="renamed chore")
+    ]
+    task.delete_task(created_task.task_id)
+    assert task.search_tasks("chore") == []
+
+
+def test_search_tasks_pages() -> None:
+    """Test the (rank, task_id) key picks up where the last page ended."""
+    for i in range(5):
+        task.create_task(TaskCreate(task=f"paged task {i}"))
+    first = task.search_tasks("paged", limit=3)
+    rest = task.search_tasks("paged", after=(first[-1][0], first[-1][1].task_id))
+    assert len(first) == 3
+    assert len(rest) == 2
+    assert {t.task for _, t in first + rest} == {f"paged task {i}" for i in range(5)}
+
+
+def test_search_tasks_ignores_query_syntax(created_task: Task) -> None:
+    """Test FTS5 operators in the query are treated as plain words."""
+    assert task.search_tasks('"') == []
+    assert task.search_tasks("test OR NOT") == []
+    assert len(task.search_tasks("test*")) == 1
+
+
+def test_rebuild_search_index(created_task: Task) -> None:
+    """Test rebuilding the index keeps existing tasks searchable."""
+    task.rebuild_search_index()
+    assert len(task.search_tasks("test")) == 1
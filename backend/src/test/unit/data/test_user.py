@@ -75,6 +75,16 @@ def test_get_all_users_empty() -> None:
     assert resp == []
 
 
+def test_get_all_users_page() -> None:
+    """Ensure users can be paged through with limit and after."""
+    created = [
+        user.create_user(UserCreate(name=f"user {i}", hash="h")) for i in range(3)
+    ]
+    first = user.get_all_users(limit=1)
+    assert first == created[:1]
+    assert user.get_all_users(after=first[-1].user_id) == created[1:]
+
+
 def test_modify(created_user: User, modified_user: UserCreate) -> None:
     """Ensure a user can be modified successfully."""
     resp = user.modify_user(created_user.user_id, modified_user)
@@ -82,6 +92,20 @@ def test_modify(created_user: User, modified_user: UserCreate) -> None:
     assert resp.hash == modified_user.hash
 
 
+def test_modify_partial(created_user: User) -> None:
+    """Ensure fields left unset in a UserUpdate keep their value."""
+    resp = user.modify_user(created_user.user_id, UserUpdate(hash="new hash"))
+    assert resp.name == created_user.name
+    assert resp.hash == "new hash"
+
+
+def test_modify_duplicate(created_user: User) -> None:
+    """Verify that renaming onto an existing name raises DuplicateUser."""
+    other = user.create_user(UserCreate(name="other user", hash="h"))
+    with pytest.raises(DuplicateUser):
+        user.modify_user(other.user_id, UserUpdate(name=created_user.name))
+
+
 def test_modify_missing(modified_user: UserCreate) -> None:
     """Verify that modifying a non-existent user raises a MissingUser exception."""
     with pytest.raises(MissingUser):
@@ -114,3 +138,11 @@ def test_delete_all_users_empty() -> None:
     resp = user.delete_all_users()
     assert resp is None
     assert user.get_all_users() == []
+
+
+def test_modify_bumps_token_version(created_user: User) -> None:
+    """Ensure every modification moves the user to a new token version."""
+    assert created_user.token_version == 0
+    resp = user.modify_user(created_user.user_id, UserUpdate(hash="new hash"))
+    assert resp.token_version == 1
+    assert user.get_single_user(created_user.user_id).token_version == 1
@@ -0,0 +1,110 @@
+import threading
+from data.init import Database
+from monitor.metrics import Collected, Counter, Gauge, Histogram, Registry, registry
+from service import task, user
+from service.cache import LRUCache
+from service.suggest import PrefixIndex
+
+
+# TESTS
+def test_counter_sums_thread_shards() -> None:
+    """Test increments from many threads all land in the total."""
+    counter = Counter("hits_total", "Hits", ("route",))
+
+    def hit() -> None:
+        for _ in range(1000):
+            counter.inc(("/task",))
+
+    threads = [threading.Thread(target=hit) for _ in range(8)]
+    for thread in threads:
+        thread.start()
+    for thread in threads:
+        thread.join()
+    assert counter.render().splitlines() == [
+        "# HELP hits_total Hits",
+        "# TYPE hits_total counter",
+        'hits_total{route="/task"} 8000',
+    ]
+
+
+def test_gauge_goes_down() -> None:
+    """Test a gauge decremented on another thread sums to zero."""
+    gauge = Gauge("busy", "Busy")
+    gauge.inc()
+    thread = threading.Thread(target=gauge.dec)
+    thread.start()
+    thread.join()
+    assert gauge.render().splitlines()[-1] == "busy 0"
+
+
+def test_histogram_buckets_are_cumulative() -> None:
+    """Test each bucket counts the observations at or below its bound."""
+    histogram = Histogram("latency_seconds", "Latency", buckets=(0.1, 1.0))
+    for value in (0.05, 0.1, 0.5, 2.0):
+        histogram.observe(value)
+    assert histogram.render().splitlines()[2:] == [
+        'latency_seconds_bucket{le="0.1"} 2',
+        'latency_seconds_bucket{le="1.0"} 3',
+        'latency_seconds_bucket{le="+Inf"} 4',
+        "latency_seconds_sum 2.65",
+        "latency_seconds_count 4",
+    ]
+
+
+def test_label_values_are_escaped() -> None:
+    """Test quotes and newlines in a label value can't break the format."""
+    counter = Counter("odd_total", "Odd", ("route",))
+    counter.inc(('say "hi"\n',))
+    assert counter.render().splitlines()[-1] == r'odd_total{route="say \"hi\"\n"} 1'
+
+
+def test_registry_renders_collected_values() -> None:
+    """Test a collected metric is read when the registry renders."""
+    registry = Registry()
+    values = {("idle",): 1}
+    registry.register(Collected("conns", "Conns", lambda: values, ("state",)))
+    values[("idle",)] = 3
+    assert registry.render().endswith('conns{state="idle"} 3\n')
+
+
+def test_database_observers_see_each_statement(tmp_path) -> None:
+    """Test an observer is called once per statement, fetches included."""
+    database = Database(str(tmp_path / "todo.db"))
+    seen = []
+    database.observers.append(lambda query, params, seconds: seen.append(query))
+    database.execute("CREATE TABLE item (name TEXT)")
+    database.executemany("INSERT INTO item VALUES (?)", [("a",), ("b",)])
+    database.fetchall("SELECT name FROM item")
+    database.fetchone("SELECT count(*) FROM item")
+    database.close()
+    assert [query.split()[0] for query in seen] == [
+        "CREATE",
+        "INSERT",
+        "SELECT",
+        "SELECT",
+    ]
+
+
+def test_suggest_index_is_collected(monkeypatch) -> None:
+    """Test /metrics reports the prefix index's entries and footprint."""
+    index = PrefixIndex()
+    index.load([[(1, "buy milk"), (2, "walk dog")]])
+    monkeypatch.setattr(task, "suggestions", index)
+    text = registry.render()
+    assert "todo_suggest_index_entries 2\n" in text
+    assert f"todo_suggest_index_bytes {index.stats()['bytes']}\n" in text
+
+
+def test_cache_stats_are_collected(monkeypatch) -> None:
+    """Test /metrics reports each service cache's counters by name."""
+    cache = LRUCache(maxsize=1)
+    monkeypatch.setattr(user, "principals", cache)
+    cache.get("a")
+    cache.put("a", 1)
+    cache.put("b", 2)
+    cache.get("b")
+    text = registry.render()
+    assert 'todo_cache_hits_total{cache="principal"} 1\n' in text
+    assert 'todo_cache_misses_total{cache="principal"} 1\n' in text
+    assert 'todo_cache_evictions_total{cache="principal"} 1\n' in text
+    assert 'todo_cache_entries{cache="principal"} 1\n' in text
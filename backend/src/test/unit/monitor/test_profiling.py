@@ -0,0 +1,61 @@
+import pstats
+import threading
+import pytest
+from error import ProfilerBusy
+from monitor import profiling
+
+
+# FIXTURES
+@pytest.fixture
+def busy_thread() -> threading.Thread:
+    """Provide a thread spinning in spin_here() until the test ends."""
+    stop = threading.Event()
+    kept = []
+
+    def spin_here() -> None:
+        while not stop.is_set():
+            kept.append(bytearray(1024))
+            del kept[:-2000]
+
+    thread = threading.Thread(target=spin_here, name="spinner")
+    thread.start()
+    yield thread
+    stop.set()
+    thread.join()
+
+
+# TESTS
+def test_cpu_profile_formats(busy_thread: threading.Thread, tmp_path) -> None:
+    """Test a busy thread shows up in each format of the CPU profile."""
+    cpu = profiling.profile_cpu(0.2, interval=0.002)
+    assert cpu.elapsed >= 0.2
+    spinner = [
+        line for line in cpu.collapsed().splitlines() if line.startswith("spinner;")
+    ]
+    assert spinner and all("spin_here (test_profiling.py:" in line for line in spinner)
+    assert "(spin_here)" in cpu.text()
+    path = tmp_path / "cpu.pstats"
+    path.write_bytes(cpu.pstats_dump())
+    stats = pstats.Stats(str(path)).stats
+    (spin,) = [func for func in stats if func[2] == "spin_here"]
+    calls, _, _, cumulative, _ = stats[spin]
+    assert calls > 10 and cumulative == pytest.approx(calls * 0.002)
+
+
+def test_one_profile_at_a_time() -> None:
+    """Test a second profile is refused while one runs."""
+    with profiling.exclusive():
+        with pytest.raises(ProfilerBusy):
+            profiling.profile_cpu(0.01)
+    profiling.profile_cpu(0.01)
+
+
+def test_memory_diff_finds_growth(busy_thread: threading.Thread) -> None:
+    """Test the allocating line is among the largest growths."""
+    report = profiling.profile_memory(0.2, top=5)
+    assert report["top"]
+    assert any(
+        "test_profiling.py" in where
+        for stat in report["top"]
+        for where in stat["where"]
+    )
@@ -0,0 +1,55 @@
+import logging
+import pytest
+from data.init import Database
+from monitor.queries import QueryProfiler, normalize
+
+
+# FIXTURES
+@pytest.fixture
+def database(tmp_path) -> Database:
+    """Provide a file-backed Database with a small, unindexed table."""
+    database = Database(str(tmp_path / "todo.db"))
+    database.execute("CREATE TABLE item (item_id INTEGER PRIMARY KEY, name TEXT)")
+    database.executemany(
+        "INSERT INTO item (name) VALUES (?)", [(f"item {i}",) for i in range(50)]
+    )
+    yield database
+    database.close()
+
+
+# TESTS
+def test_normalize_folds_literals_and_placeholders() -> None:
+    """Test statements differing only in values normalize alike."""
+    assert normalize("SELECT *\n  FROM task WHERE task_id IN (?, ?,?)") == (
+        "SELECT * FROM task WHERE task_id IN (?, ...)"
+    )
+    assert normalize("SELECT 1 FROM t2 WHERE name = 'it''s' LIMIT 10") == (
+        "SELECT ? FROM t2 WHERE name = ? LIMIT ?"
+    )
+
+
+def test_statements_aggregate_by_normalized_text(database: Database) -> None:
+    """Test the top statements count every run of the same query."""
+    profiler = QueryProfiler(database, slow_ms=0)
+    database.observers.append(profiler)
+    for i in range(1, 4):
+        database.fetchone("SELECT name FROM item WHERE item_id = ?", (i,))
+    database.fetchall("SELECT * FROM item")
+    top = profiler.top(order="count")
+    assert top[0]["query"] == "SELECT name FROM item WHERE item_id = ?"
+    assert top[0]["count"] == 3
+    assert top[0]["max_ms"] >= top[0]["p99_ms"] > 0
+    assert len(profiler.top(n=1)) == 1
+    profiler.reset()
+    assert profiler.top() == []
+
+
+def test_slow_query_logs_plan(database: Database, caplog) -> None:
+    """Test a statement over the threshold is logged with its query plan."""
+    profiler = QueryProfiler(database, slow_ms=1e-6, aggregate=False)
+    database.observers.append(profiler)
+    with caplog.at_level(logging.WARNING, logger="monitor.queries"):
+        database.fetchall("SELECT * FROM item WHERE name = ?", ("item 3",))
+    assert "slow query" in caplog.text
+    assert "SCAN item" in caplog.text
+    assert profiler.top() == []
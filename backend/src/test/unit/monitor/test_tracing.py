@@ -0,0 +1,110 @@
+import asyncio
+import json
+import pytest
+from monitor import tracing
+from monitor.tracing import Tracer, to_otlp, trace_query, traced
+
+
+# FIXTURES
+@pytest.fixture
+def tracer(monkeypatch) -> Tracer:
+    """Provide a tracer sampling every trace, as the module's tracer."""
+    tracer = Tracer(sample=1, buffer=2)
+    monkeypatch.setattr(tracing, "tracer", tracer)
+    return tracer
+
+
+@traced
+def lookup(fail: bool = False) -> str:
+    trace_query("SELECT * FROM task WHERE task_id = 3", (), 0.001)
+    if fail:
+        raise KeyError("missing")
+    return "found"
+
+
+@traced
+async def lookup_async() -> str:
+    return lookup()
+
+
+# TESTS
+def test_unsampled_calls_record_nothing() -> None:
+    """Test nothing is kept when no trace is sampled."""
+    tracer = Tracer(sample=0)
+    with tracer.trace("GET /task") as root:
+        assert root is None
+        assert lookup() == "found"
+    assert tracer.recent() == []
+
+
+def test_spans_nest_under_the_root(tracer: Tracer) -> None:
+    """Test service and statement spans are children in one trace."""
+    with tracer.trace("GET /task/{task_id}"):
+        lookup()
+    (trace,) = tracer.recent()
+    root, query, service = sorted(trace["spans"], key=lambda span: span["name"])
+    assert root["name"] == trace["name"] == "GET /task/{task_id}"
+    assert service["name"] == "test.unit.monitor.test_tracing.lookup"
+    assert service["parent_id"] == root["span_id"]
+    assert query["name"] == "db SELECT"
+    assert query["parent_id"] == service["span_id"]
+    assert query["attributes"]["db.statement"].endswith("task_id = ?")
+    # Compare against the unrounded spans; rounded durations don't subtract
+    spans = {span.name: span for span in tracer.traces[-1]}
+    own_ms = spans[root["name"]].duration_ms - spans[service["name"]].duration_ms
+    assert root["self_ms"] == round(own_ms, 3)
+
+
+def test_errors_are_recorded(tracer: Tracer) -> None:
+    """Test a span records the exception that escaped it."""
+    with pytest.raises(KeyError):
+        with tracer.trace("GET /task"):
+            lookup(fail=True)
+    (trace,) = tracer.recent()
+    errors = {span["name"]: span["error"] for span in trace["spans"]}
+    assert errors == {
+        "GET /task": "KeyError: 'missing'",
+        "test.unit.monitor.test_tracing.lookup": "KeyError: 'missing'",
+        "db SELECT": "",
+    }
+
+
+def test_context_follows_async_and_threads(tracer: Tracer) -> None:
+    """Test spans opened in an executor thread join the caller's trace."""
+
+    async def request() -> None:
+        with tracer.trace("GET /task"):
+            await lookup_async()
+            await asyncio.to_thread(lookup)
+
+    asyncio.run(request())
+    (trace,) = tracer.recent()
+    names = [span["name"] for span in trace["spans"]]
+    assert names.count("db SELECT") == 2
+    assert len({span["span_id"] for span in trace["spans"]}) == 6
+
+
+def test_buffer_keeps_the_newest(tracer: Tracer) -> None:
+    """Test the ring buffer drops the oldest trace and filters by id."""
+    ids = []
+    for name in ("a", "b", "c"):
+        with tracer.trace(name) as root:
+            ids.append(root.trace_id)
+    assert [trace["name"] for trace in tracer.recent()] == ["c", "b"]
+    assert tracer.recent(trace_id=ids[1])[0]["name"] == "b"
+    assert tracer.recent(min_ms=60_000) == []
+
+
+def test_export_writes_otlp_json_lines(tmp_path) -> None:
+    """Test each finished trace is appended to the file as OTLP/JSON."""
+    path = tmp_path / "traces.jsonl"
+    tracer = Tracer(sample=1, path=str(path))
+    with tracer.trace("GET /task", **{"http.status_code": 200}) as root:
+        pass
+    (line,) = path.read_text().splitlines()
+    assert json.loads(line) == to_otlp([root])
+    (span,) = json.loads(line)["resourceSpans"][0]["scopeSpans"][0]["spans"]
+    assert span["traceId"] == root.trace_id
+    assert span["attributes"] == [
+        {"key": "http.status_code", "value": {"intValue": "200"}}
+    ]
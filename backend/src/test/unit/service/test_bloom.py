@@ -0,0 +1,21 @@
+from service.bloom import BloomFilter
+
+
+# TESTS
+def test_added_items_are_members() -> None:
+    """Test the filter never forgets an item it was given."""
+    bloom = BloomFilter(capacity=100)
+    items = [f"item {i}" for i in range(100)]
+    for item in items:
+        bloom.add(item)
+    assert all(item in bloom for item in items)
+    assert bloom.count == 100
+
+
+def test_false_positive_rate() -> None:
+    """Test a full filter stays near its configured error rate."""
+    bloom = BloomFilter(capacity=1000, error_rate=0.01)
+    for i in range(1000):
+        bloom.add(f"in {i}")
+    false_positives = sum(f"out {i}" in bloom for i in range(10_000))
+    assert false_positives < 300
@@ -0,0 +1,68 @@
+import time
+from service.cache import LRUCache
+
+
+# TESTS
+def test_get_counts_hits_and_misses() -> None:
+    """Test lookups update the hit and miss counters."""
+    cache = LRUCache(maxsize=2)
+    assert cache.get("a") is None
+    cache.put("a", 1)
+    assert cache.get("a") == 1
+    assert cache.stats()["hits"] == 1
+    assert cache.stats()["misses"] == 1
+
+
+def test_least_recently_used_is_evicted() -> None:
+    """Test the entry untouched the longest goes first."""
+    cache = LRUCache(maxsize=2)
+    cache.put("a", 1)
+    cache.put("b", 2)
+    cache.get("a")
+    cache.put("c", 3)
+    assert cache.get("b") is None
+    assert cache.get("a") == 1
+    assert cache.stats()["evictions"] == 1
+
+
+def test_entries_expire() -> None:
+    """Test an entry is dropped once its TTL has passed."""
+    cache = LRUCache(maxsize=2, ttl=0.01)
+    cache.put("a", 1)
+    time.sleep(0.02)
+    assert cache.get("a") is None
+    assert cache.stats()["size"] == 0
+
+
+def test_disabled_cache_always_loads() -> None:
+    """Test a zero-size cache never stores anything."""
+    cache = LRUCache(maxsize=0)
+    calls = []
+    for _ in range(2):
+        cache.get_or_load("a", lambda: calls.append(1))
+    assert len(calls) == 2
+    assert cache.stats()["size"] == 0
+
+
+def test_invalidate_during_load_is_not_overwritten() -> None:
+    """Test a value loaded before an invalidation is not cached."""
+    cache = LRUCache(maxsize=2)
+
+    def stale_loader() -> str:
+        cache.invalidate("a")  # a write lands while the read is in flight
+        return "stale"
+
+    assert cache.get_or_load("a", stale_loader) == "stale"
+    assert cache.get_or_load("a", lambda: "fresh") == "fresh"
+
+
+def test_peek_counts_nothing() -> None:
+    """Test peek reads live entries without touching the stats or order."""
+    cache = LRUCache(maxsize=2, ttl=60)
+    cache.put("a", 1)
+    cache.put("b", 2)
+    assert cache.peek("a") == 1
+    assert cache.peek("missing") is None
+    assert cache.stats()["hits"] == cache.stats()["misses"] == 0
+    cache.put("c", 3)  # "a" was only peeked at, so it is still the oldest
+    assert cache.peek("a") is None
@@ -0,0 +1,79 @@
+import asyncio
+import os
+import threading
+import time
+import pytest
+from error import HashUnavailable, Overloaded
+from service import hashing
+from service.hashing import HashPool
+
+
+# FIXTURES
+@pytest.fixture
+def pool() -> HashPool:
+    """Provide a one-worker pool with no room to queue."""
+    pool = HashPool(workers=1, queue_size=0)
+    yield pool
+    pool.shutdown()
+
+
+# TESTS
+def test_hash_and_verify_in_worker(pool: HashPool) -> None:
+    """Test a hash made in a worker process verifies there too."""
+    hash = pool.run(hashing.get_hash, "secret")
+    assert pool.run(hashing.verify, "secret", hash)
+    assert not pool.run(hashing.verify, "wrong", hash)
+    assert pool.stats()["completed"] == 3
+
+
+def test_async_verify(pool: HashPool) -> None:
+    """Test run_async awaits the worker's result."""
+    hash = hashing.get_hash("secret")
+    assert asyncio.run(pool.run_async(hashing.verify, "secret", hash))
+
+
+def test_inline_when_no_workers() -> None:
+    """Test a pool without workers hashes in the calling thread."""
+    pool = HashPool(workers=0, queue_size=0)
+    hash = pool.run(hashing.get_hash, "secret")
+    assert hashing.verify("secret", hash)
+    assert pool.stats()["completed"] == 1
+
+
+def test_full_queue_fails_fast(pool: HashPool) -> None:
+    """Test a job beyond the queue bound is refused instead of waiting."""
+    busy = threading.Thread(target=pool.run, args=(time.sleep, 1))
+    busy.start()
+    while not pool.stats()["in_flight"]:
+        time.sleep(0.01)
+    start = time.monotonic()
+    with pytest.raises(Overloaded) as exc:
+        pool.run(hashing.get_hash, "secret")
+    assert time.monotonic() - start < 0.5
+    assert exc.value.retry_after >= 1
+    assert pool.stats()["rejected"] == 1
+    busy.join()
+    assert pool.stats()["in_flight"] == 0
+
+
+def test_broken_pool_is_replaced(pool: HashPool) -> None:
+    """Test a job is retried on a fresh executor after its workers die."""
+    hash = pool.run(hashing.get_hash, "secret")
+    broken = pool._executor
+    for process in list(broken._processes.values()):
+        process.kill()
+    assert pool.run(hashing.verify, "secret", hash)
+    assert pool._executor is not broken
+    assert pool.stats()["in_flight"] == 0
+
+
+def test_job_that_breaks_the_pool_twice(pool: HashPool) -> None:
+    """Test a job that kills its worker on both tries gives HashUnavailable,
+    and the pool still works afterwards."""
+    with pytest.raises(HashUnavailable) as exc:
+        pool.run(os._exit, 1)
+    assert exc.value.retry_after >= 1
+    with pytest.raises(HashUnavailable):
+        asyncio.run(pool.run_async(os._exit, 1))
+    assert hashing.verify("secret", pool.run(hashing.get_hash, "secret"))
+    assert pool.stats()["in_flight"] == 0
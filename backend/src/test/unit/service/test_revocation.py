@@ -0,0 +1,52 @@
+import time
+import pytest
+from fake import token
+from service.revocation import RevocationList
+
+
+# FIXTURES
+@pytest.fixture
+def revocations() -> RevocationList:
+    """Provide a revocation list over an empty fake store."""
+    token.delete_all_revoked()
+    return RevocationList(token, capacity=100, interval=60)
+
+
+# TESTS
+def test_revoke(revocations: RevocationList) -> None:
+    """Test a revoked token id is reported as revoked."""
+    revocations.revoke("abc", time.time() + 60)
+    assert revocations.is_revoked("abc")
+
+
+def test_unrevoked_skips_store(monkeypatch, revocations: RevocationList) -> None:
+    """Test the filter clears unrevoked ids without asking the store."""
+    revocations.revoke("abc", time.time() + 60)
+    monkeypatch.setattr(token, "is_revoked", lambda jti: pytest.fail())
+    assert not any(revocations.is_revoked(f"jti {i}") for i in range(50))
+
+
+def test_rebuild_loads_store(revocations: RevocationList) -> None:
+    """Test revocations stored elsewhere are seen after a rebuild."""
+    revocations.is_revoked("abc")
+    token.revoke_token("abc", time.time() + 60)
+    assert not revocations.is_revoked("abc")
+    revocations.rebuild()
+    assert revocations.is_revoked("abc")
+
+
+def test_rebuild_purges_expired(revocations: RevocationList) -> None:
+    """Test revocations of expired tokens are dropped on rebuild."""
+    revocations.revoke("old", time.time() - 1)
+    revocations.revoke("new", time.time() + 60)
+    revocations.rebuild()
+    assert token.get_revoked(0) == ["new"]
+    assert revocations.stats()["entries"] == 1
+
+
+def test_stale_filter_is_rebuilt(revocations: RevocationList) -> None:
+    """Test a filter older than the interval is rebuilt on use."""
+    revocations.interval = 0
+    revocations.is_revoked("abc")
+    revocations.is_revoked("abc")
+    assert revocations.stats()["rebuilds"] == 2
@@ -0,0 +1,90 @@
+from service.suggest import PrefixIndex
+
+
+# FIXTURES
+def make_index(*texts: str) -> PrefixIndex:
+    """Return an index loaded with <texts> under ids 1, 2, ..."""
+    index = PrefixIndex()
+    index.load([list(enumerate(texts, start=1))])
+    return index
+
+
+# TESTS
+def test_search_by_prefix() -> None:
+    """Test matches come back in order, ignoring case and spacing."""
+    index = make_index("Buy milk", "buy  BREAD", "walk dog", "buzz")
+    assert index.search("BUY ") == [(2, "buy  BREAD"), (1, "Buy milk")]
+    assert index.search("bu", limit=1) == [(2, "buy  BREAD")]
+    assert index.search("x") == []
+
+
+def test_updates() -> None:
+    """Test add replaces an id's text and remove drops it."""
+    index = make_index("buy milk", "walk dog")
+    index.add(1, "sell milk")
+    index.add(3, "buy eggs")
+    index.remove(2)
+    assert index.search("buy") == [(3, "buy eggs")]
+    assert index.search("sell") == [(1, "sell milk")]
+    assert index.search("walk") == []
+    assert index.stats()["entries"] == 2
+
+
+def test_unloaded_index_ignores_adds() -> None:
+    """Test writes before the first load are left to the load."""
+    index = PrefixIndex()
+    index.add(1, "buy milk")
+    assert index.stats()["entries"] == 0
+    index.load([[(1, "buy milk")]])
+    assert index.search("buy") == [(1, "buy milk")]
+
+
+def test_stats_reports_memory() -> None:
+    """Test the footprint estimate grows with the entries."""
+    empty = make_index().stats()["bytes"]
+    full = make_index(*[f"task {i}" for i in range(100)]).stats()["bytes"]
+    assert full > empty
+
+
+def test_batch_update() -> None:
+    """Test update adds, replaces and removes many ids in one swap."""
+    index = make_index("buy milk", "walk dog", "buy bread")
+    keys = index._keys
+    index.update([(4, "buy eggs"), (1, "sell milk")], removed=[2, 9])
+    assert index._keys is not keys  # built aside, not edited in place
+    assert index.search("buy") == [(3, "buy bread"), (4, "buy eggs")]
+    assert index.search("sell") == [(1, "sell milk")]
+    assert index.search("walk") == []
+    assert index._keys == sorted(index._keys)
+
+
+def test_writes_during_load_are_kept() -> None:
+    """Test updates racing a load are replayed onto the rows it read."""
+    index = PrefixIndex()
+
+    def chunks():
+        yield [(1, "buy milk"), (2, "walk dog")]
+        # Written while the load is reading: after row 2 was read, but
+        # before row 3 was
+        index.remove(2)
+        index.add(3, "buy bread")
+        index.update([(4, "buy eggs")])
+        yield [(3, "buy bread")]
+
+    index.load(chunks())
+    assert index.search("buy") == [(3, "buy bread"), (4, "buy eggs"), (1, "buy milk")]
+    assert index.search("walk") == []
+
+
+def test_clear_during_load() -> None:
+    """Test a clear racing a load drops the rows read before it."""
+    index = PrefixIndex()
+
+    def chunks():
+        yield [(1, "buy milk")]
+        index.clear()
+        index.add(2, "buy bread")  # created after the clear
+        yield [(2, "buy bread")]
+
+    index.load(chunks())
+    assert index.search("buy") == [(2, "buy bread")]
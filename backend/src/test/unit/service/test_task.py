@@ -81,6 +81,32 @@ def test_modify_task_missing(modified_task: TaskCreate) -> None:
         task.modify_task(-1, modified_task)
 
 
+def test_get_single_task_is_cached(created_task: Task) -> None:
+    """Test a repeat lookup is served from the cache."""
+    task.get_single_task(created_task.task_id)
+    hits = task.cache.stats()["hits"]
+    assert task.get_single_task(created_task.task_id) == created_task
+    assert task.cache.stats()["hits"] == hits + 1
+
+
+def test_modify_task_invalidates_cache(
+    created_task: Task, modified_task: TaskCreate
+) -> None:
+    """Test a lookup after a modify sees the new text."""
+    task_id = created_task.task_id
+    task.get_single_task(task_id)
+    task.modify_task(task_id, modified_task)
+    assert task.get_single_task(task_id).task == modified_task.task
+
+
+def test_delete_task_invalidates_cache(created_task: Task) -> None:
+    """Test a deleted task is not served from the cache."""
+    task.get_single_task(created_task.task_id)
+    task.delete_task(created_task.task_id)
+    with pytest.raises(MissingTask):
+        task.get_single_task(created_task.task_id)
+
+
 def test_delete_task(created_task: Task) -> None:
     resp = task.delete_task(created_task.task_id)
     assert resp is None
@@ -103,3 +129,52 @@ def test_delete_all_tasks_empty() -> None:
     assert task.get_all_tasks() == []
     task.delete_all_tasks()
     assert task.get_all_tasks() == []
+
+
+def test_suggest_tasks_tracks_writes() -> None:
+    """Ensure suggestions follow creates, modifies and deletes."""
+    created = task.create_task(TaskCreate(task="water plants"))
+    assert task.suggest_tasks("WAT") == [created]
+    modified = task.modify_task(created.task_id, TaskCreate(task="feed cat"))
+    assert task.suggest_tasks("wat") == []
+    assert task.suggest_tasks("feed") == [modified]
+    task.delete_task(created.task_id)
+    assert task.suggest_tasks("feed") == []
+
+
+def test_duplicate_ignores_case(created_task: Task) -> None:
+    """Verify duplicates are caught case-insensitively, as in SQLite."""
+    with pytest.raises(DuplicateTask):
+        task.create_task(TaskCreate(task=created_task.task.upper()))
+
+
+def test_duplicate_folds_ascii_only() -> None:
+    """Verify only ASCII letters are folded, as SQLite's NOCASE does."""
+    task.create_task(TaskCreate(task="Straße"))
+    assert task.create_task(TaskCreate(task="STRASSE")).task == "STRASSE"
+    with pytest.raises(DuplicateTask):
+        task.create_task(TaskCreate(task="STRAßE"))
+
+
+def test_page_after_deletes() -> None:
+    """Verify keyset pages start after <after> and skip deleted ids."""
+    ids = [task.create_task(TaskCreate(task=f"task {i}")).task_id for i in range(6)]
+    task.delete_task(ids[2])
+    page = task.get_all_tasks(limit=2, after=ids[1])
+    assert [t.task_id for t in page] == [ids[3], ids[4]]
+    assert [t.task_id for t in task.get_all_tasks(after=ids[4])] == [ids[5]]
+
+
+def test_modify_onto_other_task(created_task: Task) -> None:
+    """Verify renaming onto another task's text raises DuplicateTask."""
+    other = task.create_task(TaskCreate(task="other task"))
+    with pytest.raises(DuplicateTask):
+        task.modify_task(other.task_id, TaskCreate(task=created_task.task))
+    recased = task.modify_task(other.task_id, TaskCreate(task="OTHER task"))
+    assert recased.task == "OTHER task"
+
+
+def test_ids_are_not_reused(created_task: Task) -> None:
+    """Ensure a deleted task's id is not handed out again."""
+    task.delete_task(created_task.task_id)
+    assert task.create_task(TaskCreate(task="next task")).task_id > created_task.task_id
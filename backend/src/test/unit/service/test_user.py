@@ -1,8 +1,10 @@
 import os
+import time
+from datetime import timedelta
 from dotenv import load_dotenv
 import pytest
 from error import DuplicateUser, MissingUser
-from model.user import User, UserCreate
+from model.user import User, UserCreate, UserUpdate
 
 load_dotenv()
 os.environ["TODO_UNIT_TEST"] = "true"
@@ -132,3 +134,117 @@ def test_delete_all_users_empty() -> None:
     assert user.get_all_users() == []
     user.delete_all_users()
     assert user.get_all_users() == []
+
+
+def test_get_current_user(created_user: User) -> None:
+    """Ensure a valid access token resolves to its user."""
+    token = user.create_access_token({"sub": created_user.name})
+    assert user.get_current_user(token) == created_user
+
+
+def test_get_current_user_is_cached(monkeypatch, created_user: User) -> None:
+    """Ensure a repeat token lookup skips decoding and the database."""
+    token = user.create_access_token({"sub": created_user.name})
+    user.get_current_user(token)
+    monkeypatch.setattr(user, "decode_token", lambda token: pytest.fail())
+    assert user.get_current_user(token) == created_user
+
+
+def test_get_current_user_after_modify(created_user: User) -> None:
+    """Ensure modifying a user drops their cached principal."""
+    token = user.create_access_token({"sub": created_user.name})
+    user.get_current_user(token)
+    user.modify_user(created_user.user_id, UserUpdate(hash="new hash"))
+    assert user.get_current_user(token).hash == "new hash"
+
+
+def test_get_current_user_after_delete(created_user: User) -> None:
+    """Ensure a deleted user's token no longer resolves."""
+    token = user.create_access_token({"sub": created_user.name})
+    user.get_current_user(token)
+    user.delete_user(created_user.user_id)
+    assert user.get_current_user(token) is None
+
+
+def test_get_current_user_expired(created_user: User) -> None:
+    """Verify that an expired token is rejected."""
+    token = user.create_access_token(
+        {"sub": created_user.name}, expires=timedelta(seconds=-1)
+    )
+    assert user.get_current_user(token) is None
+
+
+def test_get_current_user_by_claims(monkeypatch, created_user: User) -> None:
+    """Ensure a token carrying a user id skips the name lookup."""
+    token = user.create_access_token(user.token_claims(created_user))
+    monkeypatch.setattr(user, "lookup_user", lambda name: pytest.fail())
+    assert user.get_current_user(token) == created_user
+
+
+def test_modify_revokes_older_tokens(created_user: User) -> None:
+    """Ensure a token issued before a modification stops resolving."""
+    token = user.create_access_token(user.token_claims(created_user))
+    modified = user.modify_user(created_user.user_id, UserUpdate(hash="new hash"))
+    assert user.get_current_user(token) is None
+    fresh = user.create_access_token(user.token_claims(modified))
+    assert user.get_current_user(fresh) == modified
+
+
+def test_get_current_user_trusting_claims(monkeypatch, created_user: User) -> None:
+    """Ensure trust-claims mode builds the user without reading the store."""
+    monkeypatch.setattr(user, "TRUST_CLAIMS", True)
+    monkeypatch.setattr(user, "get_single_user", lambda user_id: pytest.fail())
+    token = user.create_access_token(user.token_claims(created_user))
+    principal = user.get_current_user(token)
+    assert principal.user_id == created_user.user_id
+    assert principal.name == created_user.name
+
+
+def test_logout(created_user: User) -> None:
+    """Ensure a token stops resolving once it is logged out."""
+    token = user.create_access_token(user.token_claims(created_user))
+    other = user.create_access_token(user.token_claims(created_user))
+    assert user.get_current_user(token) == created_user
+    user.logout(token)
+    assert user.get_current_user(token) is None
+    assert user.get_current_user(other) == created_user
+
+
+def test_revoke_by_jti(created_user: User) -> None:
+    """Ensure revoking a cached token by its jti alone stops it resolving."""
+    token = user.create_access_token(user.token_claims(created_user))
+    assert user.get_current_user(token) == created_user
+    payload = user.decode_token(token)
+    user.revoke(payload["jti"], payload["exp"])
+    assert user.get_current_user(token) is None
+
+
+def test_revoked_elsewhere_after_rebuild(created_user: User) -> None:
+    """Ensure a cached token is refused once the filter is rebuilt with a
+    revocation that another worker wrote to the store."""
+    token = user.create_access_token(user.token_claims(created_user))
+    assert user.get_current_user(token) == created_user
+    payload = user.decode_token(token)
+    user.revocations.store.revoke_token(payload["jti"], payload["exp"])
+    user.revocations.rebuild()
+    assert user.get_current_user(token) is None
+
+
+def test_principal_kept_for_rebuild_interval(
+    monkeypatch, created_user: User
+) -> None:
+    """Ensure a cached principal is resolved afresh after the rebuild
+    interval, to see token_version bumps made by other workers."""
+    monkeypatch.setattr(user.revocations, "interval", 0.05)
+    token = user.create_access_token(user.token_claims(created_user))
+    assert user.get_current_user(token) == created_user
+    time.sleep(0.1)
+    monkeypatch.setattr(user, "decode_token", lambda token: None)
+    assert user.get_current_user(token) is None
+
+
+def test_rename_onto_other_user(created_user: User) -> None:
+    """Verify renaming onto another user's name raises DuplicateUser."""
+    other = user.create_user(UserCreate(name="other user", hash="other hash"))
+    with pytest.raises(DuplicateUser):
+        user.modify_user(other.user_id, UserUpdate(name=created_user.name.upper()))
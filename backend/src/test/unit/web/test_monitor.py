@@ -0,0 +1,112 @@
+from fastapi import FastAPI, HTTPException
+from fastapi.testclient import TestClient
+from monitor.metrics import http_requests
+from monitor.queries import QueryProfiler
+from monitor.tracing import Tracer
+from web.monitor import MetricsMiddleware, TracingMiddleware, router
+
+app = FastAPI()
+app.add_middleware(MetricsMiddleware)
+app.include_router(router)
+
+
+@app.get("/probe/{probe_id}")
+def get_probe(probe_id: int) -> dict:
+    if probe_id < 0:
+        raise HTTPException(status_code=404)
+    return {}
+
+
+client = TestClient(app)
+
+
+# TESTS
+def test_requests_count_under_route_template() -> None:
+    """Test paths share the series of the route that served them."""
+    before = http_requests._merged()
+    client.get("/probe/1")
+    client.get("/probe/2")
+    client.get("/probe/-1")
+    after = http_requests._merged()
+
+    def added(*labels: str) -> int:
+        return after.get(labels, 0) - before.get(labels, 0)
+
+    assert added("GET", "/probe/{probe_id}", "200") == 2
+    assert added("GET", "/probe/{probe_id}", "404") == 1
+
+
+def test_metrics_endpoint() -> None:
+    """Test /metrics serves the text format with the request metrics."""
+    client.get("/probe/1")
+    resp = client.get("/metrics")
+    assert resp.status_code == 200
+    assert resp.headers["content-type"].startswith("text/plain; version=0.0.4")
+    assert "# TYPE todo_http_request_duration_seconds histogram" in resp.text
+    assert 'route="/probe/{probe_id}"' in resp.text
+
+
+def test_admin_is_off_without_a_token(monkeypatch) -> None:
+    """Test /admin routes don't exist unless TODO_ADMIN_TOKEN is set."""
+    monkeypatch.setattr("web.monitor.ADMIN_TOKEN", "")
+    assert client.get("/admin/queries").status_code == 404
+
+
+def test_admin_queries(monkeypatch) -> None:
+    """Test /admin/queries wants the admin token and an active profiler."""
+    monkeypatch.setattr("web.monitor.ADMIN_TOKEN", "open sesame")
+    assert client.get("/admin/queries").status_code == 403
+    headers = {"X-Admin-Token": "open sesame"}
+    monkeypatch.setattr("monitor.queries.profiler", None)
+    assert client.get("/admin/queries", headers=headers).status_code == 404
+    profiler = QueryProfiler(db=None, slow_ms=0)
+    profiler("SELECT * FROM task WHERE task_id = 7", (), 0.002)
+    monkeypatch.setattr("monitor.queries.profiler", profiler)
+    resp = client.get("/admin/queries", params={"top": 5}, headers=headers)
+    assert resp.status_code == 200
+    assert resp.json()[0]["query"] == "SELECT * FROM task WHERE task_id = ?"
+
+
+def test_tracing_names_root_after_route(monkeypatch) -> None:
+    """Test a sampled request gets a trace id and a root span per route."""
+    tracer = Tracer(sample=1)
+    traced_app = FastAPI()
+    traced_app.add_middleware(TracingMiddleware, tracer=tracer)
+    traced_app.add_api_route("/probe/{probe_id}", get_probe)
+    resp = TestClient(traced_app).get("/probe/1")
+    (trace,) = tracer.recent()
+    assert resp.headers["x-trace-id"] == trace["trace_id"]
+    assert trace["name"] == "GET /probe/{probe_id}"
+    assert trace["spans"][0]["attributes"]["http.status_code"] == 200
+
+
+def test_debug_traces(monkeypatch) -> None:
+    """Test /debug/traces is admin-only and off unless tracing is."""
+    monkeypatch.setattr("web.monitor.ADMIN_TOKEN", "open sesame")
+    headers = {"X-Admin-Token": "open sesame"}
+    monkeypatch.setattr("monitor.tracing.tracer", Tracer(sample=0))
+    assert client.get("/debug/traces", headers=headers).status_code == 404
+    tracer = Tracer(sample=1)
+    with tracer.trace("GET /task"):
+        pass
+    monkeypatch.setattr("monitor.tracing.tracer", tracer)
+    assert client.get("/debug/traces").status_code == 403
+    resp = client.get("/debug/traces", headers=headers)
+    assert [trace["name"] for trace in resp.json()] == ["GET /task"]
+
+
+def test_profiling_is_off_by_default(monkeypatch) -> None:
+    """Test the profile endpoints need TODO_PROFILING as well as the token."""
+    monkeypatch.setattr("web.monitor.ADMIN_TOKEN", "open sesame")
+    headers = {"X-Admin-Token": "open sesame"}
+    monkeypatch.setattr("monitor.profiling.PROFILING", False)
+    assert client.get("/debug/profile/cpu", headers=headers).status_code == 404
+    monkeypatch.setattr("monitor.profiling.PROFILING", True)
+    assert client.get("/debug/profile/cpu").status_code == 403
+    params = {"seconds": 0.05}
+    resp = client.get("/debug/profile/cpu", params=params, headers=headers)
+    assert resp.status_code == 200
+    assert resp.headers["content-type"].startswith("text/plain")
+    resp = client.get("/debug/profile/memory", params=params, headers=headers)
+    assert resp.status_code == 200
+    assert resp.json()["seconds"] == 0.05
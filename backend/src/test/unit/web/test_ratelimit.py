@@ -0,0 +1,90 @@
+from fastapi import FastAPI
+from fastapi.testclient import TestClient
+from model.user import User
+from service.user import Principal, principals, token_key
+from web.ratelimit import Limiter, RateLimitMiddleware, Rule, client_key
+
+
+# FIXTURES
+def make_client(*rules: Rule) -> TestClient:
+    """Return a client for an app limited by <rules>."""
+    app = FastAPI()
+    app.add_middleware(RateLimitMiddleware, rules=list(rules))
+
+    @app.get("/task")
+    def get_tasks() -> list:
+        return []
+
+    @app.post("/user/token")
+    def create_token() -> dict:
+        return {}
+
+    return TestClient(app)
+
+
+# TESTS
+def test_bucket_empties_and_refills() -> None:
+    """Test a client gets <burst> requests, then waits for the refill."""
+    limiter = Limiter(rate=1000, burst=2)
+    assert limiter.take("a") == (True, 1)
+    assert limiter.take("a")[0]
+    assert not limiter.take("a")[0]
+    assert limiter.take("b")[0]  # other clients have their own bucket
+
+
+def test_idle_buckets_are_evicted() -> None:
+    """Test the least recently seen client is dropped beyond maxsize."""
+    limiter = Limiter(rate=1, burst=1, maxsize=2)
+    for client in ("a", "b", "c"):
+        limiter.take(client)
+    assert limiter.stats()["clients"] == 2
+    assert limiter.take("a")[0]  # forgotten, so it starts full again
+
+
+def test_limited_response() -> None:
+    """Test an exhausted bucket gets a 429 with RateLimit headers."""
+    client = make_client(Rule("/", rate=0.001, burst=1))
+    resp = client.get("/task")
+    assert resp.status_code == 200
+    assert resp.headers["RateLimit-Limit"] == "1"
+    assert resp.headers["RateLimit-Remaining"] == "0"
+    resp = client.get("/task")
+    assert resp.status_code == 429
+    assert int(resp.headers["Retry-After"]) >= 1
+    assert resp.json() == {"detail": "Too many requests"}
+
+
+def test_token_endpoint_is_limited_separately() -> None:
+    """Test exhausting the token endpoint leaves the rest of the API alone."""
+    client = make_client(
+        Rule("/user/token", rate=0.001, burst=1, methods={"POST"}),
+        Rule("/", rate=0.001, burst=1),
+    )
+    assert client.post("/user/token").status_code == 200
+    assert client.post("/user/token").status_code == 429
+    assert client.get("/task").status_code == 200
+    assert client.get("/task").status_code == 429
+
+
+def test_disabled_rule_passes_through() -> None:
+    """Test a rule with no rate lets everything through unmarked."""
+    client = make_client(Rule("/", rate=0, burst=1))
+    for _ in range(3):
+        resp = client.get("/task")
+        assert resp.status_code == 200
+        assert "RateLimit-Limit" not in resp.headers
+
+
+def test_client_key_from_cached_principal(monkeypatch) -> None:
+    """Test a bearer token keys by user once cached, and by address until
+    then, without being decoded."""
+    monkeypatch.setattr("service.user.decode_token", lambda token: 1 / 0)
+    headers = [(b"authorization", b"Bearer some-token")]
+    scope = {"headers": headers, "client": ("10.0.0.1", 1234)}
+    assert client_key(scope) == "ip:10.0.0.1"
+    user = User(user_id=7, name="limited", hash="", token_version=0)
+    principals.put(token_key("some-token"), Principal(user, None))
+    try:
+        assert client_key(scope) == "user:7"
+    finally:
+        principals.invalidate(token_key("some-token"))
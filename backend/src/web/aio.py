@@ -0,0 +1,42 @@
+"""Async mirrors of the sync routers, mounted when TODO_ASYNC is set.
+
+A mirrored route keeps the sync route's path, parameters and response,
+but its endpoint is a coroutine that runs the sync handler on the database
+executor instead of holding one of Starlette's threadpool slots."""
+
+from collections.abc import Callable
+from functools import wraps
+from fastapi import APIRouter
+from data.aio import run
+
+
+def on_executor(handler: Callable) -> Callable:
+    """Return a coroutine that awaits <handler> on the database executor.
+
+    FastAPI reads the parameters of <handler> through __wrapped__."""
+
+    @wraps(handler)
+    async def endpoint(*args, **kwargs):
+        return await run(handler, *args, **kwargs)
+
+    return endpoint
+
+
+def mirror(router: APIRouter, **overrides: Callable) -> APIRouter:
+    """Return a copy of <router> whose endpoints run on the database
+    executor, except for routes named in <overrides>, which use the given
+    coroutine instead"""
+    mirrored = APIRouter()
+    for route in router.routes:
+        endpoint = overrides.get(route.name) or on_executor(route.endpoint)
+        mirrored.add_api_route(
+            route.path,
+            endpoint,
+            methods=list(route.methods),
+            status_code=route.status_code,
+            response_model=route.response_model,
+            response_class=route.response_class,
+            name=route.name,
+            description=route.description,
+        )
+    return mirrored
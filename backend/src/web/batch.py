@@ -0,0 +1,63 @@
+from fastapi import APIRouter, Response
+from error import (
+    DuplicateTask,
+    DuplicateUser,
+    InvalidOperation,
+    MissingTask,
+    MissingUser,
+)
+from model.batch import BatchRequest, BatchResponse, BatchResult
+from service import batch as service
+
+router = APIRouter(prefix="/batch")
+
+# Same mapping the task and user routers use
+ERROR_STATUS = {
+    MissingTask: 404,
+    MissingUser: 404,
+    DuplicateTask: 409,
+    DuplicateUser: 409,
+    InvalidOperation: 422,
+}
+SUCCESS_STATUS = {
+    "create_task": 201,
+    "create_user": 201,
+    "delete_task": 204,
+    "delete_user": 204,
+}
+
+
+def to_results(batch: BatchRequest, committed: bool, results: list) -> list:
+    """Map service results to per-operation statuses.
+
+    When an atomic batch rolls back, the operations that succeeded before
+    the failure and those never run are reported as 424."""
+    mapped = []
+    for operation, res in zip(batch.operations, results):
+        if isinstance(res, Exception):
+            mapped.append(BatchResult(status=ERROR_STATUS[type(res)], detail=res.msg))
+        elif not committed:
+            mapped.append(BatchResult(status=424, detail="Rolled back"))
+        else:
+            status = SUCCESS_STATUS.get(operation.op, 200)
+            mapped.append(BatchResult(status=status, result=res))
+    for _ in batch.operations[len(results) :]:
+        mapped.append(BatchResult(status=424, detail="Not executed"))
+    return mapped
+
+
+def batch_response(
+    batch: BatchRequest, committed: bool, results: list, response: Response | None
+) -> BatchResponse:
+    mapped = to_results(batch, committed, results)
+    if not committed and response is not None:
+        response.status_code = mapped[len(results) - 1].status
+    return BatchResponse(committed=committed, results=mapped)
+
+
+@router.post("")
+@router.post("/")
+def run_batch(batch: BatchRequest, response: Response = None) -> BatchResponse:
+    """Run task and user operations in one transaction"""
+    committed, results = service.run_batch(batch.operations, batch.atomic)
+    return batch_response(batch, committed, results, response)
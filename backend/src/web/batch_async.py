@@ -0,0 +1,4 @@
+from web import batch
+from web.aio import mirror
+
+router = mirror(batch.router)
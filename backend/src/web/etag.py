@@ -0,0 +1,37 @@
+"""Strong ETags derived from collection write versions"""
+
+import secrets
+from typing import Annotated
+from fastapi import Header, Response
+
+# Versions restart with the process, so tags from another run or another
+# worker must never match
+BOOT_ID = secrets.token_hex(4)
+
+IfNoneMatch = Annotated[str | None, Header()]
+
+
+def make_etag(collection: str, version: int, *parts) -> str:
+    """Return a strong ETag for a view of <collection> at <version>"""
+    tag = "-".join([collection, BOOT_ID, str(version), *map(str, parts)])
+    return f'"{tag}"'
+
+
+def not_modified(etag: str, if_none_match: str | None) -> Response | None:
+    """Return a 304 if <if_none_match> already names <etag>"""
+    if not if_none_match:
+        return None
+    tags = {tag.strip().removeprefix("W/") for tag in if_none_match.split(",")}
+    if etag in tags or "*" in tags:
+        return Response(status_code=304, headers=etag_headers(etag))
+    return None
+
+
+def etag_headers(etag: str) -> dict:
+    # no-cache: clients may store the body but must revalidate every time
+    return {"ETag": etag, "Cache-Control": "no-cache"}
+
+
+def set_etag(response: Response | None, etag: str) -> None:
+    if response is not None:
+        response.headers.update(etag_headers(etag))
@@ -0,0 +1,193 @@
+"""Request metrics middleware, the Prometheus scrape endpoint and the
+admin-only diagnostics"""
+
+import asyncio
+import os
+from secrets import compare_digest
+from time import perf_counter
+from typing import Annotated, Literal
+from fastapi import APIRouter, Depends, Header, HTTPException, Query
+from fastapi.responses import PlainTextResponse, Response
+from starlette.types import ASGIApp, Message, Receive, Scope, Send
+from error import ProfilerBusy
+from monitor import profiling, queries, tracing
+from monitor.metrics import http_in_flight, http_latency, http_requests, registry
+
+CONTENT_TYPE = "text/plain; version=0.0.4; charset=utf-8"
+ADMIN_TOKEN = os.getenv("TODO_ADMIN_TOKEN", "")  # unset turns /admin off
+
+router = APIRouter()
+
+
+class MetricsMiddleware:
+    """Count and time each request under its route template, not its path,
+    so /task/1 and /task/2 share a series"""
+
+    def __init__(self, app: ASGIApp):
+        self.app = app
+
+    async def __call__(self, scope: Scope, receive: Receive, send: Send) -> None:
+        if scope["type"] != "http":
+            await self.app(scope, receive, send)
+            return
+        status = 500  # if the app raises before it responds
+
+        async def send_with_status(message: Message) -> None:
+            nonlocal status
+            if message["type"] == "http.response.start":
+                status = message["status"]
+            await send(message)
+
+        http_in_flight.inc()
+        start = perf_counter()
+        try:
+            await self.app(scope, receive, send_with_status)
+        finally:
+            elapsed = perf_counter() - start
+            http_in_flight.dec()
+            # The router records the matched route in the scope
+            route = getattr(scope.get("route"), "path", "unmatched")
+            method = scope["method"]
+            http_requests.inc((method, route, str(status)))
+            http_latency.observe(elapsed, (method, route))
+
+
+class TracingMiddleware:
+    """Open the root span of each sampled request, named after its route"""
+
+    def __init__(self, app: ASGIApp, tracer: tracing.Tracer | None = None):
+        self.app = app
+        self.tracer = tracer or tracing.tracer
+
+    async def __call__(self, scope: Scope, receive: Receive, send: Send) -> None:
+        if scope["type"] != "http" or not self.tracer.sample:
+            await self.app(scope, receive, send)
+            return
+        method = scope["method"]
+        with self.tracer.trace(method, **{"http.method": method}) as root:
+            if root is None:
+                await self.app(scope, receive, send)
+                return
+
+            async def send_with_trace_id(message: Message) -> None:
+                if message["type"] == "http.response.start":
+                    root.attributes["http.status_code"] = message["status"]
+                    trace_id = (b"x-trace-id", root.trace_id.encode())
+                    message["headers"] = [*message.get("headers", []), trace_id]
+                await send(message)
+
+            try:
+                await self.app(scope, receive, send_with_trace_id)
+            finally:
+                route = getattr(scope.get("route"), "path", "unmatched")
+                root.name = f"{method} {route}"
+                root.attributes["http.route"] = route
+
+
+@router.get("/metrics", response_class=PlainTextResponse)
+def metrics() -> PlainTextResponse:
+    return PlainTextResponse(registry.render(), media_type=CONTENT_TYPE)
+
+
+def require_admin(x_admin_token: Annotated[str, Header()] = "") -> None:
+    """Let the request through only with the configured X-Admin-Token"""
+    if not ADMIN_TOKEN:
+        raise HTTPException(status_code=404)
+    if not compare_digest(x_admin_token.encode(), ADMIN_TOKEN.encode()):
+        raise HTTPException(status_code=403, detail="Admin token required")
+
+
+admin = APIRouter(prefix="/admin", dependencies=[Depends(require_admin)])
+
+
+def query_profiler() -> queries.QueryProfiler:
+    if not (profiler := queries.profiler) or not profiler.aggregate:
+        raise HTTPException(
+            status_code=404, detail="Query profiling is off; set TODO_QUERY_PROFILE"
+        )
+    return profiler
+
+
+@admin.get("/queries")
+def get_queries(
+    top: Annotated[int, Query(ge=1, le=500)] = 20,
+    order: Literal[queries.QueryProfiler.ORDERS] = "total_ms",
+) -> list[dict]:
+    return query_profiler().top(top, order)
+
+
+@admin.delete("/queries", status_code=204)
+def reset_queries() -> None:
+    query_profiler().reset()
+
+
+debug = APIRouter(prefix="/debug", dependencies=[Depends(require_admin)])
+
+
+@debug.get("/traces")
+def get_traces(
+    limit: Annotated[int, Query(ge=1, le=200)] = 20,
+    min_ms: Annotated[float, Query(ge=0)] = 0,
+    trace_id: str | None = None,
+) -> list[dict]:
+    """Return recent sampled traces, newest first"""
+    if not tracing.tracer.sample:
+        raise HTTPException(
+            status_code=404, detail="Tracing is off; set TODO_TRACE_SAMPLE"
+        )
+    return tracing.tracer.recent(limit, min_ms, trace_id)
+
+
+def require_profiling() -> None:
+    if not profiling.PROFILING:
+        raise HTTPException(
+            status_code=404, detail="Profiling is off; set TODO_PROFILING"
+        )
+
+
+profile = APIRouter(prefix="/profile", dependencies=[Depends(require_profiling)])
+Seconds = Annotated[float, Query(gt=0, le=profiling.MAX_SECONDS)]
+
+
+@profile.get("/cpu")
+async def get_cpu_profile(
+    seconds: Seconds = 10,
+    interval_ms: Annotated[float, Query(ge=1, le=1000)] = 5,
+    format: Literal["collapsed", "text", "pstats"] = "collapsed",
+) -> Response:
+    """Sample every thread for <seconds>. collapsed suits flame graphs, text
+    is the pstats report, and pstats is a file for pstats.Stats or snakeviz"""
+    # Off the event loop, and off the threadpool that serves sync routes
+    try:
+        cpu = await asyncio.to_thread(
+            profiling.profile_cpu, seconds, interval_ms / 1000
+        )
+    except ProfilerBusy as exc:
+        raise HTTPException(status_code=409, detail=exc.msg)
+    if format == "pstats":
+        headers = {"Content-Disposition": 'attachment; filename="cpu.pstats"'}
+        return Response(
+            cpu.pstats_dump(), media_type="application/octet-stream", headers=headers
+        )
+    return PlainTextResponse(cpu.collapsed() if format == "collapsed" else cpu.text())
+
+
+@profile.get("/memory")
+async def get_memory_profile(
+    seconds: Seconds = 10,
+    top: Annotated[int, Query(ge=1, le=500)] = 20,
+    frames: Annotated[int, Query(ge=1, le=50)] = 1,
+    group_by: Literal["lineno", "traceback", "filename"] = "lineno",
+) -> dict:
+    """Return the allocations that grew most over <seconds>"""
+    try:
+        return await asyncio.to_thread(
+            profiling.profile_memory, seconds, top, frames, group_by
+        )
+    except ProfilerBusy as exc:
+        raise HTTPException(status_code=409, detail=exc.msg)
+
+
+debug.include_router(profile)
+router.include_router(admin)
+router.include_router(debug)
@@ -0,0 +1,73 @@
+"""Keyset pagination helpers shared by the list routes"""
+
+import base64
+import json
+import os
+from collections.abc import Callable
+from typing import Annotated, Any
+from fastapi import HTTPException, Query, Response
+
+DEFAULT_PAGE_SIZE = int(os.getenv("TODO_PAGE_SIZE", 100))
+MAX_PAGE_SIZE = int(os.getenv("TODO_MAX_PAGE_SIZE", 500))
+
+Limit = Annotated[int, Query(ge=1, description=f"Page size, capped at {MAX_PAGE_SIZE}")]
+After = Annotated[
+    str | None, Query(description="Cursor from a previous X-Next-Cursor header")
+]
+
+
+def encode_cursor(key: Any) -> str:
+    """Return an opaque cursor for the JSON-serializable <key>"""
+    raw = json.dumps(key, separators=(",", ":")).encode()
+    return base64.urlsafe_b64encode(raw).decode().rstrip("=")
+
+
+def decode_cursor(cursor: str) -> Any:
+    """Return the key inside <cursor>, or raise a 400"""
+    padded = cursor + "=" * (-len(cursor) % 4)
+    try:
+        return json.loads(base64.urlsafe_b64decode(padded))
+    except ValueError:
+        raise HTTPException(status_code=400, detail="Invalid cursor")
+
+
+def decode_id_cursor(cursor: str | None) -> int | None:
+    """Return the row id a list cursor points after"""
+    if cursor is None:
+        return None
+    key = decode_cursor(cursor)
+    if type(key) is not int:
+        raise HTTPException(status_code=400, detail="Invalid cursor")
+    return key
+
+
+def decode_rank_cursor(cursor: str | None) -> tuple[float, int] | None:
+    """Return the (rank, row id) key a search cursor points after"""
+    if cursor is None:
+        return None
+    key = decode_cursor(cursor)
+    if (
+        type(key) is not list
+        or len(key) != 2
+        or type(key[0]) not in (int, float)
+        or type(key[1]) is not int
+    ):
+        raise HTTPException(status_code=400, detail="Invalid cursor")
+    return float(key[0]), key[1]
+
+
+def page_limit(limit: int) -> int:
+    """Clamp a requested page size to the server maximum"""
+    return min(limit, MAX_PAGE_SIZE)
+
+
+def paginate(
+    items: list, limit: int, key: Callable[[Any], Any], response: Response | None
+) -> list:
+    """Trim a page fetched with one row of lookahead and set X-Next-Cursor"""
+    if len(items) <= limit:
+        return items
+    items = items[:limit]
+    if response is not None:
+        response.headers["X-Next-Cursor"] = encode_cursor(key(items[-1]))
+    return items
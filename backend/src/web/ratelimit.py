@@ -0,0 +1,159 @@
+"""Token-bucket rate limiting as ASGI middleware"""
+
+import json
+import os
+from collections import OrderedDict
+from math import ceil
+from threading import Lock
+from time import monotonic
+from starlette.types import ASGIApp, Message, Receive, Scope, Send
+from service.user import principals, token_key
+
+RATE_LIMIT = float(os.getenv("TODO_RATE_LIMIT", 50))  # per second; 0 turns it off
+RATE_BURST = int(os.getenv("TODO_RATE_BURST", 100))
+TOKEN_RATE_LIMIT = float(os.getenv("TODO_TOKEN_RATE_LIMIT", 0.5))
+TOKEN_RATE_BURST = int(os.getenv("TODO_TOKEN_RATE_BURST", 5))
+RATE_LIMIT_CLIENTS = int(os.getenv("TODO_RATE_LIMIT_CLIENTS", 10_000))
+
+
+class Limiter:
+    """Token buckets, one per client, refilled at <rate> up to <burst>.
+
+    Buckets live in an LRU map capped at <maxsize>, so memory stays bounded;
+    an evicted client simply starts again with a full bucket."""
+
+    def __init__(self, rate: float, burst: int, maxsize: int = RATE_LIMIT_CLIENTS):
+        self.rate = rate
+        self.burst = burst
+        self.maxsize = maxsize
+        self.allowed = 0
+        self.limited = 0
+        # client -> [tokens, last refill]
+        self._buckets: OrderedDict[str, list[float]] = OrderedDict()
+        self._lock = Lock()
+
+    def take(self, client: str) -> tuple[bool, float]:
+        """Spend a token of <client>'s bucket; return (allowed, tokens left)"""
+        now = monotonic()
+        with self._lock:
+            if bucket := self._buckets.get(client):
+                tokens = min(self.burst, bucket[0] + (now - bucket[1]) * self.rate)
+                self._buckets.move_to_end(client)
+            else:
+                tokens = self.burst
+                bucket = self._buckets[client] = [tokens, now]
+                if len(self._buckets) > self.maxsize:
+                    self._buckets.popitem(last=False)
+            allowed = tokens >= 1
+            bucket[0], bucket[1] = tokens - allowed, now
+            if allowed:
+                self.allowed += 1
+            else:
+                self.limited += 1
+            return allowed, bucket[0]
+
+    def headers(self, allowed: bool, tokens: float) -> list[tuple[bytes, bytes]]:
+        """Return RateLimit-* headers for a bucket left with <tokens>"""
+        # Seconds until the next request would pass, or until the bucket is full
+        wanted = 1 - tokens if not allowed else self.burst - tokens
+        reset = ceil(wanted / self.rate)
+        headers = [
+            (b"ratelimit-limit", str(self.burst).encode()),
+            (b"ratelimit-remaining", str(int(tokens)).encode()),
+            (b"ratelimit-reset", str(reset).encode()),
+        ]
+        if not allowed:
+            headers.append((b"retry-after", str(max(reset, 1)).encode()))
+        return headers
+
+    def stats(self) -> dict:
+        with self._lock:
+            return {
+                "clients": len(self._buckets),
+                "allowed": self.allowed,
+                "limited": self.limited,
+            }
+
+
+class Rule:
+    """Rate limit for requests whose path starts with <path>"""
+
+    def __init__(
+        self,
+        path: str,
+        rate: float,
+        burst: int,
+        methods: set[str] | None = None,
+        maxsize: int = RATE_LIMIT_CLIENTS,
+    ):
+        self.path = path
+        self.methods = methods
+        self.limiter = Limiter(rate, burst, maxsize) if rate > 0 else None
+
+    def matches(self, method: str, path: str) -> bool:
+        if self.methods and method not in self.methods:
+            return False
+        return path == self.path or path.startswith(self.path.rstrip("/") + "/")
+
+
+# First match wins. The token endpoint gets its own buckets, so exhausting
+# it doesn't lock a client out of the rest of the API, and vice versa.
+DEFAULT_RULES = [
+    Rule("/user/token", TOKEN_RATE_LIMIT, TOKEN_RATE_BURST, methods={"POST"}),
+    Rule("/", RATE_LIMIT, RATE_BURST),
+]
+
+
+def client_key(scope: Scope) -> str:
+    """Return the principal behind a request, or else its address.
+
+    A bearer token counts only once a route has verified it and cached its
+    principal, so made-up tokens can't each claim a fresh bucket, and no
+    token is decoded here. Behind a proxy, run uvicorn with --proxy-headers
+    so the address is the real client's."""
+    for name, value in scope["headers"]:
+        if name == b"authorization":
+            scheme, _, token = value.decode("latin-1").partition(" ")
+            if scheme.lower() == "bearer" and (
+                principal := principals.peek(token_key(token))
+            ):
+                return f"user:{principal.user.user_id}"
+            break
+    client = scope.get("client")
+    return f"ip:{client[0] if client else 'unknown'}"
+
+
+class RateLimitMiddleware:
+    def __init__(self, app: ASGIApp, rules: list[Rule] | None = None):
+        self.app = app
+        self.rules = DEFAULT_RULES if rules is None else rules
+
+    def _limiter(self, scope: Scope) -> Limiter | None:
+        for rule in self.rules:
+            if rule.matches(scope["method"], scope["path"]):
+                return rule.limiter
+        return None
+
+    async def __call__(self, scope: Scope, receive: Receive, send: Send) -> None:
+        if scope["type"] != "http" or not (limiter := self._limiter(scope)):
+            await self.app(scope, receive, send)
+            return
+        allowed, tokens = limiter.take(client_key(scope))
+        headers = limiter.headers(allowed, tokens)
+        if not allowed:
+            body = json.dumps({"detail": "Too many requests"}).encode()
+            headers += [
+                (b"content-type", b"application/json"),
+                (b"content-length", str(len(body)).encode()),
+            ]
+            start = {"type": "http.response.start", "status": 429, "headers": headers}
+            await send(start)
+            await send({"type": "http.response.body", "body": body})
+            return
+
+        async def send_with_headers(message: Message) -> None:
+            if message["type"] == "http.response.start":
+                message["headers"] = [*message.get("headers", []), *headers]
+            await send(message)
+
+        await self.app(scope, receive, send_with_headers)
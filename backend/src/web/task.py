@@ -1,10 +1,20 @@
 import os
-from fastapi import APIRouter, HTTPException
-from dotenv import load_dotenv
+from typing import Annotated, Literal
+from fastapi import APIRouter, Body, HTTPException, Query, Response
+from fastapi.responses import StreamingResponse
 from error import MissingTask, DuplicateTask
+from model.batch import BatchResult
 from model.task import Task, TaskCreate
-
-load_dotenv()
+from web.etag import IfNoneMatch, make_etag, not_modified, set_etag
+from web.page import (
+    After,
+    DEFAULT_PAGE_SIZE,
+    Limit,
+    decode_id_cursor,
+    decode_rank_cursor,
+    page_limit,
+    paginate,
+)
 
 if os.getenv("TODO_UNIT_TEST"):
     from fake import task as service
@@ -14,24 +24,94 @@ else:
 
 router = APIRouter(prefix="/task")
 
+EXPORT_MEDIA_TYPES = {"ndjson": "application/x-ndjson", "csv": "text/csv"}
+ExportFormat = Annotated[Literal["ndjson", "csv"], Query(alias="format")]
+MAX_BATCH_SIZE = int(os.getenv("TODO_MAX_BATCH_SIZE", 10_000))
+TaskBatch = Annotated[list[TaskCreate], Body(max_length=MAX_BATCH_SIZE)]
+SuggestPrefix = Annotated[str, Query(min_length=1, max_length=100)]
+SuggestLimit = Annotated[int, Query(ge=1, le=50)]
+SearchQuery = Annotated[
+    str, Query(min_length=1, max_length=200, description="Words to search for")
+]
+
+
+def batch_results(results: list[Task | DuplicateTask]) -> list[BatchResult]:
+    """Map bulk-create results to per-item statuses"""
+    return [
+        (
+            BatchResult(status=409, detail=res.msg)
+            if isinstance(res, DuplicateTask)
+            else BatchResult(status=201, result=res)
+        )
+        for res in results
+    ]
+
+
+@router.get("/export")
+def export_tasks(fmt: ExportFormat = "ndjson") -> StreamingResponse:
+    """Stream every task as NDJSON or CSV without buffering the table"""
+    return StreamingResponse(
+        service.export_tasks(fmt),
+        media_type=EXPORT_MEDIA_TYPES[fmt],
+        headers={"Content-Disposition": f'attachment; filename="tasks.{fmt}"'},
+    )
+
+
+@router.get("/suggest")
+def suggest_tasks(prefix: SuggestPrefix, limit: SuggestLimit = 10) -> list[Task]:
+    """Return tasks starting with <prefix>, for autocomplete"""
+    return service.suggest_tasks(prefix, limit)
+
+
+@router.get("/search")
+def search_tasks(
+    q: SearchQuery,
+    response: Response = None,
+    limit: Limit = DEFAULT_PAGE_SIZE,
+    after: After = None,
+) -> list[Task]:
+    """Return a page of tasks matching <q>, best match first"""
+    limit = page_limit(limit)
+    hits = service.search_tasks(q, limit + 1, decode_rank_cursor(after))
+    hits = paginate(hits, limit, lambda hit: [hit[0], hit[1].task_id], response)
+    return [task for _, task in hits]
+
 
 @router.get("/{task_id}")
-def get_single_task(task_id: int) -> Task:
+def get_single_task(
+    task_id: int, response: Response = None, if_none_match: IfNoneMatch = None
+) -> Task:
     """Return a single task if it exists"""
+    etag = make_etag("task", service.collection_version(), task_id)
+    if cached := not_modified(etag, if_none_match):
+        return cached
     try:
-        return service.get_single_task(task_id)
+        task = service.get_single_task(task_id)
     except MissingTask as exc:
         raise HTTPException(status_code=404, detail=exc.msg)
+    set_etag(response, etag)
+    return task
 
 
 @router.get("")
 @router.get("/")
-def get_all_tasks() -> list[Task]:
-    """Return list of all tasks"""
+def get_all_tasks(
+    response: Response = None,
+    limit: Limit = DEFAULT_PAGE_SIZE,
+    after: After = None,
+    if_none_match: IfNoneMatch = None,
+) -> list[Task]:
+    """Return a page of tasks; X-Next-Cursor points at the next one"""
+    limit = page_limit(limit)
+    etag = make_etag("tasks", service.collection_version(), limit, after or "")
+    if cached := not_modified(etag, if_none_match):
+        return cached
     try:
-        return service.get_all_tasks()
+        tasks = service.get_all_tasks(limit + 1, decode_id_cursor(after))
     except MissingTask as exc:
         raise HTTPException(status_code=404, detail=exc.msg)
+    set_etag(response, etag)
+    return paginate(tasks, limit, lambda t: t.task_id, response)
 
 
 @router.post("", status_code=201)
@@ -44,6 +124,12 @@ def create_task(task: TaskCreate) -> Task:
         raise HTTPException(status_code=409, detail=exc.msg)
 
 
+@router.post("/batch")
+def create_tasks(tasks: TaskBatch) -> list[BatchResult]:
+    """Add many tasks in one transaction; each item reports 201 or 409"""
+    return batch_results(service.create_tasks(tasks))
+
+
 @router.patch("/{task_id}", status_code=200)
 def modify_task(task_id: int, modified_task: TaskCreate) -> Task:
     """Modify a task if it exists"""
@@ -0,0 +1,23 @@
+from fastapi.responses import StreamingResponse
+from service import task_async as service
+from web import task
+from web.aio import mirror
+from model.task import Task
+from web.task import EXPORT_MEDIA_TYPES, ExportFormat, SuggestLimit, SuggestPrefix
+
+
+async def export_tasks(fmt: ExportFormat = "ndjson") -> StreamingResponse:
+    """Stream every task as NDJSON or CSV, reading on the database executor"""
+    return StreamingResponse(
+        service.export_tasks(fmt),
+        media_type=EXPORT_MEDIA_TYPES[fmt],
+        headers={"Content-Disposition": f'attachment; filename="tasks.{fmt}"'},
+    )
+
+
+async def suggest_tasks(prefix: SuggestPrefix, limit: SuggestLimit = 10) -> list[Task]:
+    """Return tasks starting with <prefix>, for autocomplete"""
+    return await service.suggest_tasks(prefix, limit)
+
+
+router = mirror(task.router, export_tasks=export_tasks, suggest_tasks=suggest_tasks)
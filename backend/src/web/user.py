@@ -1,5 +1,5 @@
 import os
-from fastapi import APIRouter, HTTPException, Depends
+from fastapi import APIRouter, HTTPException, Depends, Response
 from fastapi.security import OAuth2PasswordBearer, OAuth2PasswordRequestForm
 from model.user import User, UserCreate, UserUpdate
 from datetime import timedelta
@@ -8,8 +8,16 @@ if os.getenv("TODO_UNIT_TEST"):
     from fake import user as service
 else:
     from service import user as service
-from error import MissingUser, DuplicateUser
-
+from error import MissingUser, DuplicateUser, Overloaded
+from web.etag import IfNoneMatch, make_etag, not_modified, set_etag
+from web.page import (
+    After,
+    DEFAULT_PAGE_SIZE,
+    Limit,
+    decode_id_cursor,
+    page_limit,
+    paginate,
+)
 
 ACCESS_TOKEN_EXPIRE_MINUTES = 30
 
@@ -30,16 +38,34 @@ def unauthed():
     )
 
 
+def overloaded(exc: Overloaded):
+    raise HTTPException(
+        status_code=503,
+        detail=exc.msg,
+        headers={"Retry-After": str(exc.retry_after)},
+    )
+
+
 # This endpoint is directed to by any call that has the
 # oauth2_dep() dependency:
 @router.post("/token")
 def create_access_token(form_data: OAuth2PasswordRequestForm = Depends()):
     """Get username and password from OAuth form, return access token"""
-    user = service.auth_user(form_data.username, form_data.password)
+    try:
+        user = service.auth_user(form_data.username, form_data.password)
+    except Overloaded as exc:
+        overloaded(exc)
+    return token_response(user)
+
+
+def token_response(user: User | None) -> dict:
+    """Return a new access token for an authenticated <user>"""
     if not user:
         unauthed()
     expires = timedelta(minutes=ACCESS_TOKEN_EXPIRE_MINUTES)
-    access_token = service.create_access_token(data={"sub": user.name}, expires=expires)
+    access_token = service.create_access_token(
+        data=service.token_claims(user), expires=expires
+    )
     return {"access_token": access_token, "token_type": "bearer"}
 
 
@@ -49,18 +75,52 @@ def get_access_token(token: str = Depends(oauth2_dep)) -> dict:
     return {"token": token}
 
 
+@router.get("/me")
+def get_me(token: str = Depends(oauth2_dep)) -> User:
+    """Return the user the current access token belongs to"""
+    if not (user := service.get_current_user(token)):
+        unauthed()
+    return user
+
+
+@router.post("/logout", status_code=204)
+def logout(token: str = Depends(oauth2_dep)) -> None:
+    """Revoke the current access token"""
+    if not service.get_current_user(token):
+        unauthed()
+    service.logout(token)
+
+
 @router.get("")
 @router.get("/")
-def get_all_users() -> list[User]:
-    return service.get_all_users()
+def get_all_users(
+    response: Response = None,
+    limit: Limit = DEFAULT_PAGE_SIZE,
+    after: After = None,
+    if_none_match: IfNoneMatch = None,
+) -> list[User]:
+    limit = page_limit(limit)
+    etag = make_etag("users", service.collection_version(), limit, after or "")
+    if cached := not_modified(etag, if_none_match):
+        return cached
+    users = service.get_all_users(limit + 1, decode_id_cursor(after))
+    set_etag(response, etag)
+    return paginate(users, limit, lambda u: u.user_id, response)
 
 
 @router.get("/{user_id}")
-def get_single_user(user_id: int) -> User:
+def get_single_user(
+    user_id: int, response: Response = None, if_none_match: IfNoneMatch = None
+) -> User:
+    etag = make_etag("user", service.collection_version(), user_id)
+    if cached := not_modified(etag, if_none_match):
+        return cached
     try:
-        return service.get_single_user(user_id)
+        user = service.get_single_user(user_id)
     except MissingUser as exc:
         raise HTTPException(status_code=404, detail=exc.msg)
+    set_etag(response, etag)
+    return user
 
 
 @router.post("", status_code=201)
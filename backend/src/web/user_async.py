@@ -0,0 +1,19 @@
+from fastapi import Depends
+from fastapi.security import OAuth2PasswordRequestForm
+from error import Overloaded
+from service import user_async as service
+from web import user
+from web.aio import mirror
+from web.user import overloaded, token_response
+
+
+async def create_access_token(form_data: OAuth2PasswordRequestForm = Depends()):
+    """Get username and password from OAuth form, return access token"""
+    try:
+        authed = await service.auth_user(form_data.username, form_data.password)
+    except Overloaded as exc:
+        overloaded(exc)
+    return token_response(authed)
+
+
+router = mirror(user.router, create_access_token=create_access_token)